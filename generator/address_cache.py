@@ -0,0 +1,313 @@
+# address_cache.py
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+from typing import Optional, Dict, List, Type
+
+from config import ADDRESS_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class AddressCacheBackend:
+    """
+    Базовый интерфейс хранилища кэша адресов.
+    Реализации должны быть потокобезопасными.
+    """
+
+    def add(self, country_code: str, address: str) -> bool:
+        """
+        Добавляет адрес в кэш.
+
+        Returns:
+            True, если адрес новый, False, если он уже был в кэше
+        """
+        raise NotImplementedError
+
+    def random_address(self, country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
+        """Возвращает случайный адрес страны или None, если адресов нет."""
+        raise NotImplementedError
+
+    def count(self, country_code: Optional[str] = None) -> int:
+        """Возвращает количество адресов страны (или всех стран, если код не указан)."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Сохраняет изменения в постоянное хранилище."""
+
+    def close(self):
+        """Закрывает хранилище."""
+        self.flush()
+
+
+class JSONAddressCache(AddressCacheBackend):
+    """
+    Кэш адресов в JSON-файле (прежний формат хранения).
+    Файл читается при первом обращении и перезаписывается целиком при flush().
+    """
+
+    def __init__(self, path: str, max_per_country: Optional[int] = None):
+        self.path = path
+        self.max_per_country = max_per_country
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, List[str]]] = None
+        self._index: Dict[str, set] = {}
+        self._dirty = 0
+
+    def _load(self) -> Dict[str, List[str]]:
+        if self._data is None:
+            data = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    logger.info(f"Загружен кэш адресов: {len(data)} стран")
+                except Exception as e:
+                    logger.error(f"Ошибка при загрузке кэша адресов: {e}")
+                    data = {}
+            self._data = data
+            self._index = {country: set(addresses) for country, addresses in data.items()}
+        return self._data
+
+    def add(self, country_code: str, address: str) -> bool:
+        with self._lock:
+            data = self._load()
+            index = self._index.setdefault(country_code, set())
+            if address in index:
+                return False
+
+            addresses = data.setdefault(country_code, [])
+            addresses.append(address)
+            index.add(address)
+
+            # Удаляем самые старые записи при превышении лимита
+            if self.max_per_country and len(addresses) > self.max_per_country:
+                removed = addresses[:-self.max_per_country]
+                data[country_code] = addresses[-self.max_per_country:]
+                index.difference_update(removed)
+
+            # Сохраняем кэш каждые 10 новых адресов
+            self._dirty += 1
+            if self._dirty >= 10:
+                self.flush()
+            return True
+
+    def random_address(self, country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
+        with self._lock:
+            addresses = self._load().get(country_code, [])
+            if not addresses:
+                return None
+            return (rng or random).choice(addresses)
+
+    def count(self, country_code: Optional[str] = None) -> int:
+        with self._lock:
+            data = self._load()
+            if country_code is not None:
+                return len(data.get(country_code, []))
+            return sum(len(addresses) for addresses in data.values())
+
+    def items(self) -> Dict[str, List[str]]:
+        """Возвращает копию всех адресов по странам."""
+        with self._lock:
+            return {country: list(addresses) for country, addresses in self._load().items()}
+
+    def flush(self):
+        with self._lock:
+            if self._data is None or not self._dirty:
+                return
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False)
+                self._dirty = 0
+                logger.info(f"Кэш адресов сохранен: {self.count()} записей")
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении кэша адресов: {e}")
+
+
+class SQLiteAddressCache(AddressCacheBackend):
+    """
+    Кэш адресов в базе SQLite (режим WAL, индекс по стране и адресу).
+
+    Каждый адрес вставляется отдельной строкой, проверка дубликатов выполняется
+    уникальным индексом, а случайный адрес выбирается запросом по индексу страны,
+    поэтому ни запуск, ни добавление адреса не зависят от размера кэша.
+    Соединение открывается при первом обращении.
+    """
+
+    def __init__(self, path: str, max_per_country: Optional[int] = None,
+                 legacy_json_path: Optional[str] = None):
+        self.path = path
+        self.max_per_country = max_per_country
+        self.legacy_json_path = legacy_json_path
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._counts: Dict[str, int] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS addresses ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " country TEXT NOT NULL,"
+                " address TEXT NOT NULL)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_addresses_country_address "
+                         "ON addresses (country, address)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_addresses_country_id ON addresses (country, id)")
+            self._conn = conn
+            self._migrate_legacy_json()
+        return self._conn
+
+    def _migrate_legacy_json(self):
+        """Однократно переносит адреса из прежнего JSON-кэша в пустую базу."""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        if self._conn.execute("SELECT 1 FROM addresses LIMIT 1").fetchone():
+            return
+
+        legacy = JSONAddressCache(self.legacy_json_path).items()
+        rows = [(country, address) for country, addresses in legacy.items() for address in addresses]
+        if rows:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR IGNORE INTO addresses (country, address) VALUES (?, ?)", rows)
+            logger.info(f"Кэш адресов перенесен из {self.legacy_json_path}: {len(rows)} записей")
+
+    def _country_count(self, country_code: str) -> int:
+        if country_code not in self._counts:
+            row = self._connect().execute("SELECT COUNT(*) FROM addresses WHERE country = ?",
+                                          (country_code,)).fetchone()
+            self._counts[country_code] = row[0]
+        return self._counts[country_code]
+
+    def add(self, country_code: str, address: str) -> bool:
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute("INSERT OR IGNORE INTO addresses (country, address) VALUES (?, ?)",
+                                  (country_code, address))
+            if cursor.rowcount != 1:
+                return False
+
+            if country_code in self._counts:
+                self._counts[country_code] += 1
+            else:
+                # Количество из базы уже включает добавленный адрес
+                self._country_count(country_code)
+
+            # Удаляем самые старые записи при превышении лимита (по индексу (country, id), без OFFSET)
+            excess = self._counts[country_code] - (self.max_per_country or 0)
+            if self.max_per_country and excess > 0:
+                conn.execute(
+                    "DELETE FROM addresses WHERE id IN ("
+                    " SELECT id FROM addresses WHERE country = ? ORDER BY id LIMIT ?)",
+                    (country_code, excess)
+                )
+                self._counts.pop(country_code, None)
+            return True
+
+    def random_address(self, country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
+        with self._lock:
+            total = self._country_count(country_code)
+            if not total:
+                return None
+            # Равномерный выбор по номеру записи страны. id общие для всех стран и идут вперемешку,
+            # поэтому случайный id из диапазона страны выбирал бы адреса после чужих записей чаще.
+            # OFFSET проходит индекс (country, id) и ограничен max_per_country записями
+            offset = (rng or random).randrange(total)
+            row = self._connect().execute(
+                "SELECT address FROM addresses WHERE country = ? ORDER BY id LIMIT 1 OFFSET ?",
+                (country_code, offset)
+            ).fetchone()
+            if row is None:
+                # Кэш изменился в другом процессе - перечитаем количество при следующем обращении
+                self._counts.pop(country_code, None)
+                return None
+            return row[0]
+
+    def count(self, country_code: Optional[str] = None) -> int:
+        with self._lock:
+            if country_code is not None:
+                return self._country_count(country_code)
+            return self._connect().execute("SELECT COUNT(*) FROM addresses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._counts.clear()
+
+
+# Доступные реализации кэша адресов. Новые реализации можно зарегистрировать через register_cache_backend.
+CACHE_BACKENDS: Dict[str, Type[AddressCacheBackend]] = {
+    'sqlite': SQLiteAddressCache,
+    'json': JSONAddressCache,
+}
+
+_cache: Optional[AddressCacheBackend] = None
+_cache_lock = threading.Lock()
+
+
+def register_cache_backend(name: str, backend_class: Type[AddressCacheBackend]):
+    """
+    Регистрирует реализацию кэша адресов под указанным именем.
+
+    Args:
+        name: Имя реализации (значение ADDRESS_CACHE_CONFIG['backend'])
+        backend_class: Класс, наследующий AddressCacheBackend
+    """
+    CACHE_BACKENDS[name] = backend_class
+
+
+def create_address_cache(backend: Optional[str] = None, path: Optional[str] = None) -> AddressCacheBackend:
+    """
+    Создает хранилище кэша адресов по настройкам ADDRESS_CACHE_CONFIG.
+
+    Args:
+        backend: Имя реализации. Если None, берется из конфигурации.
+        path: Путь к файлу кэша. Если None, берется из конфигурации.
+
+    Returns:
+        Хранилище кэша адресов
+    """
+    backend = backend or ADDRESS_CACHE_CONFIG['backend']
+    max_per_country = ADDRESS_CACHE_CONFIG['max_per_country']
+
+    if backend == 'sqlite':
+        return SQLiteAddressCache(path or ADDRESS_CACHE_CONFIG['path'], max_per_country,
+                                  legacy_json_path=ADDRESS_CACHE_CONFIG['legacy_json_path'])
+    if backend == 'json':
+        return JSONAddressCache(path or ADDRESS_CACHE_CONFIG['legacy_json_path'], max_per_country)
+    if backend in CACHE_BACKENDS:
+        return CACHE_BACKENDS[backend](path or ADDRESS_CACHE_CONFIG['path'], max_per_country)
+
+    raise ValueError(f"Неизвестная реализация кэша адресов: {backend}")
+
+
+def get_address_cache() -> AddressCacheBackend:
+    """Возвращает общий для процесса кэш адресов, создавая его при первом обращении."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_address_cache()
+    return _cache
+
+
+def set_address_cache(cache: Optional[AddressCacheBackend]):
+    """
+    Заменяет общий кэш адресов (например, для другого файла или реализации).
+    Предыдущий кэш сохраняется и закрывается.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not None and _cache is not cache:
+            _cache.close()
+        _cache = cache
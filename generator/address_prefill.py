@@ -0,0 +1,227 @@
+# address_prefill.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+
+from config import PREFILL_CONFIG, GMAPS_CONFIG, ADDRESS_CACHE_CONFIG
+from gmaps_api import fetch_new_address, save_address_cache
+from address_cache import get_address_cache
+from metrics import inc
+from rate_limit import QuotaExceededError
+
+logger = logging.getLogger(__name__)
+
+
+class PrefillProgress:
+    """
+    Состояние заполнения кэша по странам с сохранением в файл контрольной точки.
+
+    Заполненность страны определяется по самому кэшу адресов, поэтому прерванное заполнение
+    продолжается с фактического количества адресов. В контрольной точке хранится то, что по
+    кэшу не восстановить: число запросов и страны, для которых адреса получить не удалось.
+    """
+
+    def __init__(self, country_codes: List[str], target: int, path: Optional[str] = None):
+        self.target = target
+        self.path = path
+        self.countries: Dict[str, Dict[str, Any]] = {
+            code: {'cached': 0, 'attempts': 0, 'failures': 0, 'status': 'pending'} for code in country_codes
+        }
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+
+    def load(self):
+        """Загружает контрольную точку, если она создана для того же количества адресов на страну."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить контрольную точку заполнения кэша {self.path}: {e}")
+            return
+        if data.get('target') != self.target:
+            logger.info(f"Контрольная точка {self.path} создана для другого количества адресов на страну "
+                        f"и не используется")
+            return
+        for code, state in data.get('countries', {}).items():
+            if code in self.countries:
+                self.countries[code].update(attempts=state.get('attempts', 0), status=state.get('status', 'pending'))
+        logger.info(f"Заполнение кэша продолжается с контрольной точки {self.path}")
+
+    def save(self, force: bool = False):
+        """Сохраняет контрольную точку (не чаще PREFILL_CONFIG['checkpoint_interval'], если не force)."""
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._saved_at < PREFILL_CONFIG['checkpoint_interval']:
+            return
+        self._saved_at = now
+        # JSON-кэш адресов сохраняется вместе с контрольной точкой, чтобы они не расходились
+        save_address_cache()
+        with self._lock:
+            data = {'target': self.target, 'updated': datetime.now().isoformat(timespec='seconds'),
+                    'countries': {code: dict(state) for code, state in self.countries.items()}}
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить контрольную точку заполнения кэша {self.path}: {e}")
+
+    def remove(self):
+        """Удаляет контрольную точку после полного заполнения."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return [code for code, state in self.countries.items() if state['status'] == 'pending']
+
+    def summary(self) -> str:
+        with self._lock:
+            done = sum(state['status'] == 'done' for state in self.countries.values())
+            cached = sum(min(state['cached'], self.target) for state in self.countries.values())
+        return (f"стран заполнено {done}/{len(self.countries)}, "
+                f"адресов {cached}/{self.target * len(self.countries)}")
+
+
+def prefill_address_cache(country_codes: List[str], addresses_per_country: Optional[int] = None,
+                          concurrency: Optional[int] = None,
+                          checkpoint_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Заполняет кэш адресов для указанных стран до addresses_per_country адресов на страну.
+
+    Адреса запрашиваются одновременно для всех стран (до concurrency запросов, по очереди между
+    странами) через общий ограничитель, поэтому заполнение укладывается в бюджет запросов
+    и дневную квоту. Адреса, уже находящиеся в кэше, учитываются: повторный запуск дозаполняет
+    кэш, а прерванный (Ctrl+C, исчерпанная квота) продолжается с места остановки. Страна, для
+    которой PREFILL_CONFIG['max_failures'] запросов подряд не дали нового адреса, помечается
+    как исчерпанная и при продолжении пропускается. После полного заполнения контрольная
+    точка удаляется.
+
+    Args:
+        country_codes: Список кодов стран
+        addresses_per_country: Количество адресов на страну.
+            Если None, используется PREFILL_CONFIG['addresses_per_country'].
+        concurrency: Максимум одновременных запросов. Если None, используется GMAPS_CONFIG['max_concurrency'].
+        checkpoint_path: Файл контрольной точки. Если None, используется PREFILL_CONFIG['checkpoint_path'].
+
+    Returns:
+        Состояние по странам: cached (адресов в кэше), attempts, failures, status (done, exhausted, pending)
+    """
+    target = addresses_per_country if addresses_per_country is not None else PREFILL_CONFIG['addresses_per_country']
+    if target < 1:
+        raise ValueError("Количество адресов на страну должно быть не меньше 1.")
+    max_per_country = ADDRESS_CACHE_CONFIG['max_per_country']
+    if max_per_country and target > max_per_country:
+        logger.warning(f"Кэш хранит не больше {max_per_country} адресов на страну, "
+                       f"заполнение ограничено этим количеством")
+        target = max_per_country
+
+    workers = max(1, concurrency or GMAPS_CONFIG['max_concurrency'])
+    progress = PrefillProgress(list(dict.fromkeys(country_codes)), target,
+                               checkpoint_path or PREFILL_CONFIG['checkpoint_path'])
+    progress.load()
+
+    cache = get_address_cache()
+    for code, state in progress.countries.items():
+        state['cached'] = cache.count(code)
+        if state['cached'] >= target:
+            state['status'] = 'done'
+        elif state['status'] == 'done':
+            # Адреса страны вытеснены или удалены из кэша после прошлого заполнения
+            state['status'] = 'pending'
+
+    logger.info(f"Заполнение кэша адресов до {target} на страну для {len(progress.countries)} стран "
+                f"({workers} одновременных запросов): {progress.summary()}")
+
+    # Запросы в работе по странам: страна не получает больше запросов, чем ей не хватает адресов
+    in_flight: Dict[str, int] = {}
+    cursor = [0]
+    lock = threading.Lock()
+    stopped = threading.Event()
+    rng = random.Random()
+
+    def next_country() -> Optional[str]:
+        """Следующая страна, которой не хватает адресов (по кругу)."""
+        with lock:
+            pending = [code for code in progress.pending()
+                       if progress.countries[code]['cached'] + in_flight.get(code, 0) < target]
+            if not pending:
+                return None
+            code = pending[cursor[0] % len(pending)]
+            cursor[0] += 1
+            in_flight[code] = in_flight.get(code, 0) + 1
+            return code
+
+    def finish(code: str, added: bool):
+        with lock:
+            in_flight[code] -= 1
+            state = progress.countries[code]
+            state['attempts'] += 1
+            state['cached'] = cache.count(code)
+            state['failures'] = 0 if added else state['failures'] + 1
+            if state['status'] != 'pending':
+                return
+            if state['cached'] >= target:
+                state['status'] = 'done'
+                logger.info(f"Кэш адресов страны {code} заполнен: {state['cached']} адресов "
+                            f"за {state['attempts']} запросов")
+            elif state['failures'] >= PREFILL_CONFIG['max_failures']:
+                state['status'] = 'exhausted'
+                logger.warning(f"Для страны {code} не удалось получить новые адреса за {state['failures']} "
+                               f"запросов подряд: в кэше {state['cached']} из {target}")
+
+    def worker():
+        while not stopped.is_set():
+            code = next_country()
+            if code is None:
+                # Остальные страны заполняются другими потоками или все уже заполнены
+                if not any(in_flight.values()):
+                    return
+                time.sleep(0.05)
+                continue
+            added = False
+            try:
+                added = fetch_new_address(code, rng, new_only=True) is not None
+            except QuotaExceededError as e:
+                logger.error(f"{e}. Заполнение кэша прервано, его можно продолжить позже.")
+                stopped.set()
+            except Exception as e:
+                logger.exception(f"Ошибка при заполнении кэша адресов для страны {code}: {e}")
+            inc('prefill_fetches_total', result='new' if added else 'empty')
+            finish(code, added)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefill')
+    futures = [executor.submit(worker) for _ in range(workers)]
+    try:
+        last_report = time.monotonic()
+        while not all(future.done() for future in futures):
+            time.sleep(0.5)
+            progress.save()
+            if time.monotonic() - last_report >= PREFILL_CONFIG['report_interval']:
+                last_report = time.monotonic()
+                logger.info(f"Заполнение кэша адресов: {progress.summary()}")
+    except KeyboardInterrupt:
+        logger.warning("Заполнение кэша прервано, его можно продолжить повторным запуском")
+        stopped.set()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        progress.save(force=True)
+
+    if progress.pending():
+        logger.info(f"Заполнение кэша адресов остановлено: {progress.summary()}")
+    else:
+        if all(state['status'] == 'done' for state in progress.countries.values()):
+            progress.remove()
+        logger.info(f"Заполнение кэша адресов завершено: {progress.summary()}")
+    return progress.countries
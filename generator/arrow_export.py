@@ -0,0 +1,168 @@
+# arrow_export.py
+import logging
+import os
+from typing import Optional, List, Dict
+
+import pandas as pd
+
+from config import ARROW_EXPORT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ARROW_FORMATS = ['parquet', 'feather']
+
+# Сжатие, поддерживаемое форматом Arrow IPC (Feather v2)
+_IPC_COMPRESSIONS = ['zstd', 'lz4']
+
+
+def _import_pyarrow():
+    """Импортирует pyarrow (необязательная зависимость, нужна только для parquet и feather)."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Для экспорта в Parquet и Feather установите pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+class ArrowBatchWriter:
+    """
+    Потоково записывает партии данных в Parquet или Arrow IPC (Feather v2).
+
+    Партии накапливаются до row_group_size строк и записываются одной группой строк
+    (для Feather - одним пакетом записей), поэтому в памяти находится не больше одной группы.
+    Столбцы из dictionary_columns (по умолчанию geo) хранятся со словарным кодированием:
+    словарь общий для всего файла и только дополняется новыми значениями. Если указанного
+    столбца нет в данных, выводится предупреждение.
+    """
+
+    def __init__(self, filename: str, format: str = 'parquet', compression: Optional[str] = None,
+                 row_group_size: Optional[int] = None, dictionary_columns: Optional[List[str]] = None,
+                 append: bool = False):
+        if format not in ARROW_FORMATS:
+            raise ValueError(f"Неизвестный формат Arrow: {format}")
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            raise ValueError(f"Формат {format} не поддерживает дозапись в существующий файл {filename}, "
+                             f"укажите для продолжения генерации новый файл")
+
+        self.pa = _import_pyarrow()
+        self.filename = filename
+        self.format = format
+        self.compression = compression or ARROW_EXPORT_CONFIG['compression']
+        self.row_group_size = row_group_size or ARROW_EXPORT_CONFIG['row_group_size']
+        if dictionary_columns is None:
+            dictionary_columns = ARROW_EXPORT_CONFIG['dictionary_columns']
+        self.dictionary_columns = list(dictionary_columns)
+        self.rows = 0
+
+        self._columns: Optional[List[str]] = None
+        self._schema = None
+        self._writer = None
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+        # Словари столбцов: значение -> код, в порядке появления
+        self._dictionaries: Dict[str, Dict[str, int]] = {}
+
+    def _open(self, data: pd.DataFrame):
+        pa = self.pa
+        self._columns = list(data.columns)
+        missing = [column for column in self.dictionary_columns if column not in self._columns]
+        if missing:
+            logger.warning(f"Столбцы для словарного кодирования отсутствуют в данных: {', '.join(missing)}")
+        fields = []
+        for column in self._columns:
+            if column in self.dictionary_columns:
+                fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+                self._dictionaries[column] = {}
+            else:
+                fields.append(pa.field(column, pa.string()))
+        self._schema = pa.schema(fields)
+
+        if self.format == 'parquet':
+            self._writer = pa.parquet.ParquetWriter(self.filename, self._schema, compression=self.compression)
+        else:
+            compression = self.compression if self.compression in _IPC_COMPRESSIONS else None
+            options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(self.filename, self._schema, options=options)
+
+    def _dictionary_array(self, column: str, values: pd.Series):
+        """Кодирует столбец общим для файла словарем (новые значения дописываются в конец словаря)."""
+        pa = self.pa
+        dictionary = self._dictionaries[column]
+        mask = values.isna()
+        for value in values[~mask].unique():
+            if value not in dictionary:
+                dictionary[value] = len(dictionary)
+        codes = values.map(dictionary)
+        indices = pa.array(codes.where(~mask, 0).astype('int32').to_numpy(), mask=mask.to_numpy(), type=pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, pa.array(list(dictionary), type=pa.string()))
+
+    def _to_table(self, data: pd.DataFrame):
+        pa = self.pa
+        arrays = []
+        for column in self._columns:
+            values = data[column]
+            if column in self._dictionaries:
+                arrays.append(self._dictionary_array(column, values.astype(object)))
+            else:
+                arrays.append(pa.array(values.astype('string'), type=pa.string(), from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=self._schema)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        data = pd.concat(self._pending, ignore_index=True) if len(self._pending) > 1 else self._pending[0]
+        self._pending = []
+        self._pending_rows = 0
+        table = self._to_table(data)
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+
+    def write(self, data: pd.DataFrame):
+        """Добавляет партию данных; полные группы строк записываются сразу."""
+        if data is None or data.empty:
+            return
+        if self._writer is None:
+            self._open(data)
+        else:
+            data = data.reindex(columns=self._columns)
+
+        self._pending.append(data)
+        self._pending_rows += len(data)
+        self.rows += len(data)
+        if self._pending_rows >= self.row_group_size:
+            self._flush()
+
+    def close(self):
+        """Записывает оставшиеся строки и закрывает файл."""
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_arrow_file(data: pd.DataFrame, filename: str, format: str = 'parquet', **options) -> int:
+    """
+    Сохраняет DataFrame в Parquet или Feather.
+
+    Args:
+        data: DataFrame для сохранения
+        filename: Имя файла
+        format: 'parquet' или 'feather'
+        **options: Параметры ArrowBatchWriter (compression, row_group_size, dictionary_columns)
+
+    Returns:
+        Количество записанных строк
+    """
+    with ArrowBatchWriter(filename, format, **options) as writer:
+        writer.write(data)
+    return writer.rows
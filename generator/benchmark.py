@@ -0,0 +1,520 @@
+# benchmark.py
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Callable, Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import (generate_strong_compliant_password, generate_passwords, generate_email,
+                   generate_phone_number, generate_birth_date, normalize_string)
+
+# resource есть только в Unix; на Windows пиковая память не измеряется
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Размеры полной генерации по умолчанию (python benchmark.py e2e --sizes 1000 - быстрый прогон)
+E2E_SIZES = [1000, 100000, 1000000]
+
+# Форматы, для которых замеряется экспорт
+EXPORT_FORMATS = ['csv', 'ndjson', 'json', 'sql', 'parquet', 'feather', 'excel']
+
+# Страны для замеров: разные локали Faker и форматы телефонов
+BENCH_COUNTRIES = ['US', 'DE', 'FR', 'JP', 'RU', 'BR']
+
+# Допустимое ухудшение относительно базовых результатов (10%)
+DEFAULT_THRESHOLD = 0.1
+
+# Короткие команды, которые должны запускаться быстро: название -> аргументы main.py
+STARTUP_COMMANDS = {
+    'show_countries': ['-s'],
+    'help': ['--help'],
+}
+
+# Бюджет запуска короткой команды: время импортов без учета интерпретатора и site, мс
+STARTUP_IMPORT_BUDGET_MS = 50
+
+# Модули, которые не должны загружаться при запуске коротких команд
+STARTUP_FORBIDDEN_MODULES = ['pandas', 'numpy', 'faker', 'googlemaps', 'requests', 'pyarrow', 'data_generator']
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> float:
+    """
+    Выполняет функцию несколько раз и возвращает лучшее время выполнения в секундах.
+
+    Args:
+        func: Функция без аргументов
+        repeat: Количество повторов
+
+    Returns:
+        Минимальное время выполнения
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Возвращает пиковое потребление памяти текущим процессом в МБ (None, если не поддерживается)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def sample_latencies(func: Callable[[int], Any], calls: int, warmup: int = 10,
+                     rows_per_call: int = 1) -> Dict[str, float]:
+    """
+    Вызывает функцию calls раз, замеряя каждый вызов, и возвращает пропускную способность
+    и перцентили задержки.
+
+    Args:
+        func: Функция, принимающая номер вызова
+        calls: Количество замеряемых вызовов
+        warmup: Количество вызовов для прогрева (создание экземпляров Faker, кэши)
+        rows_per_call: Количество строк, обрабатываемых за вызов (для замеров по DataFrame)
+
+    Returns:
+        Словарь с ops_per_sec, rows_per_sec, p50_us, p99_us и calls
+    """
+    for i in range(warmup):
+        func(i)
+
+    timings = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        timings[i] = time.perf_counter() - start
+
+    total = timings.sum()
+    return {
+        'calls': calls,
+        'ops_per_sec': calls / total,
+        'rows_per_sec': calls * rows_per_call / total,
+        'p50_us': float(np.percentile(timings, 50)) * 1e6,
+        'p99_us': float(np.percentile(timings, 99)) * 1e6,
+    }
+
+
+def bench_passwords(n: int = 10000, length: int = None) -> Dict[str, float]:
+    """
+    Сравнивает поштучную генерацию паролей (generate_strong_compliant_password)
+    с пакетной (generate_passwords).
+
+    Args:
+        n: Количество паролей
+        length: Длина пароля
+
+    Returns:
+        Словарь с пропускной способностью (паролей в секунду) для каждого способа
+    """
+    scalar = measure(lambda: [generate_strong_compliant_password(length) for _ in range(n)])
+    bulk = measure(lambda: generate_passwords(n, length))
+    return {
+        'scalar_per_sec': n / scalar,
+        'bulk_per_sec': n / bulk,
+        'speedup': scalar / bulk,
+    }
+
+
+def _configure_offline():
+    """Переключает генерацию адресов в офлайн-режим, чтобы замеры не зависели от сети и квоты API."""
+    from gmaps_api import configure_address_pipeline
+    configure_address_pipeline(address_mode='offline')
+
+
+def sample_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Создает DataFrame пользователей для замеров валидации и экспорта.
+    Генерируется не больше 1000 записей, остальные строки получаются их повторением.
+    """
+    from data_generator import generate_user_data
+    from seeding import set_run_seed
+
+    _configure_offline()
+    set_run_seed(seed)
+    base = generate_user_data(min(rows, 1000), BENCH_COUNTRIES)
+    repeats = -(-rows // len(base))
+    return pd.concat([base] * repeats, ignore_index=True).head(rows)
+
+
+def bench_micro(calls: int = 10000, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Замеряет отдельные функции генерации записи: задержку каждого вызова и пропускную способность.
+
+    Args:
+        calls: Количество вызовов каждой функции
+        seed: Сид генератора случайных чисел
+
+    Returns:
+        Словарь название замера -> результаты sample_latencies
+    """
+    from data_generator import generate_name, generate_names
+
+    rng = random.Random(seed)
+    names = [generate_name(BENCH_COUNTRIES[i % len(BENCH_COUNTRIES)], rng) for i in range(100)]
+    raw_names = ["Émile Zoë Müller", "Þórunn Ásgeirsdóttir", "Łukasz  Wójcik ", "Сергей Иванов", "山田 太郎"]
+
+    benchmarks = {
+        'generate_name': lambda i: generate_name(BENCH_COUNTRIES[i % len(BENCH_COUNTRIES)], rng),
+        'generate_email': lambda i: generate_email(names[i % len(names)], rng=rng),
+        'generate_phone_number': lambda i: generate_phone_number(BENCH_COUNTRIES[i % len(BENCH_COUNTRIES)], rng=rng),
+        'generate_strong_compliant_password': lambda i: generate_strong_compliant_password(),
+        'generate_birth_date': lambda i: generate_birth_date(rng=rng),
+        'normalize_string': lambda i: normalize_string(raw_names[i % len(raw_names)]),
+    }
+    results = {name: sample_latencies(func, calls) for name, func in benchmarks.items()}
+    # Пакетный выбор имен: по 1000 имен за вызов
+    results['generate_names_bulk'] = sample_latencies(
+        lambda i: generate_names(BENCH_COUNTRIES[i % len(BENCH_COUNTRIES)], 1000, rng),
+        max(calls // 100, 10), rows_per_call=1000)
+    return results
+
+
+def bench_frames(rows: int = 10000, calls: int = 20, formats: Optional[List[str]] = None,
+                 seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Замеряет валидацию и экспорт DataFrame заданного размера.
+
+    Args:
+        rows: Количество строк в DataFrame
+        calls: Количество замеряемых вызовов для каждой операции
+        formats: Форматы экспорта. Если None, используются все из EXPORT_FORMATS.
+        seed: Сид генерации данных
+
+    Returns:
+        Словарь название замера -> результаты sample_latencies (rows_per_sec - строк в секунду)
+    """
+    from data_generator import validate_user_data, GENERATED_REQUIRED_FIELDS
+    from clipboard_utils import save_batches_to_file, FILE_EXTENSIONS
+
+    data = sample_frame(rows, seed)
+    results = {'validate_user_data': sample_latencies(lambda i: validate_user_data(data, GENERATED_REQUIRED_FIELDS),
+                                                      calls, warmup=1, rows_per_call=rows)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for format in formats or EXPORT_FORMATS:
+            filename = os.path.join(directory, f"bench{FILE_EXTENSIONS[format]}")
+            try:
+                results[f'export_{format}'] = sample_latencies(
+                    lambda i: save_batches_to_file([data], filename, format=format), calls,
+                    warmup=1, rows_per_call=rows)
+            except ImportError as e:
+                # Необязательная зависимость формата не установлена
+                print(f"Пропуск export_{format}: {e}")
+    return results
+
+
+def _configure_stub(stub_url: str, cache_dir: str, requests_per_second: float):
+    """
+    Направляет запросы адресов на заглушку Google Maps (gmaps_stub.py).
+    Кэши адресов и ответов и учет квоты переносятся во временный каталог,
+    чтобы каждый замер начинался с пустых кэшей и не засорял рабочие.
+    """
+    from config import ADDRESS_CACHE_CONFIG, RESPONSE_CACHE_CONFIG, RATE_LIMIT_CONFIG
+
+    ADDRESS_CACHE_CONFIG['path'] = os.path.join(cache_dir, 'address_cache.db')
+    ADDRESS_CACHE_CONFIG['legacy_json_path'] = None
+    RESPONSE_CACHE_CONFIG['path'] = None
+    RATE_LIMIT_CONFIG['quota_path'] = None
+
+    from gmaps_api import configure_address_pipeline
+    configure_address_pipeline(address_mode='online', requests_per_second=requests_per_second, base_url=stub_url)
+
+
+def _run_e2e(size: int, seed: int, stub_url: Optional[str] = None,
+             requests_per_second: float = 0) -> Dict[str, float]:
+    """Выполняет полную генерацию в отдельном процессе, чтобы пиковая память относилась только к ней."""
+    from data_generator import generate_user_data
+    from seeding import set_run_seed
+
+    cache_dir = None
+    if stub_url:
+        cache_dir = tempfile.mkdtemp(prefix='bench_cache_')
+        _configure_stub(stub_url, cache_dir, requests_per_second)
+    else:
+        _configure_offline()
+    set_run_seed(seed)
+    start = time.perf_counter()
+    data = generate_user_data(size)
+    elapsed = time.perf_counter() - start
+    if cache_dir:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        'rows': len(data),
+        'seconds': elapsed,
+        'rows_per_sec': len(data) / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_e2e(sizes: Optional[List[int]] = None, seed: int = 0, stub: bool = False,
+              requests_per_second: float = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Замеряет полную генерацию generate_user_data для каждого размера.
+    Каждый размер выполняется в новом процессе.
+
+    Args:
+        sizes: Количество записей. Если None, используется E2E_SIZES.
+        seed: Сид генерации
+        stub: Получать адреса через локальную заглушку Google Maps (GMAPS_STUB_CONFIG) вместо офлайн-генерации
+        requests_per_second: Бюджет запросов к заглушке в секунду (0 - без ограничения)
+
+    Returns:
+        Словарь 'e2e_<размер>' (или 'e2e_stub_<размер>') -> время, строк в секунду и пиковая память
+    """
+    server = None
+    if stub:
+        from gmaps_stub import GMapsStubServer, TEXT_SEARCH_PATH, DETAILS_PATH
+        # Порт выбирается системой, чтобы не конфликтовать с уже запущенной заглушкой
+        server = GMapsStubServer(port=0, seed=seed).start()
+
+    results = {}
+    try:
+        for size in sizes or E2E_SIZES:
+            name = f'e2e_stub_{size}' if stub else f'e2e_{size}'
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                results[name] = executor.submit(_run_e2e, size, seed, server.url if server else None,
+                                                requests_per_second).result()
+            if server:
+                results[name]['api_requests'] = server.stats[TEXT_SEARCH_PATH] + server.stats[DETAILS_PATH]
+                server.stats.clear()
+    finally:
+        if server:
+            server.stop()
+    return results
+
+
+def parse_importtime(output: str) -> Dict[str, int]:
+    """
+    Разбирает вывод python -X importtime.
+
+    Returns:
+        Словарь модуль верхнего уровня -> суммарное время импорта в микросекундах
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Вложенные импорты выводятся с отступом; учитываем только импорты верхнего уровня
+        if name.startswith('  ') or not cumulative.strip().isdigit():
+            continue
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def bench_startup(runs: int = 5, budget_ms: float = STARTUP_IMPORT_BUDGET_MS) -> Dict[str, Dict[str, Any]]:
+    """
+    Замеряет запуск коротких команд main.py (STARTUP_COMMANDS) в отдельных процессах:
+    полное время запуска и время импортов по данным python -X importtime.
+    Импорты интерпретатора (site и запускаемые им .pth-файлы) в бюджет не входят.
+
+    Args:
+        runs: Количество запусков каждой команды (берется лучший результат)
+        budget_ms: Бюджет времени импортов, мс
+
+    Returns:
+        Словарь название команды -> показатели (startup_ms, import_ms, budget_ms, slowest, forbidden)
+    """
+    import subprocess
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    results = {}
+    for name, arguments in STARTUP_COMMANDS.items():
+        best_wall = best_imports = float('inf')
+        modules: Dict[str, int] = {}
+        for _ in range(runs):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, '-X', 'importtime', script, *arguments],
+                                       capture_output=True, text=True, cwd=tempfile.gettempdir())
+            wall = time.perf_counter() - start
+            if completed.returncode != 0:
+                raise RuntimeError(f"Команда main.py {' '.join(arguments)} завершилась с кодом "
+                                   f"{completed.returncode}: {completed.stderr[-500:]}")
+            run_modules = parse_importtime(completed.stderr)
+            run_modules.pop('site', None)
+            imports = sum(run_modules.values()) / 1000
+            best_wall = min(best_wall, wall)
+            if imports < best_imports:
+                best_imports, modules = imports, run_modules
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:5]
+        results[f'startup_{name}'] = {
+            'startup_ms': best_wall * 1000,
+            'import_ms': best_imports,
+            'budget_ms': budget_ms,
+            'slowest': {module: round(us / 1000, 1) for module, us in slowest},
+            'forbidden': [module for module in STARTUP_FORBIDDEN_MODULES if module in modules],
+        }
+    return results
+
+
+def check_startup(results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Возвращает описания нарушений бюджета запуска (пустой список, если их нет)."""
+    violations = []
+    for name, result in results.items():
+        if 'import_ms' not in result:
+            continue
+        if result['import_ms'] > result['budget_ms']:
+            violations.append(f"{name}: импорты {result['import_ms']:.1f} мс при бюджете {result['budget_ms']:g} мс")
+        if result['forbidden']:
+            violations.append(f"{name}: при запуске загружаются {', '.join(result['forbidden'])}")
+    return violations
+
+
+def compare_results(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Сравнивает результаты с базовыми.
+    Регрессией считается падение пропускной способности или рост пиковой памяти больше чем на threshold.
+    Перцентили задержки и время запуска не сравниваются: для значений в единицы микросекунд
+    и десятки миллисекунд они слишком шумные (запуск проверяется бюджетом, см. check_startup).
+
+    Args:
+        current: Текущие результаты (название замера -> показатели)
+        baseline: Базовые результаты в том же формате
+        threshold: Допустимое относительное ухудшение
+
+    Returns:
+        Список описаний регрессий (пустой, если их нет)
+    """
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result.get('rows_per_sec') and base.get('rows_per_sec'):
+            change = result['rows_per_sec'] / base['rows_per_sec'] - 1
+            if change < -threshold:
+                regressions.append(f"{name}: пропускная способность {base['rows_per_sec']:,.0f} -> "
+                                   f"{result['rows_per_sec']:,.0f} строк/сек ({change:+.0%})")
+        if result.get('peak_rss_mb') and base.get('peak_rss_mb'):
+            change = result['peak_rss_mb'] / base['peak_rss_mb'] - 1
+            if change > threshold:
+                regressions.append(f"{name}: пиковая память {base['peak_rss_mb']:,.1f} -> "
+                                   f"{result['peak_rss_mb']:,.1f} МБ ({change:+.0%})")
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    """Выводит результаты замеров таблицей."""
+    startup = {name: result for name, result in results.items() if 'import_ms' in result}
+    if startup:
+        print(f"{'Запуск':<38}{'всего, мс':>14}{'импорты, мс':>14}  Самые долгие импорты, мс")
+        for name, result in startup.items():
+            slowest = ', '.join(f"{module} {ms:g}" for module, ms in result['slowest'].items())
+            print(f"{name:<38}{result['startup_ms']:>14,.1f}{result['import_ms']:>14,.1f}  {slowest}")
+        if len(startup) == len(results):
+            return
+        print()
+
+    print(f"{'Замер':<38}{'строк/сек':>14}{'p50, мкс':>12}{'p99, мкс':>12}{'память, МБ':>12}")
+    for name, result in results.items():
+        if name in startup:
+            continue
+        def column(key, width, spec):
+            value = result.get(key)
+            return f"{value:>{width}{spec}}" if value is not None else f"{'-':>{width}}"
+        print(f"{name:<38}{column('rows_per_sec', 14, ',.0f')}{column('p50_us', 12, ',.1f')}"
+              f"{column('p99_us', 12, ',.1f')}{column('peak_rss_mb', 12, ',.1f')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры производительности генератора данных')
+    parser.add_argument('benchmark', choices=['passwords', 'startup', 'micro', 'frames', 'e2e', 'all'],
+                        help='Название замера: passwords - поштучные и пакетные пароли, startup - запуск коротких '
+                             'команд, micro - функции генерации, frames - валидация и экспорт, '
+                             'e2e - полная генерация, all - startup, micro, frames и e2e')
+    parser.add_argument('-n', type=int, default=10000, help='Количество генерируемых значений')
+    parser.add_argument('--length', type=int, help='Длина пароля')
+    parser.add_argument('--rows', type=int, default=10000, help='Строк в DataFrame для замеров frames')
+    parser.add_argument('--calls', type=int, default=20, help='Повторов каждой операции в замерах frames')
+    parser.add_argument('--formats', nargs='+', choices=EXPORT_FORMATS, help='Форматы экспорта для замеров frames')
+    parser.add_argument('--sizes', type=int, nargs='+', help=f'Размеры полной генерации (по умолчанию: {E2E_SIZES})')
+    parser.add_argument('--stub', action='store_true',
+                        help='Замер e2e с адресами через локальную заглушку Google Maps вместо офлайн-генерации')
+    parser.add_argument('--rps', type=float, default=0,
+                        help='Бюджет запросов к заглушке в секунду для --stub (по умолчанию: 0 - без ограничения)')
+    parser.add_argument('--startup-budget', type=float, default=STARTUP_IMPORT_BUDGET_MS,
+                        help=f'Бюджет времени импортов при запуске коротких команд, мс '
+                             f'(по умолчанию: {STARTUP_IMPORT_BUDGET_MS})')
+    parser.add_argument('--seed', type=int, default=0, help='Сид генерации')
+    parser.add_argument('-o', '--output', type=str, help='Сохранить результаты в JSON-файл')
+    parser.add_argument('--baseline', type=str, help='Сравнить результаты с базовыми из JSON-файла')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Допустимое ухудшение относительно базовых результатов (по умолчанию: 0.1)')
+    args = parser.parse_args()
+
+    # Предупреждения генератора (запасные имена, недоступные локали) не должны смешиваться с результатами
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.benchmark == 'passwords':
+        result = bench_passwords(args.n, args.length)
+        print(f"Поштучно: {result['scalar_per_sec']:,.0f} паролей/сек")
+        print(f"Пакетно:  {result['bulk_per_sec']:,.0f} паролей/сек")
+        print(f"Ускорение: {result['speedup']:.1f}x")
+        return
+
+    results = {}
+    if args.benchmark in ['startup', 'all']:
+        results.update(bench_startup(budget_ms=args.startup_budget))
+    if args.benchmark in ['micro', 'all']:
+        results.update(bench_micro(args.n, args.seed))
+    if args.benchmark in ['frames', 'all']:
+        results.update(bench_frames(args.rows, args.calls, args.formats, args.seed))
+    if args.benchmark in ['e2e', 'all']:
+        results.update(bench_e2e(args.sizes, args.seed, args.stub, args.rps))
+    print_results(results)
+
+    if args.output:
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'peak_rss_mb': peak_rss_mb(),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+
+    violations = check_startup(results)
+    if violations:
+        print("\nПревышен бюджет запуска:")
+        for violation in violations:
+            print(f"- {violation}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессии относительно {args.baseline}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print(f"\nРегрессий относительно {args.baseline} не обнаружено")
+
+    if violations:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
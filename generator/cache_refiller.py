@@ -0,0 +1,242 @@
+# cache_refiller.py
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple, Iterable, Deque
+
+from config import CACHE_REFILL_CONFIG
+from gmaps_api import fetch_new_address, claim_address
+from metrics import inc
+from rate_limit import QuotaExceededError
+
+logger = logging.getLogger(__name__)
+
+_refiller: Optional['CacheRefiller'] = None
+_refiller_lock = threading.Lock()
+
+
+class CacheRefiller:
+    """
+    Фоновое пополнение адресов для режима online.
+
+    Для каждой страны поддерживается очередь готовых адресов: они уже получены из Google Maps API
+    и добавлены в кэш адресов, но еще не использованы в текущей генерации. Когда очередь страны
+    становится короче нижней границы (low_water), фоновый поток запрашивает адреса, пока очередь
+    не достигнет верхней границы (high_water). Запросы проходят через общий ограничитель,
+    поэтому пополнение укладывается в бюджет запросов, а генерация записей берет адрес из очереди
+    и не ждет сети.
+
+    Страны регистрируются при первом обращении (take) или заранее (register).
+    """
+
+    def __init__(self, low_water: int, high_water: int, workers: int = 1,
+                 country_marks: Optional[Dict[str, Tuple[int, int]]] = None,
+                 idle_interval: float = 1.0, max_failures: int = 10, failure_pause: float = 30.0):
+        """
+        Args:
+            low_water: Нижняя граница очереди готовых адресов страны
+            high_water: Верхняя граница, до которой очередь пополняется
+            workers: Количество одновременных запросов пополнения
+            country_marks: Границы для отдельных стран: код страны -> (low_water, high_water)
+            idle_interval: Период проверки очередей без пополнения, секунды
+            max_failures: Неудачных запросов подряд, после которых пополнение страны приостанавливается
+            failure_pause: Длительность такой паузы, секунды
+        """
+        for low, high in [(low_water, high_water), *(country_marks or {}).values()]:
+            if not 0 <= low < high:
+                raise ValueError("Нижняя граница пополнения должна быть неотрицательной и меньше верхней.")
+        if workers < 1:
+            raise ValueError("Количество потоков пополнения должно быть не меньше 1.")
+
+        self.low_water = low_water
+        self.high_water = high_water
+        self.workers = workers
+        self.country_marks = dict(country_marks or {})
+        self.idle_interval = idle_interval
+        self.max_failures = max_failures
+        self.failure_pause = failure_pause
+
+        self._ready: Dict[str, Deque[str]] = {}
+        self._filling: set = set()
+        self._failures: Dict[str, int] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._rng = random.Random()
+
+    def marks(self, country_code: str) -> Tuple[int, int]:
+        """Возвращает (нижнюю, верхнюю) границы очереди страны."""
+        return self.country_marks.get(country_code, (self.low_water, self.high_water))
+
+    def register(self, country_codes: Iterable[str]):
+        """Добавляет страны для пополнения (например, перед началом генерации)."""
+        with self._lock:
+            for country_code in country_codes:
+                self._ready.setdefault(country_code, deque())
+        self._wake.set()
+
+    def depth(self, country_code: str) -> int:
+        """Количество готовых адресов страны."""
+        queue = self._ready.get(country_code)
+        return len(queue) if queue is not None else 0
+
+    def take(self, country_code: str) -> Optional[str]:
+        """
+        Берет готовый адрес страны и помечает его как использованный.
+
+        Returns:
+            Адрес или None, если очередь страны пуста
+        """
+        queue = self._ready.get(country_code)
+        if queue is None:
+            self.register([country_code])
+            inc('refill_takes_total', result='miss')
+            return None
+
+        while True:
+            try:
+                address = queue.popleft()
+            except IndexError:
+                break
+            if claim_address(address):
+                if len(queue) < self.marks(country_code)[0]:
+                    self._wake.set()
+                inc('refill_takes_total', result='hit')
+                return address
+            inc('address_duplicates_total', source='refill')
+
+        self._wake.set()
+        inc('refill_takes_total', result='miss')
+        return None
+
+    def _jobs(self) -> List[str]:
+        """
+        Выбирает страны для следующего раунда запросов (не больше workers),
+        по очереди между странами с недостающими адресами.
+        """
+        now = time.monotonic()
+        missing: Dict[str, int] = {}
+        with self._lock:
+            for country_code, queue in self._ready.items():
+                if self._paused_until.get(country_code, 0) > now:
+                    continue
+                low, high = self.marks(country_code)
+                # Пополнение начинается ниже нижней границы и продолжается до верхней
+                if len(queue) < low:
+                    self._filling.add(country_code)
+                elif len(queue) >= high:
+                    self._filling.discard(country_code)
+                if country_code in self._filling:
+                    missing[country_code] = high - len(queue)
+
+        jobs: List[str] = []
+        while missing and len(jobs) < self.workers:
+            for country_code in list(missing):
+                jobs.append(country_code)
+                missing[country_code] -= 1
+                if missing[country_code] <= 0:
+                    del missing[country_code]
+                if len(jobs) >= self.workers:
+                    break
+        return jobs
+
+    def _fetch(self, country_code: str) -> Optional[str]:
+        try:
+            address = fetch_new_address(country_code, self._rng)
+        except QuotaExceededError:
+            raise
+        except Exception as e:
+            logger.exception(f"Ошибка фонового пополнения адресов для страны {country_code}: {e}")
+            address = None
+        inc('refill_fetches_total', result='ok' if address else 'empty')
+        return address
+
+    def _record(self, country_code: str, address: Optional[str]):
+        with self._lock:
+            if address:
+                self._ready[country_code].append(address)
+                self._failures[country_code] = 0
+                return
+            failures = self._failures.get(country_code, 0) + 1
+            self._failures[country_code] = failures
+            if failures >= self.max_failures:
+                logger.warning(f"Фоновое пополнение адресов для страны {country_code} приостановлено "
+                               f"на {self.failure_pause} сек. после {failures} неудачных запросов")
+                self._paused_until[country_code] = time.monotonic() + self.failure_pause
+                self._failures[country_code] = 0
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='refill') as executor:
+            while not self._stopped.is_set():
+                jobs = self._jobs()
+                if not jobs:
+                    self._wake.wait(self.idle_interval)
+                    self._wake.clear()
+                    continue
+                try:
+                    for country_code, address in zip(jobs, executor.map(self._fetch, jobs)):
+                        self._record(country_code, address)
+                except QuotaExceededError as e:
+                    logger.error(f"{e}. Фоновое пополнение адресов остановлено.")
+                    return
+                except RuntimeError:
+                    # Интерпретатор завершает работу: пулы потоков больше не принимают задачи
+                    return
+
+    def start(self):
+        """Запускает фоновый поток пополнения."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='cache-refiller', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливает фоновый поток (текущий раунд запросов завершается)."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def get_cache_refiller() -> CacheRefiller:
+    """Возвращает общий для процесса механизм пополнения, запуская его при первом обращении."""
+    global _refiller
+    if _refiller is None:
+        with _refiller_lock:
+            if _refiller is None:
+                refiller = CacheRefiller(
+                    CACHE_REFILL_CONFIG['low_water'],
+                    CACHE_REFILL_CONFIG['high_water'],
+                    CACHE_REFILL_CONFIG['workers'],
+                    CACHE_REFILL_CONFIG['country_marks'],
+                    CACHE_REFILL_CONFIG['idle_interval'],
+                    CACHE_REFILL_CONFIG['max_failures'],
+                    CACHE_REFILL_CONFIG['failure_pause'],
+                )
+                refiller.start()
+                atexit.register(stop_cache_refiller)
+                logger.info(f"Запущено фоновое пополнение адресов: границы {refiller.low_water}-"
+                            f"{refiller.high_water}, потоков {refiller.workers}")
+                _refiller = refiller
+    return _refiller
+
+
+def stop_cache_refiller(timeout: Optional[float] = 5.0):
+    """Останавливает общий механизм пополнения (если запущен)."""
+    global _refiller
+    with _refiller_lock:
+        if _refiller is not None:
+            _refiller.stop(timeout)
+            _refiller = None
+
+
+def take_ready_address(country_code: str) -> Optional[str]:
+    """Берет готовый адрес страны из очереди пополнения (см. CacheRefiller.take)."""
+    return get_cache_refiller().take(country_code)
@@ -4,13 +4,46 @@ import pandas as pd
 import logging
 import json
 import os
-from typing import Optional, Union, List, Dict, Any
+from typing import Optional, Union, List, Dict, Any, Iterable
 import csv
 from io import StringIO
 
+from sql_export import SQLDumpWriter, save_sql_dump
+from arrow_export import ArrowBatchWriter, save_arrow_file
+from json_export import NDJSONWriter, JSONArrayWriter
+from excel_export import ExcelStreamWriter
+from compressed_io import open_output, split_compression
+from config import FILE_EXTENSIONS, EXPORT_FORMATS
+
 logger = logging.getLogger(__name__)
 
 
+# Форматы, в которые можно дописывать данные партиями
+STREAMING_FORMATS = ['csv', 'tsv', 'json', 'ndjson', 'excel', 'sql', 'parquet', 'feather']
+
+# Форматы с собственным состоянием записи (заголовок файла, транзакция, группы строк):
+# формат -> фабрика объекта с методами write(DataFrame) и close() и счетчиком rows
+BATCH_WRITERS = {
+    'json': lambda filename, append=False: JSONArrayWriter(filename, append=append),
+    'ndjson': lambda filename, append=False: NDJSONWriter(filename, append=append),
+    'excel': lambda filename, append=False: ExcelStreamWriter(filename, append=append),
+    'sql': lambda filename, append=False: SQLDumpWriter(filename, append=append),
+    'parquet': lambda filename, append=False: ArrowBatchWriter(filename, 'parquet', append=append),
+    'feather': lambda filename, append=False: ArrowBatchWriter(filename, 'feather', append=append),
+}
+
+# Текстовые форматы, которые можно сжимать на лету (имя файла с .gz, .zst или .xz)
+COMPRESSIBLE_FORMATS = ['csv', 'tsv', 'json', 'ndjson', 'sql']
+
+
+def check_compression(filename: str, format: str) -> None:
+    """Проверяет, что сжатие, заданное расширением файла, поддерживается форматом."""
+    compression = split_compression(filename)[1]
+    if compression is not None and format not in COMPRESSIBLE_FORMATS:
+        raise ValueError(f"Формат {format} не поддерживает сжатие {compression} "
+                         f"(сжатие доступно для {', '.join(COMPRESSIBLE_FORMATS)})")
+
+
 def copy_to_clipboard(data_frame: pd.DataFrame, with_header: bool = False, format_csv: bool = False) -> None:
     """
     Копирует содержимое DataFrame в буфер обмена.
@@ -44,7 +77,9 @@ def save_to_file(data: Union[pd.DataFrame, List[Dict[str, Any]]],
     Args:
         data: DataFrame или список словарей для сохранения
         filename: Имя файла
-        format: Формат файла (csv, json, excel). Если None, определяется по расширению файла.
+        format: Формат файла (csv, json, ndjson, excel, sql, parquet, feather).
+            Если None, определяется по расширению файла.
+            Текстовые форматы сжимаются, если имя файла оканчивается на .gz, .zst или .xz.
         sep: Разделитель для CSV файлов
     """
     # Преобразуем список словарей в DataFrame, если необходимо
@@ -53,33 +88,117 @@ def save_to_file(data: Union[pd.DataFrame, List[Dict[str, Any]]],
 
     # Определяем формат по расширению файла, если не указан
     if format is None:
-        ext = os.path.splitext(filename)[1].lower()
-        if ext == '.csv':
-            format = 'csv'
-        elif ext == '.json':
-            format = 'json'
-        elif ext in ['.xlsx', '.xls']:
-            format = 'excel'
-        elif ext == '.tsv':
-            format = 'csv'
-            sep = '\t'
-        else:
-            format = 'csv'  # По умолчанию - CSV
+        format, sep = detect_format(filename, sep)
 
     try:
+        check_compression(filename, format)
         # Сохраняем данные в соответствующем формате
-        if format == 'csv':
-            data.to_csv(filename, index=False, sep=sep)
-        elif format == 'json':
-            data.to_json(filename, orient='records', indent=2)
-        elif format == 'excel':
-            data.to_excel(filename, index=False)
+        if format in ['csv', 'tsv']:
+            with open_output(filename, 'w', encoding='utf-8', newline='') as f:
+                data.to_csv(f, index=False, sep=sep)
+        elif format in ['json', 'ndjson', 'excel']:
+            with BATCH_WRITERS[format](filename) as writer:
+                writer.write(data)
+        elif format == 'sql':
+            save_sql_dump(data, filename)
+        elif format in ['parquet', 'feather']:
+            save_arrow_file(data, filename, format)
 
         logger.info(f"Данные успешно сохранены в файл {filename} ({len(data)} строк)")
     except Exception as e:
         logger.error(f"Ошибка при сохранении данных в файл {filename}: {e}")
 
 
+def detect_format(filename: str, sep: str = ",") -> tuple:
+    """
+    Определяет формат файла и разделитель по расширению имени файла.
+    Расширение сжатия (.gz, .zst, .xz) не учитывается: users.csv.gz - это CSV.
+
+    Args:
+        filename: Имя файла
+        sep: Разделитель, используемый для CSV по умолчанию
+
+    Returns:
+        Кортеж (формат, разделитель)
+    """
+    ext = os.path.splitext(split_compression(filename)[0])[1].lower()
+    if ext == '.csv':
+        return 'csv', sep
+    elif ext == '.json':
+        return 'json', sep
+    elif ext in ['.ndjson', '.jsonl']:
+        return 'ndjson', sep
+    elif ext in ['.xlsx', '.xls']:
+        return 'excel', sep
+    elif ext == '.sql':
+        return 'sql', sep
+    elif ext in ['.parquet', '.pq']:
+        return 'parquet', sep
+    elif ext in ['.feather', '.arrow', '.ipc']:
+        return 'feather', sep
+    elif ext == '.tsv':
+        return 'csv', '\t'
+    return 'csv', sep  # По умолчанию - CSV
+
+
+def save_batches_to_file(batches: Iterable[pd.DataFrame],
+                         filename: str,
+                         format: str = None,
+                         sep: str = ",",
+                         append: bool = False) -> int:
+    """
+    Потоково сохраняет партии данных в файл, не объединяя их в памяти.
+    Существующий файл перезаписывается, если не указан append.
+
+    Args:
+        batches: Итерируемый объект с партиями данных (DataFrame)
+        filename: Имя файла
+        format: Формат файла (csv, tsv, json, ndjson, excel, sql, parquet, feather).
+            Если None, определяется по расширению файла.
+            Текстовые форматы сжимаются, если имя файла оканчивается на .gz, .zst или .xz.
+        sep: Разделитель для CSV файлов
+        append: Дописывать в существующий файл (например, при продолжении прерванной генерации).
+            Заголовок CSV не повторяется, если файл уже содержит данные.
+
+    Returns:
+        Количество записанных строк
+    """
+    if format is None:
+        format, sep = detect_format(filename, sep)
+    check_compression(filename, format)
+
+    if format in BATCH_WRITERS:
+        with BATCH_WRITERS[format](filename, append=append) as writer:
+            for batch in batches:
+                writer.write(batch)
+                logger.debug(f"Партия из {len(batch)} строк дописана в файл {filename}")
+        logger.info(f"Данные успешно сохранены в файл {filename} ({writer.rows} строк)")
+        return writer.rows
+
+    if format not in ['csv', 'tsv']:
+        raise ValueError(f"Формат {format} не поддерживает дозапись партиями")
+
+    has_data = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+    total_rows = 0
+    columns = None
+    # Файл открывается один раз на все партии (для сжатых файлов - один поток сжатия)
+    with open_output(filename, 'a' if append else 'w', encoding='utf-8', newline='') as f:
+        for batch in batches:
+            if batch is None or batch.empty:
+                continue
+            # Приводим все партии к столбцам первой партии, чтобы строки не сдвигались
+            if columns is None:
+                columns = list(batch.columns)
+            else:
+                batch = batch.reindex(columns=columns)
+            batch.to_csv(f, index=False, sep=sep, header=total_rows == 0 and not has_data)
+            total_rows += len(batch)
+            logger.debug(f"Партия из {len(batch)} строк дописана в файл {filename}")
+
+    logger.info(f"Данные успешно сохранены в файл {filename} ({total_rows} строк)")
+    return total_rows
+
+
 def load_from_clipboard() -> Optional[pd.DataFrame]:
     """
     Загружает данные из буфера обмена в DataFrame.
@@ -128,31 +247,53 @@ def load_from_clipboard() -> Optional[pd.DataFrame]:
         return None
 
 
-def export_data(data_frame: pd.DataFrame,
+def export_data(data_frame: Union[pd.DataFrame, Iterable[pd.DataFrame]],
                 export_format: str = 'clipboard',
                 filename: Optional[str] = None,
-                include_header: bool = True) -> None:
+                include_header: bool = True,
+                append: bool = False) -> None:
     """
     Экспортирует данные в различных форматах.
 
+    Вместо DataFrame можно передать итерируемый объект с партиями (например, генератор
+    из data_generator.iter_user_batches). Для форматов из STREAMING_FORMATS партии дописываются
+    в файл по мере поступления, поэтому память не зависит от общего объема данных.
+    Для остальных форматов партии предварительно объединяются.
+
     Args:
-        data_frame: DataFrame для экспорта
-        export_format: Формат экспорта ('clipboard', 'csv', 'tsv', 'json', 'excel')
+        data_frame: DataFrame или итерируемый объект с партиями DataFrame для экспорта
+        export_format: Формат экспорта ('clipboard', 'csv', 'tsv', 'json', 'ndjson', 'excel', 'sql',
+            'parquet', 'feather')
         filename: Имя файла (только для форматов, отличных от 'clipboard')
         include_header: Включать ли заголовки столбцов (только для 'clipboard')
+        append: Дописывать данные в существующий файл (только для потоковых форматов)
     """
+    is_stream = not isinstance(data_frame, pd.DataFrame)
+
+    if is_stream and export_format not in STREAMING_FORMATS:
+        # Формат не поддерживает дозапись - собираем партии в один DataFrame
+        logger.warning(f"Формат {export_format} не поддерживает потоковую запись, партии будут объединены в памяти")
+        batches = [batch for batch in data_frame if batch is not None and not batch.empty]
+        data_frame = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+        is_stream = False
+
     if export_format == 'clipboard':
         copy_to_clipboard(data_frame, with_header=include_header)
-    elif export_format in ['csv', 'tsv', 'json', 'excel']:
+    elif export_format in FILE_EXTENSIONS:
         if filename is None:
             # Генерируем имя файла, если не указано
             timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
-            extensions = {'csv': '.csv', 'tsv': '.tsv', 'json': '.json', 'excel': '.xlsx'}
-            filename = f"data_export_{timestamp}{extensions.get(export_format, '.csv')}"
+            filename = f"data_export_{timestamp}{FILE_EXTENSIONS.get(export_format, '.csv')}"
 
         # Определяем разделитель для CSV/TSV
         sep = '\t' if export_format == 'tsv' else ','
 
-        save_to_file(data_frame, filename, format=export_format, sep=sep)
+        if is_stream:
+            save_batches_to_file(data_frame, filename, format=export_format, sep=sep, append=append)
+        elif append:
+            # Дозапись одного DataFrame - частный случай потоковой записи из одной партии
+            save_batches_to_file([data_frame], filename, format=export_format, sep=sep, append=True)
+        else:
+            save_to_file(data_frame, filename, format=export_format, sep=sep)
     else:
         logger.error(f"Неизвестный формат экспорта: {export_format}")
\ No newline at end of file
@@ -0,0 +1,189 @@
+# compressed_io.py
+import gzip
+import io
+import logging
+import lzma
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Tuple, Deque, IO
+
+from config import COMPRESSION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Расширения сжатых файлов: расширение -> алгоритм сжатия
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+    '.xz': 'xz',
+}
+
+
+def configure_compression(threads: Optional[int] = None, level: Optional[int] = None):
+    """
+    Настраивает сжатие выходных файлов.
+
+    Args:
+        threads: Количество потоков сжатия (0 - по числу процессоров, 1 - без параллельного сжатия)
+        level: Уровень сжатия для всех алгоритмов (gzip 1-9, zstd 1-22, xz 0-9)
+    """
+    if threads is not None:
+        if threads < 0:
+            raise ValueError("Количество потоков сжатия не может быть отрицательным.")
+        COMPRESSION_CONFIG['threads'] = threads
+    if level is not None:
+        COMPRESSION_CONFIG['gzip_level'] = level
+        COMPRESSION_CONFIG['zstd_level'] = level
+        COMPRESSION_CONFIG['xz_preset'] = level
+
+
+def split_compression(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    Отделяет расширение сжатия от имени файла.
+
+    Returns:
+        Кортеж (имя файла без расширения сжатия, алгоритм сжатия или None),
+        например 'users.csv.gz' -> ('users.csv', 'gzip')
+    """
+    base, ext = os.path.splitext(filename)
+    compression = COMPRESSION_EXTENSIONS.get(ext.lower())
+    if compression is None:
+        return filename, None
+    return base, compression
+
+
+def compression_threads() -> int:
+    """Возвращает количество потоков сжатия с учетом значения 0 (по числу процессоров)."""
+    threads = COMPRESSION_CONFIG['threads']
+    return threads if threads > 0 else (os.cpu_count() or 1)
+
+
+def _gzip_block(data: bytes, level: int) -> bytes:
+    """Сжимает блок в отдельный gzip-член (zlib освобождает GIL на время сжатия)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter(io.BufferedIOBase):
+    """
+    Многопоточная запись gzip по блокам (как pigz).
+
+    Данные делятся на блоки по block_size байт, каждый блок сжимается в пуле потоков
+    в отдельный gzip-член, члены записываются в файл в исходном порядке.
+    Файл из нескольких членов - корректный gzip (RFC 1952), его читают gzip, zcat и pandas.
+    Степень сжатия немного ниже однопоточной, так как словарь не переносится между блоками.
+    """
+
+    def __init__(self, filename: str, append: bool = False, level: Optional[int] = None,
+                 threads: Optional[int] = None, block_size: Optional[int] = None):
+        super().__init__()
+        self.level = level if level is not None else COMPRESSION_CONFIG['gzip_level']
+        self.threads = threads or compression_threads()
+        self.block_size = block_size or COMPRESSION_CONFIG['block_size']
+        self._file: IO[bytes] = open(filename, 'ab' if append else 'wb')
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='gzip')
+        self._buffer = bytearray()
+        self._pending: Deque[Future] = deque()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("Запись в закрытый файл")
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._executor.submit(_gzip_block, block, self.level))
+        # Ограничиваем число блоков в работе, чтобы память не росла при медленном диске
+        while len(self._pending) > self.threads * 2:
+            self._file.write(self._pending.popleft().result())
+
+    def _write_done(self, wait: bool):
+        while self._pending and (wait or self._pending[0].done()):
+            self._file.write(self._pending.popleft().result())
+
+    def flush(self):
+        """Записывает в файл уже сжатые блоки; неполный блок остается в буфере до close()."""
+        if not self.closed:
+            self._write_done(wait=False)
+            self._file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            self._write_done(wait=True)
+        finally:
+            self._executor.shutdown(wait=True)
+            super().close()
+            self._file.close()
+
+
+def _open_binary(filename: str, compression: str, append: bool) -> IO[bytes]:
+    mode = 'ab' if append else 'wb'
+    threads = compression_threads()
+
+    if compression == 'gzip':
+        if threads > 1:
+            return ParallelGzipWriter(filename, append=append, threads=threads)
+        return gzip.open(filename, mode, compresslevel=COMPRESSION_CONFIG['gzip_level'])
+
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Для сжатия zstd установите zstandard: pip install zstandard")
+        # threads=0 в zstandard - однопоточное сжатие, иначе - число рабочих потоков
+        compressor = zstandard.ZstdCompressor(level=COMPRESSION_CONFIG['zstd_level'],
+                                              threads=threads if threads > 1 else 0)
+        return compressor.stream_writer(open(filename, mode), closefd=True)
+
+    if compression == 'xz':
+        # Модуль lzma не поддерживает многопоточное сжатие, xz всегда сжимается в одном потоке
+        return lzma.open(filename, mode, preset=COMPRESSION_CONFIG['xz_preset'])
+
+    raise ValueError(f"Неизвестный алгоритм сжатия: {compression}")
+
+
+def open_output(filename: str, mode: str = 'w', encoding: Optional[str] = 'utf-8',
+                newline: Optional[str] = None) -> IO:
+    """
+    Открывает файл для записи; если имя оканчивается на .gz, .zst или .xz,
+    данные сжимаются на лету.
+
+    При дозаписи ('a') в сжатый файл добавляется новый gzip-член, кадр zstd или поток xz,
+    поэтому файл остается читаемым целиком.
+
+    Args:
+        filename: Имя файла
+        mode: 'w', 'a' (текстовый режим) или 'wb', 'ab' (двоичный режим)
+        encoding: Кодировка для текстового режима
+        newline: Обработка переводов строки для текстового режима (как в open)
+
+    Returns:
+        Файловый объект
+    """
+    binary = 'b' in mode
+    compression = split_compression(filename)[1]
+    if compression is None:
+        if binary:
+            return open(filename, mode)
+        return open(filename, mode, encoding=encoding, newline=newline)
+
+    stream = _open_binary(filename, compression, append='a' in mode)
+    if binary:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding or 'utf-8', newline=newline)
@@ -10,8 +10,8 @@ load_dotenv()
 
 # Получение API-ключа Google Maps
 GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY")
-if not GOOGLE_MAPS_API_KEY:
-    logger.warning("GOOGLE_MAPS_API_KEY не установлен в переменных окружения. Некоторые функции будут недоступны.")
+# Базовый URL Google Maps API (например, адрес локальной заглушки gmaps_stub.py); None - настоящий API
+GOOGLE_MAPS_BASE_URL = os.environ.get("GOOGLE_MAPS_BASE_URL")
 
 # Словарь локализации по странам, расширенный и проверенный список
 COUNTRY_LOCALES = {
@@ -99,7 +99,7 @@ try:
     COUNTRY_NAMES = {country.alpha_2: country.name for country in pycountry.countries}
     logger.info("Используются данные о странах из библиотеки pycountry")
 except ImportError:
-    logger.warning("Библиотека pycountry не установлена. Используются предопределенные данные о странах.")
+    logger.info("Библиотека pycountry не установлена. Используются предопределенные данные о странах.")
     # Предопределенные названия стран (на случай, если pycountry не установлен)
     COUNTRY_NAMES = {
         'AT': 'Austria',
@@ -633,6 +633,73 @@ CITY_COORDINATES = {
 }
 
 
+# Названия городов из CITY_COORDINATES (используются для офлайн-генерации адресов)
+CITY_NAMES = {
+    'US': ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Atlanta', 'Philadelphia', 'Washington DC', 'Boston', 'Dallas', 'San Francisco'],
+    'GB': ['London', 'Manchester', 'Edinburgh', 'Birmingham', 'Bristol'],
+    'DE': ['Berlin', 'Munich', 'Frankfurt', 'Hamburg', 'Dusseldorf'],
+    'FR': ['Paris', 'Marseille', 'Lyon', 'Bordeaux', 'Montpellier'],
+    'AT': ['Vienna', 'Salzburg', 'Graz', 'Linz', 'Sankt Pölten'],
+    'BE': ['Brussels', 'Antwerp', 'Mons', 'Ghent', 'Liège'],
+    'BG': ['Sofia', 'Plovdiv', 'Varna', 'Burgas', 'Ruse'],
+    'CH': ['Zurich', 'Geneva', 'Bern', 'Basel', 'Lausanne'],
+    'CY': ['Nicosia', 'Limassol', 'Larnaca', 'Paphos', 'Kyrenia'],
+    'CZ': ['Prague', 'Brno', 'Ostrava', 'Pilsen', 'Ústí nad Labem'],
+    'DK': ['Copenhagen', 'Aarhus', 'Odense', 'Aalborg', 'Vejle'],
+    'EE': ['Tallinn', 'Tartu', 'Narva', 'Pärnu'],
+    'ES': ['Madrid', 'Barcelona', 'Seville', 'Valencia', 'Granada'],
+    'FI': ['Helsinki', 'Tampere', 'Turku', 'Oulu', 'Mikkeli'],
+    'GR': ['Athens', 'Thessaloniki', 'Heraklion', 'Patras', 'Larissa'],
+    'HR': ['Zagreb', 'Split', 'Rijeka', 'Pula', 'Dubrovnik'],
+    'HU': ['Budapest', 'Győr', 'Szeged', 'Pécs', 'Debrecen'],
+    'IE': ['Dublin', 'Cork', 'Galway', 'Limerick', 'Belfast'],
+    'IT': ['Rome', 'Milan', 'Florence', 'Naples', 'Catania'],
+    'LT': ['Vilnius', 'Kaunas', 'Klaipėda', 'Siauliai', 'Alytus'],
+    'LU': ['Luxembourg City', 'Esch-sur-Alzette', 'Ettelbrück', 'Dudelange', 'Echternach'],
+    'LV': ['Riga', 'Liepāja', 'Valmiera', 'Daugavpils', 'Jelgava'],
+    'MT': ['Valletta', 'Sliema', 'Mdina', 'Birkirkara', "St. Julian's"],
+    'NL': ['Amsterdam', 'Rotterdam', 'Utrecht', 'Leiden', 'Breda'],
+    'NO': ['Oslo', 'Bergen', 'Trondheim', 'Tromsø', 'Stavanger'],
+    'PL': ['Warsaw', 'Krakow', 'Wroclaw', 'Szczecin', 'Gdansk'],
+    'PT': ['Lisbon', 'Porto', 'Faro', 'Évora', 'Funchal'],
+    'RO': ['Bucharest', 'Timișoara', 'Cluj-Napoca', 'Iași', 'Brașov'],
+    'SE': ['Stockholm', 'Gothenburg', 'Malmö', 'Uppsala', 'Linköping'],
+    'SI': ['Ljubljana', 'Maribor', 'Koper', 'Celje', 'Kranj'],
+    'SK': ['Bratislava', 'Košice', 'Nitra', 'Banská Bystrica', 'Žilina'],
+    'AE': ['Dubai', 'Abu Dhabi', 'Sharjah', 'Ras Al Khaimah', 'Al Ain'],
+    'CN': ['Beijing', 'Shanghai', 'Shenzhen', 'Wuhan', 'Guangzhou'],
+    'HK': ['Hong Kong', 'Kowloon', 'Sha Tin', 'Tung Chung'],
+    'ID': ['Jakarta', 'Yogyakarta', 'Denpasar', 'Palembang', 'Makassar'],
+    'IL': ['Tel Aviv', 'Jerusalem', 'Haifa', 'Beersheba', 'Eilat'],
+    'IN': ['New Delhi', 'Mumbai', 'Bangalore', 'Kolkata', 'Chennai'],
+    'JP': ['Tokyo', 'Osaka', 'Kyoto', 'Sapporo', 'Fukuoka'],
+    'KR': ['Seoul', 'Busan', 'Daegu', 'Incheon', 'Gwangju'],
+    'MY': ['Kuala Lumpur', 'Penang', 'Johor Bahru', 'Kuantan', 'Malacca'],
+    'PH': ['Manila', 'Cebu City', 'Davao City', 'Quezon City', 'Angeles City'],
+    'SA': ['Riyadh', 'Jeddah', 'Mecca', 'Medina', 'Dammam'],
+    'SG': ['Singapore'],
+    'TH': ['Bangkok', 'Chiang Mai', 'Phuket', 'Pattaya', 'Samut Prakan'],
+    'TR': ['Istanbul', 'Ankara', 'Izmir', 'Antalya', 'Bursa'],
+    'TW': ['Taipei', 'Kaohsiung', 'Taichung', 'Tainan', 'Taoyuan'],
+    'VN': ['Hanoi', 'Ho Chi Minh City', 'Da Nang', 'Vung Tau', 'Hai Phong'],
+    'AR': ['Buenos Aires', 'Córdoba', 'Mendoza', 'La Plata', 'Santa Fe'],
+    'BR': ['São Paulo', 'Rio de Janeiro', 'Brasília', 'Belo Horizonte', 'Manaus'],
+    'CA': ['Toronto', 'Montreal', 'Vancouver', 'Calgary', 'Edmonton'],
+    'CL': ['Santiago', 'Antofagasta', 'Valparaíso', 'Concepción', 'Punta Arenas'],
+    'CO': ['Bogotá', 'Medellín', 'Cali', 'Barranquilla', 'Cúcuta'],
+    'MX': ['Mexico City', 'Guadalajara', 'Monterrey', 'Cancún', 'Puebla'],
+    'PE': ['Lima', 'Arequipa', 'Trujillo', 'Cusco', 'Chiclayo'],
+    'AU': ['Sydney', 'Melbourne', 'Brisbane', 'Perth', 'Adelaide'],
+    'NZ': ['Auckland', 'Wellington', 'Christchurch', 'Dunedin', 'Invercargill'],
+    'EG': ['Cairo', 'Alexandria', 'Port Said', 'Luxor', 'Hurghada'],
+    'ZA': ['Cape Town', 'Johannesburg', 'Durban', 'Pretoria', 'Port Elizabeth'],
+    'BY': ['Minsk', 'Vitebsk', 'Grodno', 'Gomel', 'Mogilev'],
+    'GE': ['Tbilisi', 'Batumi', 'Kutaisi', 'Sukhumi', 'Rustavi'],
+    'KZ': ['Almaty', 'Astana', 'Kyzylorda', 'Ust-Kamenogorsk'],
+    'RU': ['Moscow', 'Saint Petersburg', 'Yekaterinburg', 'Novosibirsk', 'Nizhny Novgorod'],
+    'UA': ['Kiev', 'Lviv', 'Odessa', 'Donetsk', 'Kharkiv'],
+}
+
 # Загрузка дополнительных координат городов из файла или API, если они не определены
 def load_additional_coordinates():
     """
@@ -684,6 +751,18 @@ USER_GEN_CONFIG = {
     ],
 }
 
+# Пулы имен по локалям (name_pools.py)
+NAME_POOL_CONFIG = {
+    'cache_path': None,  # Файл кэша пулов между запусками (например, 'name_pools.json'); None - без кэша
+    'min_size': 10,  # Минимум имен и фамилий в ASCII, иначе используется запасная локаль
+}
+
+# Режимы получения адресов:
+#   online  - кэш и Google Maps API
+#   offline - только локальная генерация, без запросов к API
+#   hybrid  - кэш, затем локальная генерация, затем Google Maps API
+ADDRESS_MODES = ['online', 'offline', 'hybrid']
+
 # Настройки для Google Maps API
 GMAPS_CONFIG = {
     'max_retries': 5,
@@ -691,6 +770,144 @@ GMAPS_CONFIG = {
     'language': 'en',
     'place_types': ['street_address', 'premise', 'subpremise'],
     'required_components': ['street_number', 'route', 'postal_code', 'locality'],
+    'max_concurrency': 20,  # Максимум одновременных запросов адресов
+    'requests_per_second': 10,  # Общий бюджет запросов к API в секунду (0 - без ограничения)
+    'address_mode': 'online',  # online, offline или hybrid (кэш, затем офлайн-генерация, затем API)
+    'base_url': GOOGLE_MAPS_BASE_URL,  # None - https://maps.googleapis.com
+}
+
+# Настройки локальной заглушки Google Maps (gmaps_stub.py)
+GMAPS_STUB_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'latency_ms': 100,  # Медиана задержки ответа
+    'distribution': 'lognormal',  # fixed, uniform или lognormal
+    'jitter': 0.5,  # uniform: доля от latency_ms в обе стороны; lognormal: сигма логарифма
+    'error_rate': 0.0,  # Доля ответов UNKNOWN_ERROR
+    'http_error_rate': 0.0,  # Доля ответов HTTP 503
+    'over_limit_rate': 0.0,  # Доля ответов OVER_QUERY_LIMIT
+    'qps': 0,  # Лимит запросов в секунду, сверх него - OVER_QUERY_LIMIT (0 - без лимита)
+    'results_per_search': 20,
+    'upstream': 'https://maps.googleapis.com',  # Настоящий API для записи ответов
+}
+
+# Ограничение запросов к Google Maps API по конечным точкам
+RATE_LIMIT_CONFIG = {
+    'burst': 1,  # Допустимый всплеск запросов сверх среднего темпа
+    'endpoints': {
+        # requests_per_second: None - только общий бюджет GMAPS_CONFIG['requests_per_second']
+        # daily_quota: None - без ограничения (запросы все равно учитываются)
+        'places': {'requests_per_second': None, 'burst': None, 'daily_quota': None},  # Places Text Search
+        'details': {'requests_per_second': None, 'burst': None, 'daily_quota': None},  # Place Details
+    },
+    'quota_path': 'gmaps_quota.db',  # Файл учета дневной квоты (None - без учета)
+    'over_limit_pause': 2.0,  # Пауза конечной точки после ответа OVER_QUERY_LIMIT, секунды
+    'max_over_limit_retries': 5,  # Повторов одного запроса после OVER_QUERY_LIMIT
+}
+
+# Постоянный кэш ответов Google Maps API (поиск мест и подробности о месте)
+RESPONSE_CACHE_CONFIG = {
+    'path': 'gmaps_responses.db',  # None - кэш только в памяти процесса
+    # Время жизни записей в секундах (None - без ограничения).
+    # Условия Google Maps Platform разрешают временно хранить содержимое ответов не дольше 30 дней.
+    'ttl': {
+        'places': 30 * 24 * 3600,
+        'details': 30 * 24 * 3600,
+    },
+    'max_entries': 200000,  # Максимум записей, далее вытесняются давно не использованные
+}
+
+# Поддерживаемые форматы экспорта и расширения файлов для них
+FILE_EXTENSIONS = {
+    'csv': '.csv',
+    'tsv': '.tsv',
+    'json': '.json',
+    'ndjson': '.ndjson',
+    'excel': '.xlsx',
+    'sql': '.sql',
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+EXPORT_FORMATS = ['clipboard'] + list(FILE_EXTENSIONS.keys())
+
+# Диалекты SQL-дампа
+SQL_DIALECTS = ['sqlite', 'postgresql', 'mysql']
+
+# Настройки экспорта в SQL-дамп
+SQL_EXPORT_CONFIG = {
+    'dialect': 'sqlite',  # sqlite, postgresql или mysql
+    'table': 'users',
+    'chunk_size': 1000,  # Строк в одном многострочном INSERT (или блоке COPY)
+    'create_table': True,  # Добавлять CREATE TABLE IF NOT EXISTS в начало дампа
+    'postgresql_copy': True,  # Для PostgreSQL использовать COPY ... FROM stdin вместо INSERT
+}
+
+# Настройки экспорта в Parquet и Feather (требуется pyarrow)
+ARROW_EXPORT_CONFIG = {
+    'compression': 'zstd',  # Parquet: zstd, snappy, gzip, none; Feather: zstd, lz4, none
+    'row_group_size': 100000,  # Строк в группе строк Parquet (пакете записей Feather)
+    'dictionary_columns': ['geo'],  # Столбцы со словарным кодированием (повторяющиеся значения)
+}
+
+# Настройки сжатия выходных файлов (.gz, .zst, .xz)
+COMPRESSION_CONFIG = {
+    'threads': 0,  # Потоков сжатия gzip и zstd: 0 - по числу процессоров, 1 - без параллельного сжатия
+    'block_size': 1024 * 1024,  # Размер блока для многопоточного gzip, байт
+    'gzip_level': 6,
+    'zstd_level': 3,
+    'xz_preset': 6,
+}
+
+# Настройки прямой загрузки в базу данных
+DB_SINK_CONFIG = {
+    'table': 'users',
+    'max_pending_batches': 2,  # Партий в очереди на загрузку, пока генерируются следующие
+}
+
+# Настройки кэша адресов
+ADDRESS_CACHE_CONFIG = {
+    'backend': 'sqlite',  # sqlite или json
+    'path': 'address_cache.db',
+    'legacy_json_path': 'address_cache.json',  # Прежний JSON-кэш, переносится в SQLite при первом запуске
+    'max_per_country': 1000,  # Максимум адресов на страну (None - без ограничения)
+}
+
+# Фоновое пополнение адресов в режиме online (cache_refiller.py)
+CACHE_REFILL_CONFIG = {
+    'enabled': False,  # True - генерация берет адреса из очередей, пополняемых в фоновом потоке
+    'low_water': 20,  # Пополнять страну, когда готовых адресов меньше
+    'high_water': 100,  # Пополнять до этого количества готовых адресов
+    'country_marks': {},  # Границы для отдельных стран: код страны -> (low_water, high_water)
+    'workers': 4,  # Одновременных запросов пополнения (в пределах бюджета запросов)
+    'idle_interval': 1.0,  # Период проверки очередей, секунды
+    'max_failures': 10,  # Неудачных запросов подряд до паузы пополнения страны
+    'failure_pause': 30.0,  # Пауза пополнения страны, секунды
+}
+
+# Предварительное заполнение кэша адресов (address_prefill.py, main.py -p)
+PREFILL_CONFIG = {
+    'addresses_per_country': 3,  # Адресов на страну по умолчанию (--prefill-count)
+    'checkpoint_path': 'prefill_checkpoint.json',  # Контрольная точка для продолжения (None - без нее)
+    'checkpoint_interval': 10.0,  # Период сохранения контрольной точки, секунды
+    'report_interval': 30.0,  # Период вывода общего прогресса в лог, секунды
+    'max_failures': 30,  # Запросов подряд без нового адреса, после которых страна считается исчерпанной
+}
+
+# Реестр уникальности выданных значений между партиями, процессами и запусками (uniqueness_ledger.py)
+LEDGER_CONFIG = {
+    'path': None,  # Файл SQLite; None - адреса уникальны только в пределах одной генерации
+    # Размер хэша значения, байт: вероятность ошибочно отклонить новое значение при n выданных
+    # около n / 2**(8 * digest_size). Задается при создании файла реестра.
+    'digest_size': 8,
+}
+
+# Настройки метрик генерации (metrics.py)
+METRICS_CONFIG = {
+    'enabled': True,  # False - счетчики и замеры времени не собираются
+    # Границы корзин гистограмм длительности, секунды
+    'buckets': (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'export_interval': 15,  # Период обновления файла метрик Prometheus, секунды
+    'prometheus_prefix': 'user_generator_',  # Префикс имен метрик Prometheus
 }
 
 # Добавляем информацию о телефонных кодах стран
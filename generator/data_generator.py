@@ -1,33 +1,33 @@
 # data_generator.py
 import random
+import numpy as np
 import pandas as pd
 import asyncio
 from faker import Faker
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 from datetime import datetime
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import uuid
 import functools
+import threading
 import time
 
 from config import (
     COUNTRY_LOCALES,
     USER_GEN_CONFIG,
-    COUNTRY_NAMES,
-    get_country_phone_code
+    GMAPS_CONFIG
 )
-from gmaps_api import generate_address, reset_used_addresses
+from gmaps_api import generate_address_async, reset_used_addresses
+from seeding import get_run_seed, record_rng, derive_seed, get_reference_date
 from utils import (
     generate_birth_date,
-    generate_strong_compliant_password,
-    generate_correct_proxy,
-    normalize_string,
-    generate_email,
-    generate_phone_number,
     run_concurrent_tasks
 )
-from models import User, UserProfile
+from models import UserProfile, USER_COLUMNS
+from name_pools import NamePool, get_name_pool
+from record_batch import UserBatch
+from metrics import inc, timed
 from dataclasses import asdict
 
 # Настройка логирования
@@ -36,10 +36,17 @@ logger = logging.getLogger(__name__)
 # Инициализация кэша Faker объектов
 faker_cache = {}
 
+# Кэш пулов имен по кодам стран
+name_pool_cache: Dict[str, NamePool] = {}
+
+# Блокировка для выборки значений Faker с сидом записи (объекты Faker общие для потоков)
+_faker_lock = threading.Lock()
+
 
 def get_faker_for_country(country_code: str) -> Faker:
     """
     Возвращает объект Faker для указанной страны с кэшированием.
+    Объекты создаются при первом обращении к стране ('default' - Faker с локалью en_US).
     Если локаль недоступна, возвращает Faker с локалью en_US.
 
     Args:
@@ -72,9 +79,37 @@ def get_faker_for_country(country_code: str) -> Faker:
         return fallback_faker
 
 
-# Инициализация дефолтного Faker
-default_faker = Faker('en_US')
-faker_cache['default'] = default_faker
+def draw_faker_values(country_code: str, methods: List[str], rng: Optional[random.Random] = None) -> List[str]:
+    """
+    Получает значения провайдеров Faker для страны.
+    Если передан rng, объект Faker предварительно получает сид из него, поэтому
+    значения воспроизводимы для записи независимо от порядка генерации других записей.
+
+    Args:
+        country_code: Код страны
+        methods: Названия методов Faker (например, 'first_name')
+        rng: Генератор случайных чисел записи
+
+    Returns:
+        Список строковых значений; для неподдерживаемых локалью методов - пустые строки
+    """
+    faker = get_faker_for_country(country_code)
+
+    def draw() -> List[str]:
+        values = []
+        for method in methods:
+            try:
+                values.append(str(getattr(faker, method)()))
+            except Exception:
+                values.append("")
+        return values
+
+    if rng is None:
+        return draw()
+
+    with _faker_lock:
+        faker.seed_instance(rng.getrandbits(64))
+        return draw()
 
 
 def retry_on_failure(max_retries=3, delay=1):
@@ -105,52 +140,83 @@ def retry_on_failure(max_retries=3, delay=1):
     return decorator
 
 
-def generate_name(country_code: str) -> str:
+def get_name_pool_for_country(country_code: str) -> NamePool:
+    """
+    Возвращает пул имен страны (см. name_pools.get_name_pool) с кэшированием по коду страны.
+
+    Args:
+        country_code: Код страны
+
+    Returns:
+        Пул имен
+    """
+    pool = name_pool_cache.get(country_code)
+    if pool is None:
+        pool = get_name_pool(COUNTRY_LOCALES.get(country_code, 'en_US'),
+                             lambda: get_faker_for_country(country_code),
+                             lambda: get_faker_for_country('default'))
+        name_pool_cache[country_code] = pool
+    return pool
+
+
+def generate_name(country_code: str, rng: Optional[random.Random] = None) -> str:
     """
     Генерирует полное имя пользователя для заданного кода страны.
+    Имя и фамилия выбираются из заранее построенного пула локали (одно слово в ASCII каждое).
 
     Args:
         country_code: Код страны
+        rng: Генератор случайных чисел записи (для воспроизводимой генерации)
 
     Returns:
         Нормализованное полное имя
     """
-    faker = get_faker_for_country(country_code)
+    pool = get_name_pool_for_country(country_code)
+    if pool.fallback:
+        inc('name_fallbacks_total', country=country_code)
+    return pool.draw(rng)
 
-    max_attempts = 5
-    for _ in range(max_attempts):
-        first_name = faker.first_name()
-        last_name = faker.last_name()
-        full_name = f"{first_name} {last_name}"
-        normalized_name = normalize_string(full_name)
 
-        # Проверяем, что имя состоит из двух слов и содержит только ASCII символы
-        if len(normalized_name.split()) == 2 and normalized_name.isascii():
-            return normalized_name
+def generate_names(country_code: str, n: int, rng: Optional[random.Random] = None) -> List[str]:
+    """
+    Генерирует n полных имен для страны одним векторным выбором из пула локали.
+
+    Args:
+        country_code: Код страны
+        n: Количество имен
+        rng: Генератор случайных чисел, из которого берется сид генератора NumPy
+            (для воспроизводимой генерации)
 
-    # Если после нескольких попыток не получили подходящее имя, генерируем с помощью default Faker
-    logger.warning(f"Не удалось сгенерировать подходящее имя для страны {country_code}, использую запасной вариант")
-    first_name = default_faker.first_name()
-    last_name = default_faker.last_name()
-    full_name = f"{first_name} {last_name}"
-    return normalize_string(full_name)
+    Returns:
+        Список нормализованных полных имен
+    """
+    pool = get_name_pool_for_country(country_code)
+    if pool.fallback:
+        inc('name_fallbacks_total', n, country=country_code)
+    generator = np.random.default_rng(rng.getrandbits(64)) if rng is not None else None
+    return pool.sample(n, generator)
 
 
-def generate_creation_date() -> str:
+def generate_creation_date(rng: Optional[random.Random] = None) -> str:
     """
     Генерирует дату создания аккаунта в формате DD.MM.YYYY.
-    Дата создания всегда в пределах последних 3 лет.
+    Дата создания всегда в пределах последних 3 лет (относительно seeding.get_reference_date()).
+
+    Args:
+        rng: Генератор случайных чисел (по умолчанию - модуль random)
 
     Returns:
         Строка с датой в формате DD.MM.YYYY
     """
-    current_year = datetime.now().year
-    year = random.randint(current_year - 3, current_year)
-    month = random.randint(1, 12)
+    rng = rng or random
+    now = get_reference_date()
+    current_year = now.year
+    year = rng.randint(current_year - 3, current_year)
+    month = rng.randint(1, 12)
 
     # Если выбран текущий год и месяц, ограничиваем день текущим днем
-    if year == current_year and month == datetime.now().month:
-        day = random.randint(1, datetime.now().day)
+    if year == current_year and month == now.month:
+        day = rng.randint(1, now.day)
     else:
         # Определяем количество дней в месяце
         if month in [4, 6, 9, 11]:
@@ -164,7 +230,7 @@ def generate_creation_date() -> str:
         else:
             max_day = 31
 
-        day = random.randint(1, max_day)
+        day = rng.randint(1, max_day)
 
     return f"{day:02d}.{month:02d}.{year}"
 
@@ -196,115 +262,147 @@ def generate_user_profile(user_id: str, country_code: str) -> Dict[str, Any]:
     return asdict(profile)
 
 
-async def create_user_record(country: str) -> Dict[str, Any]:
+def generate_user_id(rng: Optional[random.Random] = None) -> str:
     """
-    Асинхронно создает запись пользователя для указанной страны.
+    Генерирует UUID пользователя. Если передан rng, UUID воспроизводим.
 
     Args:
-        country: Код страны
+        rng: Генератор случайных чисел записи
 
     Returns:
-        Словарь с данными пользователя
+        Строка UUID версии 4
+    """
+    if rng is None:
+        return str(uuid.uuid4())
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+async def fill_user_record(batch: UserBatch, index: int, rng: Optional[random.Random] = None):
     """
+    Асинхронно заполняет запись index партии: адрес, имя и дату рождения
+    для страны из столбца geo (пароли партии уже сгенерированы).
+
+    Args:
+        batch: Партия записей
+        index: Индекс записи в партии
+        rng: Генератор случайных чисел записи. Если задан, все поля, кроме пароля,
+            воспроизводимы (пароль всегда генерируется криптографически стойким генератором).
+    """
+    country = batch.columns['geo'][index]
     max_attempts = 10
     attempts = 0
+    address = ""
 
     while attempts < max_attempts:
         try:
-            address = generate_address(country)
+            with timed('record_field_seconds', field='address'):
+                address = await generate_address_async(country, rng=rng)
             if address:
-                # Генерируем основные данные
-                user_id = str(uuid.uuid4())
-                name = generate_name(country)
-                email = generate_email(name)
-                birth_date = generate_birth_date()
-                password = generate_strong_compliant_password()
-                proxy = generate_correct_proxy(country)
-
-                # Генерируем телефонный номер на основе кода страны
-                country_code = get_country_phone_code(country)
-                phone = generate_phone_number(country, country_code)
-
-                creation_date = generate_creation_date()
-
-                # Создаем основную запись пользователя
-                user = User(
-                    geo=country,  # Сохраняем гео-код
-                    apple_id="",
-                    password=generate_strong_compliant_password(),
-                    number="",
-                    name=generate_name(country),
-                    address=address or "",
-                    birthday=generate_birth_date()
-                )
-
-                # Создаем запись в виде словаря
-                user_data = asdict(user)
-
-                # Добавляем информацию о стране в формате ISO и название
-                user_data['country_name'] = COUNTRY_NAMES.get(country, country)
-
-                return {
-                    "geo": user.geo,
-                    "AppleID": user.apple_id,
-                    "pass": user.password,
-                    "number": user.number,
-                    "name": user.name,
-                    "address": user.address,
-                    "birthday": user.birthday
-                }
+                break
 
             attempts += 1
+            inc('record_retries_total', reason='no_address')
             logger.info(f"Не удалось получить адрес для страны {country} (попытка {attempts}/{max_attempts}).")
             await asyncio.sleep(1)  # Небольшая пауза перед повторной попыткой
 
         except Exception as e:
             logger.exception(f"Ошибка при создании записи пользователя для страны {country}: {e}")
             attempts += 1
+            inc('record_retries_total', reason='error')
             await asyncio.sleep(1)
+    else:
+        # Если за max_attempts адрес не получен, создаем запись с пустым адресом
+        logger.warning(
+            f"Не удалось получить адрес для страны {country} после {max_attempts} попыток. Запись будет создана с пустым адресом.")
+        address = ""
 
-    # Если за max_attempts адрес не получен, возвращаем запись с пустым адресом
-    logger.warning(
-        f"Не удалось получить адрес для страны {country} после {max_attempts} попыток. Запись будет создана с пустым адресом.")
-
-    # Создаем запись с пустым адресом
-    user_id = str(uuid.uuid4())
-    name = generate_name(country)
-    email = generate_email(name, generate=False)
-    birth_date = generate_birth_date()
-    password = generate_strong_compliant_password()
-    proxy = generate_correct_proxy(country)
-
-    # Генерируем телефонный номер на основе кода страны
-    country_code = get_country_phone_code(country)
-    phone = generate_phone_number(country, generate=False)
-
-    creation_date = generate_creation_date()
-
-    user = User(
-        id=user_id,
-        geo=country,
-        apple_id=email,
-        password=password,
-        number=phone,
-        name=name,
-        address="",
-        birthday=birth_date,
-        creation=creation_date,
-        proxy=proxy,
-    )
+    with timed('record_field_seconds', field='name'):
+        name = generate_name(country, rng)
+    with timed('record_field_seconds', field='birthday'):
+        birth_date = generate_birth_date(rng=rng)
 
-    # Создаем запись в виде словаря
-    user_data = asdict(user)
+    batch.set_record(index, name, address or "", birth_date)
+    inc('records_total', address='ok' if address else 'empty')
 
-    # Добавляем информацию о стране в формате ISO и название
-    user_data['country_name'] = COUNTRY_NAMES.get(country, country)
 
-    return user_data
+async def create_user_record(country: str, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """
+    Асинхронно создает одну запись пользователя для указанной страны.
+    Для генерации многих записей используйте create_planned_batch.
+
+    Args:
+        country: Код страны
+        rng: Генератор случайных чисел записи (см. fill_user_record)
+
+    Returns:
+        Словарь с данными пользователя (столбцы models.USER_COLUMNS)
+    """
+    batch = UserBatch([country])
+    await fill_user_record(batch, 0, rng)
+    return batch.record(0)
 
 
 @reset_used_addresses
-async def generate_user_data_async(num_users: int = 20, country_codes: Optional[List[str]] = None) -> pd.DataFrame:
+async def generate_user_data_async(num_users: int = 20, country_codes: Optional[List[str]] = None,
+                                   max_concurrency: Optional[int] = None, start_index: int = 0) -> pd.DataFrame:
+    """
+    Асинхронно генерирует данные пользователей.
+    Записи создаются одновременно: адреса запрашиваются параллельно в пуле потоков gmaps_api.
+
+    Если задан сид запуска (seeding.set_run_seed), запись с глобальным индексом i
+    генерируется генератором, производным от сида и i, поэтому любую часть набора
+    данных можно сгенерировать повторно независимо от остальных.
+
+    Args:
+        num_users: Количество пользователей для генерации
+        country_codes: Список кодов стран. Если None, используются все доступные страны.
+        max_concurrency: Максимум одновременно создаваемых записей.
+            Если None, используется GMAPS_CONFIG['max_concurrency'].
+        start_index: Глобальный индекс первой записи (например, смещение партии)
+
+    Returns:
+        DataFrame с данными пользователей
+    """
+    country_counts = distribute_users(num_users, country_codes)
+
+    logger.info(f"Генерация данных для {num_users} пользователей из стран: {', '.join(country_counts.keys())}")
+
+    batch = await create_user_batch(country_counts, max_concurrency, start_index=start_index)
+
+    # Перемешиваем индексы записей и собираем DataFrame из столбцов в этом порядке
+    order = list(range(len(batch)))
+    shuffle_records(order, start_index)
+
+    return batch.to_frame(order)
+
+
+def shuffle_records(records: list, start_index: int = 0):
+    """
+    Перемешивает записи на месте. При заданном сиде запуска порядок воспроизводим.
+
+    Args:
+        records: Список записей (или индексов)
+        start_index: Глобальный индекс первой записи
+    """
+    seed = get_run_seed()
+    if seed is None:
+        random.shuffle(records)
+    else:
+        random.Random(derive_seed(seed, start_index, 'shuffle')).shuffle(records)
+
+
+def distribute_users(num_users: int, country_codes: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Равномерно распределяет пользователей по странам.
+    Неизвестные коды стран отбрасываются; если не осталось ни одного, используется US.
+
+    Args:
+        num_users: Количество пользователей
+        country_codes: Список кодов стран. Если None, используются все доступные страны.
+
+    Returns:
+        Словарь код страны -> количество пользователей
+    """
     if country_codes is None:
         country_codes = list(COUNTRY_LOCALES.keys())
     else:
@@ -325,41 +423,102 @@ async def generate_user_data_async(num_users: int = 20, country_codes: Optional[
     for i in range(remainder):
         country_counts[country_codes[i]] += 1
 
-    # Создаем задачи
-    tasks = []
+    return country_counts
+
+
+def plan_records(country_counts: Dict[str, int]) -> List[str]:
+    """
+    Раскладывает распределение по странам в список: код страны для каждого индекса записи.
+
+    Args:
+        country_counts: Словарь код страны -> количество пользователей
+
+    Returns:
+        Список кодов стран в порядке индексов записей
+    """
+    plan = []
     for country, count in country_counts.items():
-        tasks.extend([create_user_record(country) for _ in range(count)])
+        plan.extend([country] * count)
+    return plan
 
-    logger.info(f"Генерация данных для {num_users} пользователей из стран: {', '.join(country_counts.keys())}")
 
-    # Максимум 20 одновременных задач
-    max_workers = min(20, num_users)
+async def create_user_batch(country_counts: Dict[str, int],
+                            max_concurrency: Optional[int] = None,
+                            start_index: int = 0) -> UserBatch:
+    """
+    Асинхронно создает партию записей пользователей с ограничением числа одновременных задач.
+
+    Args:
+        country_counts: Словарь код страны -> количество пользователей
+        max_concurrency: Максимум одновременно создаваемых записей.
+            Если None, используется GMAPS_CONFIG['max_concurrency'].
+        start_index: Глобальный индекс первой записи
+
+    Returns:
+        Партия записей в порядке стран
+    """
+    return await create_planned_batch(plan_records(country_counts), start_index, max_concurrency)
+
+
+async def create_planned_batch(countries: List[str], start_index: int = 0,
+                               max_concurrency: Optional[int] = None) -> UserBatch:
+    """
+    Асинхронно создает партию по плану: запись start_index + i создается для страны countries[i].
+    Столбцы партии заполняются по индексам записей, без промежуточных словарей.
+
+    Args:
+        countries: Список кодов стран (см. plan_records)
+        start_index: Глобальный индекс первой записи
+        max_concurrency: Максимум одновременно создаваемых записей.
+            Если None, используется GMAPS_CONFIG['max_concurrency'].
+
+    Returns:
+        Партия записей в порядке плана
+    """
+    batch = UserBatch(countries)
+    if not countries:
+        return batch
+
+    # Ограничиваем число одновременных задач
+    if max_concurrency is None:
+        max_concurrency = GMAPS_CONFIG['max_concurrency']
+    max_workers = max(1, min(max_concurrency, len(countries)))
     semaphore = asyncio.Semaphore(max_workers)
 
-    async def limited_task(task):
+    async def limited_task(index: int):
         async with semaphore:
-            return await task
+            await fill_user_record(batch, index, record_rng(start_index + index))
 
     # Запускаем задачи с ограничением
-    data = await asyncio.gather(*[limited_task(task) for task in tasks])
-
-    # Перемешиваем данные перед созданием DataFrame
-    random.shuffle(data)
+    await asyncio.gather(*[limited_task(i) for i in range(len(countries))])
+    return batch
 
-    return pd.DataFrame(data)
 
-
-def generate_user_data(num_users: int = 20, country_codes: Optional[List[str]] = None) -> pd.DataFrame:
+def generate_user_data(num_users: int = 20, country_codes: Optional[List[str]] = None,
+                       processes: Optional[int] = None, start_index: int = 0) -> pd.DataFrame:
     """
     Синхронная обертка для асинхронной функции generate_user_data_async.
 
     Args:
         num_users: Количество пользователей для генерации
         country_codes: Список кодов стран. Если None, используются все доступные страны.
+        processes: Количество процессов генерации. Если больше 1, записи создаются
+            в пуле процессов (см. parallel_generator.generate_user_data_parallel).
+        start_index: Глобальный индекс первой записи (для воспроизводимой генерации с сидом)
 
     Returns:
         DataFrame с данными пользователей
     """
+    if processes is not None and processes > 1:
+        # Импорт внутри функции, чтобы избежать циклического импорта
+        from parallel_generator import generate_user_data_parallel
+        try:
+            return generate_user_data_parallel(num_users, country_codes, processes=processes,
+                                               start_index=start_index)
+        except Exception as e:
+            logger.exception(f"Ошибка при многопроцессной генерации данных пользователей: {e}")
+            return UserBatch().to_frame()
+
     # Запускаем асинхронную функцию в событийном цикле
     loop = asyncio.get_event_loop()
     if loop.is_closed():
@@ -367,53 +526,91 @@ def generate_user_data(num_users: int = 20, country_codes: Optional[List[str]] =
         asyncio.set_event_loop(loop)
 
     try:
-        return loop.run_until_complete(generate_user_data_async(num_users, country_codes))
+        return loop.run_until_complete(generate_user_data_async(num_users, country_codes, start_index=start_index))
     except Exception as e:
         logger.exception(f"Ошибка при генерации данных пользователей: {e}")
         # Возвращаем пустой DataFrame с теми же столбцами
-        return pd.DataFrame(columns=[
-            'id', 'geo', 'apple_id', 'password', 'number', 'name', 'address', 'birthday', 'creation', 'proxy',
-            'country_name'
-        ])
+        return UserBatch().to_frame()
     finally:
         if not loop.is_running():
             loop.close()
 
 
-def generate_batch_user_data(batch_configs: List[Dict[str, Any]]) -> Dict[str, pd.DataFrame]:
+def generate_batch_user_data(batch_configs: List[Dict[str, Any]],
+                             processes: Optional[int] = None) -> Dict[str, pd.DataFrame]:
     """
     Генерирует несколько партий данных пользователей с разными конфигурациями.
 
     Args:
         batch_configs: Список словарей с конфигурациями для каждой партии.
-            Каждый словарь должен содержать ключи 'num_users' и 'country_codes'.
+            Каждый словарь должен содержать ключи 'num_users' и 'country_codes'
+            и может содержать 'processes' для переопределения количества процессов.
+        processes: Количество процессов генерации по умолчанию для всех партий
 
     Returns:
         Словарь с названиями партий в качестве ключей и DataFrame в качестве значений
     """
     result = {}
+    start_index = 0
 
     for i, config in enumerate(batch_configs):
         name = config.get('name', f'batch_{i}')
         num_users = config.get('num_users', 20)
         country_codes = config.get('country_codes')
+        batch_processes = config.get('processes', processes)
 
         logger.info(f"Генерация партии '{name}' с {num_users} пользователями из стран: {country_codes}")
 
         try:
-            df = generate_user_data(num_users, country_codes)
+            df = generate_user_data(num_users, country_codes, processes=batch_processes, start_index=start_index)
             result[name] = df
         except Exception as e:
             logger.exception(f"Ошибка при генерации партии '{name}': {e}")
             result[name] = pd.DataFrame()
+        start_index += num_users
 
     return result
 
 
+def iter_user_batches(total_users: int, batch_size: int = 100,
+                      country_codes: Optional[List[str]] = None,
+                      processes: Optional[int] = None,
+                      start_batch: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Генерирует данные пользователей партиями и отдает их по одной.
+    В памяти одновременно находится только текущая партия, поэтому
+    потребитель (например, clipboard_utils.export_data) может записывать
+    данные на диск по мере генерации.
+
+    Args:
+        total_users: Общее количество пользователей для генерации
+        batch_size: Размер каждой партии
+        country_codes: Список кодов стран. Если None, используются все доступные страны.
+        processes: Количество процессов генерации (см. generate_user_data)
+        start_batch: Номер партии (с нуля), с которой начинается генерация. Вместе с сидом
+            запуска позволяет продолжить прерванную генерацию с той же партии.
+
+    Yields:
+        DataFrame с очередной партией пользователей
+    """
+    if batch_size <= 0:
+        raise ValueError("Размер партии должен быть больше 0.")
+
+    total_batches = (total_users + batch_size - 1) // batch_size
+    logger.info(f"Потоковая генерация: {total_users} пользователей, {total_batches} партий по {batch_size}")
+
+    for i in range(start_batch, total_batches):
+        start_index = i * batch_size
+        size = min(batch_size, total_users - start_index)
+        logger.info(f"Генерация партии {i + 1}/{total_batches} ({size} пользователей)")
+        yield generate_user_data(size, country_codes, processes=processes, start_index=start_index)
+
+
 def generate_large_dataset(total_users: int, batch_size: int = 100,
                            country_codes: Optional[List[str]] = None) -> pd.DataFrame:
     """
-    Генерирует большой набор данных пользователей по частям для экономии памяти.
+    Генерирует большой набор данных пользователей по частям и объединяет их в один DataFrame.
+    Для наборов, которые не помещаются в память, используйте iter_user_batches.
 
     Args:
         total_users: Общее количество пользователей для генерации
@@ -425,23 +622,7 @@ def generate_large_dataset(total_users: int, batch_size: int = 100,
     """
     logger.info(f"Генерация большого набора данных: {total_users} пользователей (размер партии: {batch_size})")
 
-    # Определяем количество полных партий и остаток
-    full_batches = total_users // batch_size
-    remainder = total_users % batch_size
-
-    data_frames = []
-
-    # Генерируем полные партии
-    for i in range(full_batches):
-        logger.info(f"Генерация партии {i + 1}/{full_batches + 1}")
-        df = generate_user_data(batch_size, country_codes)
-        data_frames.append(df)
-
-    # Генерируем оставшуюся партию, если есть
-    if remainder > 0:
-        logger.info(f"Генерация финальной партии {full_batches + 1}/{full_batches + 1} ({remainder} пользователей)")
-        df = generate_user_data(remainder, country_codes)
-        data_frames.append(df)
+    data_frames = list(iter_user_batches(total_users, batch_size, country_codes))
 
     # Объединяем все партии в один DataFrame
     if data_frames:
@@ -450,50 +631,136 @@ def generate_large_dataset(total_users: int, batch_size: int = 100,
         return pd.DataFrame()
 
 
-def validate_user_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+# Поля, обязательные для каждой записи пользователя
+REQUIRED_FIELDS = ['id', 'geo', 'apple_id', 'password', 'name']
+
+# Обязательные поля сгенерированных партий: в них нет id, а AppleID заполняется позже
+GENERATED_REQUIRED_FIELDS = ['geo', 'password', 'name']
+
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+PHONE_PATTERN = r'^\+\d{10,15}$'
+
+# Столбец выходных данных для поля models.User (AppleID -> apple_id, pass -> password)
+_FIELD_COLUMNS = {field: column for column, field in USER_COLUMNS.items()}
+
+
+def _column(df: pd.DataFrame, field: str) -> Optional[pd.Series]:
+    """Столбец поля: под именем поля User или под именем столбца выходных данных (или None)."""
+    if field in df:
+        return df[field]
+    column = _FIELD_COLUMNS.get(field)
+    if column is not None and column in df:
+        return df[column]
+    return None
+
+
+def _blank(df: pd.DataFrame, field: str) -> pd.Series:
+    """Маска строк, в которых поле отсутствует, равно None/NaN или пустой строке."""
+    column = _column(df, field)
+    if column is None:
+        return pd.Series(True, index=df.index)
+    return column.isna() | column.astype(str).str.strip().eq('')
+
+
+def _required_rule(field: str):
+    return lambda df: _blank(df, field)
+
+
+def _invalid_email(df: pd.DataFrame) -> pd.Series:
+    column = _column(df, 'apple_id')
+    if column is None:
+        return pd.Series(False, index=df.index)
+    return ~_blank(df, 'apple_id') & ~column.astype(str).str.contains(EMAIL_PATTERN, regex=True)
+
+
+def _short_password(df: pd.DataFrame) -> pd.Series:
+    column = _column(df, 'password')
+    if column is None:
+        return pd.Series(False, index=df.index)
+    return ~_blank(df, 'password') & (column.astype(str).str.len() < 8)
+
+
+def _invalid_phone(df: pd.DataFrame) -> pd.Series:
+    # Как в utils.is_valid_phone_number: после удаления всего, кроме цифр и "+", номер вида +XXXXXXXXXX
+    column = _column(df, 'number')
+    if column is None:
+        return pd.Series(False, index=df.index)
+    cleaned = column.astype(str).str.replace(r'[^\d+]', '', regex=True)
+    return ~_blank(df, 'number') & ~cleaned.str.fullmatch(PHONE_PATTERN)
+
+
+# Правила проверки формата: (название правила, сообщение об ошибке, функция DataFrame -> маска ошибочных строк)
+FORMAT_RULES = [
+    ('invalid_email', "Некорректный формат email", _invalid_email),
+    ('short_password', "Пароль слишком короткий (менее 8 символов)", _short_password),
+    ('invalid_phone', "Некорректный номер телефона", _invalid_phone),
+]
+
+
+def validation_rules(required_fields: Optional[List[str]] = None) -> list:
+    """Правила проверки: обязательные поля (по умолчанию REQUIRED_FIELDS) и FORMAT_RULES."""
+    if required_fields is None:
+        required_fields = REQUIRED_FIELDS
+    return [
+        *[(f"missing_{field}", f"Отсутствует обязательное поле: {field}", _required_rule(field))
+          for field in required_fields],
+        *FORMAT_RULES,
+    ]
+
+
+VALIDATION_RULES = validation_rules()
+
+
+def validate_user_frame(df: pd.DataFrame,
+                        required_fields: Optional[List[str]] = None) -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Проверяет данные пользователей правилами validation_rules, применяемыми к целым столбцам.
+
+    Args:
+        df: DataFrame с данными пользователей
+        required_fields: Обязательные поля. Если None, используется REQUIRED_FIELDS.
+
+    Returns:
+        Кортеж из маски корректных строк и компактного DataFrame ошибок: по одной строке
+        на ошибочную запись (индекс исходного DataFrame), столбец 'id' и логические
+        столбцы с названиями нарушенных правил
+    """
+    failures = pd.DataFrame({name: check(df).fillna(True).astype(bool)
+                             for name, _, check in validation_rules(required_fields)},
+                            index=df.index)
+    valid_mask = ~failures.any(axis=1)
+
+    errors = failures.loc[~valid_mask]
+    ids = df['id'] if 'id' in df else pd.Series('unknown', index=df.index)
+    errors.insert(0, 'id', ids.loc[errors.index].fillna('unknown'))
+
+    return valid_mask, errors
+
+
+def validate_user_data(df: pd.DataFrame,
+                       required_fields: Optional[List[str]] = None) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
     """
     Проверяет данные пользователей на корректность и возвращает отфильтрованные данные и список ошибок.
 
     Args:
         df: DataFrame с данными пользователей
+        required_fields: Обязательные поля. Если None, используется REQUIRED_FIELDS;
+            для партий генератора передается GENERATED_REQUIRED_FIELDS.
 
     Returns:
         Кортеж из очищенного DataFrame и списка записей с ошибками
     """
-    errors = []
-    valid_data = []
-
-    for _, row in df.iterrows():
-        row_dict = row.to_dict()
-        error_found = False
-        error_details = {'id': row_dict.get('id', 'unknown'), 'errors': []}
-
-        # Проверка наличия необходимых полей
-        required_fields = ['id', 'geo', 'apple_id', 'password', 'name']
-        for field in required_fields:
-            if field not in row_dict or not row_dict[field]:
-                error_details['errors'].append(f"Отсутствует обязательное поле: {field}")
-                error_found = True
-
-        # Проверка формата email
-        if 'apple_id' in row_dict and row_dict['apple_id'] and '@' not in row_dict['apple_id']:
-            error_details['errors'].append("Некорректный формат email")
-            error_found = True
-
-        # Проверка длины пароля
-        if 'password' in row_dict and row_dict['password'] and len(row_dict['password']) < 8:
-            error_details['errors'].append("Пароль слишком короткий (менее 8 символов)")
-            error_found = True
-
-        # Добавляем запись в соответствующий список
-        if error_found:
-            errors.append(error_details)
-        else:
-            valid_data.append(row_dict)
+    valid_mask, errors_frame = validate_user_frame(df, required_fields)
 
     # Создаем DataFrame из корректных записей
-    valid_df = pd.DataFrame(valid_data)
+    valid_df = df.loc[valid_mask].reset_index(drop=True)
 
-    return valid_df, errors
+    # Список сообщений формируется только для ошибочных записей
+    messages = [message for _, message, _ in validation_rules(required_fields)]
+    flags = errors_frame.drop(columns='id').to_numpy()
+    errors = [
+        {'id': record_id, 'errors': [message for message, failed in zip(messages, row) if failed]}
+        for record_id, row in zip(errors_frame['id'].tolist(), flags)
+    ]
 
-# Функции экспорта данных в различные форматы будут реализованы в clipboard_utils.py
+    return valid_df, errors
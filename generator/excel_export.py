@@ -0,0 +1,163 @@
+# excel_export.py
+import logging
+import os
+import re
+from typing import Optional, List, Dict
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Максимальное количество строк на листе Excel (включая строку заголовков)
+EXCEL_MAX_ROWS = 1048576
+
+# Символы, недопустимые в названиях листов Excel, и максимальная длина названия
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+_MAX_SHEET_NAME = 31
+
+
+class ExcelStreamWriter:
+    """
+    Потоково записывает партии данных в файл .xlsx с постоянным потреблением памяти.
+
+    Используется xlsxwriter в режиме constant_memory (строки сбрасываются на диск сразу
+    после записи), а если он не установлен - openpyxl в режиме write_only.
+    Партии можно записывать на разные листы; при достижении предела строк Excel
+    запись автоматически продолжается на новом листе с тем же заголовком.
+    """
+
+    def __init__(self, filename: str, sheet_name: str = 'data', append: bool = False,
+                 max_rows: int = EXCEL_MAX_ROWS):
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            raise ValueError(f"Формат excel не поддерживает дозапись в существующий файл {filename}, "
+                             f"укажите для продолжения генерации новый файл")
+        self.filename = filename
+        self.default_sheet = sheet_name
+        self.max_rows = max_rows
+        self.rows = 0
+
+        self._workbook = None
+        self._engine = None
+        self._sheet = None
+        self._sheet_base: Optional[str] = None
+        self._sheet_part = 0
+        self._sheet_row = 0
+        self._columns: Optional[List[str]] = None
+        self._sheet_names: set = set()
+
+    def _open_workbook(self):
+        try:
+            import xlsxwriter
+            self._workbook = xlsxwriter.Workbook(self.filename, {
+                'constant_memory': True,
+                # Значения записываются как есть: без преобразования строк в формулы, ссылки и числа
+                'strings_to_formulas': False,
+                'strings_to_urls': False,
+                'strings_to_numbers': False,
+            })
+            self._engine = 'xlsxwriter'
+        except ImportError:
+            try:
+                from openpyxl import Workbook
+            except ImportError:
+                raise ImportError("Для экспорта в Excel установите xlsxwriter (pip install xlsxwriter) или openpyxl")
+            self._workbook = Workbook(write_only=True)
+            self._engine = 'openpyxl'
+
+    def _unique_sheet_name(self, name: str) -> str:
+        name = _INVALID_SHEET_CHARS.sub('_', name).strip("'") or 'data'
+        candidate = name[:_MAX_SHEET_NAME]
+        counter = 2
+        while candidate.lower() in self._sheet_names:
+            suffix = f"_{counter}"
+            candidate = name[:_MAX_SHEET_NAME - len(suffix)] + suffix
+            counter += 1
+        self._sheet_names.add(candidate.lower())
+        return candidate
+
+    def _add_sheet(self, base_name: str):
+        """Создает новый лист и записывает на него заголовок."""
+        if self._sheet_base != base_name:
+            self._sheet_base = base_name
+            self._sheet_part = 1
+        else:
+            self._sheet_part += 1
+        name = self._unique_sheet_name(base_name if self._sheet_part == 1 else f"{base_name}_{self._sheet_part}")
+
+        if self._engine == 'xlsxwriter':
+            self._sheet = self._workbook.add_worksheet(name)
+            self._sheet.write_row(0, 0, self._columns)
+        else:
+            self._sheet = self._workbook.create_sheet(name)
+            self._sheet.append(self._columns)
+        self._sheet_row = 1
+
+    def write(self, data: pd.DataFrame, sheet_name: Optional[str] = None):
+        """
+        Дописывает партию данных.
+
+        Args:
+            data: DataFrame с партией данных
+            sheet_name: Лист, на который записывается партия. Если None - текущий лист
+                (для первой партии - лист по умолчанию).
+        """
+        if data is None or data.empty:
+            return
+        if self._workbook is None:
+            self._open_workbook()
+
+        if sheet_name is not None and sheet_name != self._sheet_base:
+            # Новый лист может иметь собственный набор столбцов
+            self._columns = [str(column) for column in data.columns]
+            self._add_sheet(sheet_name)
+        elif self._sheet is None:
+            self._columns = [str(column) for column in data.columns]
+            self._add_sheet(self.default_sheet)
+        else:
+            data = data.reindex(columns=self._columns)
+
+        values = data.astype(object).where(data.notna(), None).itertuples(index=False, name=None)
+        for row in values:
+            if self._sheet_row >= self.max_rows:
+                logger.info(f"Лист заполнен ({self.max_rows} строк), запись продолжается на новом листе")
+                self._add_sheet(self._sheet_base)
+            if self._engine == 'xlsxwriter':
+                self._sheet.write_row(self._sheet_row, 0, row)
+            else:
+                self._sheet.append(row)
+            self._sheet_row += 1
+        self.rows += len(data)
+
+    def close(self):
+        """Завершает запись и закрывает файл."""
+        if self._workbook is not None:
+            if self._engine == 'xlsxwriter':
+                self._workbook.close()
+            else:
+                self._workbook.save(self.filename)
+            self._workbook = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_sheets_to_excel(frames: Dict[str, pd.DataFrame], filename: str) -> int:
+    """
+    Сохраняет несколько наборов данных в один файл .xlsx, каждый на своем листе.
+
+    Args:
+        frames: Словарь название листа -> DataFrame (например, результат generate_batch_user_data)
+        filename: Имя файла
+
+    Returns:
+        Количество записанных строк
+    """
+    with ExcelStreamWriter(filename) as writer:
+        for name, data in frames.items():
+            writer.write(data, sheet_name=name)
+    sheets = sum(1 for data in frames.values() if data is not None and not data.empty)
+    logger.info(f"Данные успешно сохранены в файл {filename} ({writer.rows} строк, листов: {sheets})")
+    return writer.rows
@@ -3,17 +3,21 @@ import random
 import logging
 import time
 import re
-import json
-import os
-from typing import Optional, Dict, List, Any
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Any, Callable, Tuple
 import googlemaps
-from functools import lru_cache
+from functools import partial
 from config import (
     GOOGLE_MAPS_API_KEY,
     CITY_COORDINATES,
     RADIUS_DATA,
     COUNTRY_NAMES,
-    GMAPS_CONFIG
+    GMAPS_CONFIG,
+    RATE_LIMIT_CONFIG,
+    CACHE_REFILL_CONFIG,
+    ADDRESS_MODES
 )
 from utils import (
     normalize_string,
@@ -21,21 +25,165 @@ from utils import (
     is_valid_address,
     format_address_components
 )
+from address_cache import get_address_cache
+from response_cache import get_response_cache
+from rate_limit import get_rate_limiter, configure_rate_limiter, QuotaExceededError
+from offline_address import synthesize_address
+from uniqueness_ledger import claim_unique, configure_ledger, get_ledger
+from metrics import inc, observe, timed
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
-# Инициализация клиента Google Maps
-gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+# Клиент Google Maps создается при первом запросе к API (в офлайн-режиме ключ не нужен)
+gmaps: Optional[googlemaps.Client] = None
+_client_lock = threading.Lock()
 
-# Путь к файлу кэша адресов
-CACHE_FILE = "address_cache.json"
-
-# Инициализация кэша адресов
-address_cache = {}
+# Ключ для заглушки (gmaps_stub.py), если настоящий не задан: клиент принимает только ключи вида AIza...
+STUB_API_KEY = 'AIzaLocalStubKey'
 
 USED_ADDRESSES = set()
 
+# Блокировка для потокобезопасной работы с USED_ADDRESSES
+_address_lock = threading.RLock()
+
+# Пул потоков для асинхронной генерации адресов (создается при первом обращении)
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Запросы к API, выполняемые в данный момент в асинхронном режиме: одинаковые запросы
+# одновременно генерируемых записей ожидают один общий ответ
+_inflight_requests: Dict[Tuple[str, str], asyncio.Future] = {}
+
+
+def get_gmaps_client() -> googlemaps.Client:
+    """Возвращает клиент Google Maps, создавая его при первом обращении."""
+    global gmaps
+    if gmaps is None:
+        with _client_lock:
+            if gmaps is None:
+                # Повторы при OVER_QUERY_LIMIT выполняет ограничитель запросов (rate_limit),
+                # а не клиент: он откладывает все потоки сразу вместо повторов каждого запроса
+                base_url = GMAPS_CONFIG['base_url']
+                if base_url:
+                    gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY or STUB_API_KEY,
+                                              retry_over_query_limit=False, base_url=base_url.rstrip('/'))
+                else:
+                    if not GOOGLE_MAPS_API_KEY:
+                        logger.warning("GOOGLE_MAPS_API_KEY не установлен в переменных окружения. "
+                                       "Запросы к Google Maps API недоступны.")
+                    gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY, retry_over_query_limit=False)
+    return gmaps
+
+
+def set_gmaps_base_url(base_url: Optional[str]):
+    """
+    Направляет запросы к Google Maps на другой адрес, например на локальную заглушку gmaps_stub.py.
+    Ответы такого сервера хранятся в кэше ответов отдельно от ответов настоящего API.
+
+    Args:
+        base_url: Базовый URL (например, http://127.0.0.1:8765) или None для настоящего API
+    """
+    global gmaps
+    with _client_lock:
+        GMAPS_CONFIG['base_url'] = base_url
+        # Клиент будет создан заново с новым адресом при следующем запросе
+        gmaps = None
+    logger.info(f"Адрес Google Maps API: {base_url or 'https://maps.googleapis.com'}")
+
+
+def _response_key(cache, *parts) -> str:
+    """Ключ кэша ответов: параметры запроса, язык и, если задан, базовый URL API."""
+    base_url = GMAPS_CONFIG['base_url']
+    if base_url:
+        return cache.make_key(*parts, GMAPS_CONFIG['language'], base_url)
+    return cache.make_key(*parts, GMAPS_CONFIG['language'])
+
+
+def configure_address_pipeline(max_concurrency: Optional[int] = None,
+                               requests_per_second: Optional[float] = None,
+                               address_mode: Optional[str] = None,
+                               rate_share: Optional[float] = None,
+                               base_url: Optional[str] = None,
+                               ledger_path: Optional[str] = None,
+                               refill: Optional[bool] = None):
+    """
+    Настраивает параллелизм, бюджет запросов и режим генерации адресов.
+
+    Args:
+        max_concurrency: Максимальное количество одновременных запросов адресов
+        requests_per_second: Максимальное количество запросов к API в секунду (0 - без ограничения)
+        address_mode: Режим получения адресов (online, offline, hybrid)
+        rate_share: Доля бюджета запросов для текущего процесса (при генерации в нескольких процессах)
+        base_url: Базовый URL Google Maps API (см. set_gmaps_base_url)
+        ledger_path: Файл реестра уникальности адресов между партиями, процессами и запусками
+        refill: Включить фоновое пополнение адресов для режима online (см. cache_refiller.py)
+    """
+    global _executor
+
+    if address_mode is not None:
+        if address_mode not in ADDRESS_MODES:
+            raise ValueError(f"Неизвестный режим генерации адресов: {address_mode}")
+        GMAPS_CONFIG['address_mode'] = address_mode
+
+    if max_concurrency is not None:
+        if max_concurrency < 1:
+            raise ValueError("Количество одновременных запросов должно быть не меньше 1.")
+        GMAPS_CONFIG['max_concurrency'] = max_concurrency
+        # Пересоздаем пул потоков с новым размером при следующем обращении
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+    if requests_per_second is not None:
+        if requests_per_second < 0:
+            raise ValueError("Бюджет запросов в секунду не может быть отрицательным.")
+        GMAPS_CONFIG['requests_per_second'] = requests_per_second
+
+    if requests_per_second is not None or rate_share is not None:
+        configure_rate_limiter(rate_share=rate_share if rate_share is not None else 1.0)
+
+    if base_url is not None:
+        set_gmaps_base_url(base_url)
+
+    if ledger_path is not None:
+        configure_ledger(ledger_path)
+
+    if refill is not None:
+        CACHE_REFILL_CONFIG['enabled'] = refill
+        if not refill:
+            # Импорт здесь: cache_refiller импортирует gmaps_api
+            from cache_refiller import stop_cache_refiller
+            stop_cache_refiller()
+
+    logger.info(f"Режим генерации адресов: {GMAPS_CONFIG['address_mode']}, "
+                f"параллелизм: {GMAPS_CONFIG['max_concurrency']}, "
+                f"бюджет запросов: {GMAPS_CONFIG['requests_per_second']}/сек")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Возвращает пул потоков для генерации адресов, создавая его при необходимости."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=GMAPS_CONFIG['max_concurrency'],
+                                       thread_name_prefix='gmaps')
+    return _executor
+
+
+def claim_address(address: str) -> bool:
+    """
+    Атомарно помечает адрес как использованный.
+    Если задан реестр уникальности (LEDGER_CONFIG['path']), адрес отмечается и в нем.
+
+    Returns:
+        True, если адрес еще не использовался в текущей генерации и не выдавался ранее по реестру
+    """
+    with _address_lock:
+        if address in USED_ADDRESSES:
+            return False
+        USED_ADDRESSES.add(address)
+    # Отклоненный реестром адрес остается в USED_ADDRESSES, чтобы не проверять его повторно
+    return claim_unique('address', address)
+
 
 def reset_used_addresses(func):
     """
@@ -44,88 +192,191 @@ def reset_used_addresses(func):
     """
 
     def wrapper(*args, **kwargs):
-        global USED_ADDRESSES
-        USED_ADDRESSES.clear()
+        clear_used_addresses()
         logger.info("Список использованных адресов очищен перед генерацией")
         return func(*args, **kwargs)
 
     return wrapper
 
 
-def load_address_cache():
-    """Загружает кэш адресов из файла."""
-    global address_cache
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                address_cache = json.load(f)
-            logger.info(f"Загружен кэш адресов: {len(address_cache)} записей")
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке кэша адресов: {e}")
-            address_cache = {}
-    else:
-        address_cache = {}
+def clear_used_addresses():
+    """Очищает множество адресов, использованных в текущей генерации."""
+    with _address_lock:
+        USED_ADDRESSES.clear()
 
 
 def save_address_cache():
-    """Сохраняет кэш адресов в файл."""
-    try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(address_cache, f, ensure_ascii=False, indent=2)
-        logger.info(f"Кэш адресов сохранен: {len(address_cache)} записей")
-    except Exception as e:
-        logger.error(f"Ошибка при сохранении кэша адресов: {e}")
+    """Сохраняет несохраненные изменения кэша адресов."""
+    get_address_cache().flush()
 
 
-# Загружаем кэш при импорте модуля
-load_address_cache()
-
-
-def get_cached_address(country_code: str) -> Optional[str]:
+def get_cached_address(country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
     """
     Получает случайный адрес из кэша для указанной страны.
 
     Args:
         country_code: Код страны
+        rng: Генератор случайных чисел записи
 
     Returns:
         Адрес из кэша или None, если кэш пуст для данной страны
     """
-    country_addresses = address_cache.get(country_code, [])
-    if country_addresses:
-        return random.choice(country_addresses)
-    return None
+    address = get_address_cache().random_address(country_code, rng)
+    inc('address_cache_lookups_total', result='hit' if address else 'miss')
+    return address
 
 
-def add_to_cache(country_code: str, address: str):
+def add_to_cache(country_code: str, address: str) -> bool:
     """
     Добавляет адрес в кэш для указанной страны.
+    Дубликаты отбрасываются, старые записи удаляются при превышении лимита на страну.
 
     Args:
         country_code: Код страны
         address: Адрес для добавления в кэш
+
+    Returns:
+        True, если адреса еще не было в кэше
     """
-    if country_code not in address_cache:
-        address_cache[country_code] = []
+    return get_address_cache().add(country_code, address)
+
 
-    # Добавляем только если адрес уникален
-    if address not in address_cache[country_code]:
-        address_cache[country_code].append(address)
+def _is_over_limit(error: Exception) -> bool:
+    """Проверяет, что ошибка API означает превышение лимита запросов."""
+    if isinstance(error, googlemaps.exceptions.ApiError):
+        return error.status == 'OVER_QUERY_LIMIT'
+    if isinstance(error, googlemaps.exceptions.HTTPError):
+        return error.status_code == 429
+    return False
 
-        # Если кэш превышает 1000 адресов для страны, удаляем старые записи
-        if len(address_cache[country_code]) > 1000:
-            address_cache[country_code] = address_cache[country_code][-1000:]
 
-        # Сохраняем кэш каждые 10 новых адресов
-        if sum(len(addresses) for addresses in address_cache.values()) % 10 == 0:
-            save_address_cache()
+def _measured(endpoint: str, request: Callable[[], Any]) -> Callable[[], Any]:
+    """Оборачивает запрос к API замером длительности и подсчетом результата в метриках."""
+    def run():
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            result = request()
+            status = 'ok'
+            return result
+        except (googlemaps.exceptions.ApiError, googlemaps.exceptions.HTTPError) as e:
+            if _is_over_limit(e):
+                status = 'over_limit'
+            raise
+        finally:
+            observe('gmaps_api_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+            inc('gmaps_api_requests_total', endpoint=endpoint, status=status)
+    return run
+
+
+def call_with_rate_limit(endpoint: str, request: Callable[[], Any]) -> Any:
+    """
+    Выполняет запрос к API в слоте ограничителя запросов.
+    При OVER_QUERY_LIMIT конечная точка приостанавливается для всех потоков,
+    и запрос повторяется после паузы (не более RATE_LIMIT_CONFIG['max_over_limit_retries'] раз).
+
+    Args:
+        endpoint: Конечная точка ('places' или 'details')
+        request: Функция без аргументов, выполняющая запрос
+
+    Returns:
+        Результат запроса
+
+    Raises:
+        QuotaExceededError: если дневная квота исчерпана
+    """
+    limiter = get_rate_limiter()
+    retries = RATE_LIMIT_CONFIG['max_over_limit_retries']
+    request = _measured(endpoint, request)
+    for attempt in range(retries + 1):
+        limiter.acquire(endpoint)
+        try:
+            return request()
+        except (googlemaps.exceptions.ApiError, googlemaps.exceptions.HTTPError) as e:
+            if not _is_over_limit(e) or attempt == retries:
+                raise
+            limiter.report_over_limit(endpoint)
+
+
+async def _run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет блокирующий вызов (SQLite кэшей адресов и ответов, реестра уникальности) в пуле
+    потоков генерации адресов: ожидание блокировки файла другим процессом не останавливает
+    остальные записи в цикле событий.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+
+async def call_with_rate_limit_async(endpoint: str, request: Callable[[], Any]) -> Any:
+    """
+    Асинхронный вариант call_with_rate_limit: ожидание слота и паузы не блокируют цикл событий,
+    а сам запрос выполняется в пуле потоков генерации адресов.
+    """
+    limiter = get_rate_limiter()
+    retries = RATE_LIMIT_CONFIG['max_over_limit_retries']
+    loop = asyncio.get_running_loop()
+    request = _measured(endpoint, request)
+    for attempt in range(retries + 1):
+        await limiter.acquire_async(endpoint)
+        try:
+            return await loop.run_in_executor(_get_executor(), request)
+        except (googlemaps.exceptions.ApiError, googlemaps.exceptions.HTTPError) as e:
+            if not _is_over_limit(e) or attempt == retries:
+                raise
+            limiter.report_over_limit(endpoint)
+
+
+async def _shared_request(kind: str, key: str, request: Callable[[], Any]) -> Any:
+    """
+    Выполняет асинхронный запрос к API один раз для всех одновременно ожидающих его записей.
+
+    Args:
+        kind: Вид запроса ('places', 'details')
+        key: Ключ запроса в кэше ответов
+        request: Функция без аргументов, возвращающая корутину запроса
+    """
+    inflight_key = (kind, key)
+    future = _inflight_requests.get(inflight_key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.ensure_future(request())
+    _inflight_requests[inflight_key] = future
+    try:
+        return await asyncio.shield(future)
+    finally:
+        _inflight_requests.pop(inflight_key, None)
+
+
+def _search_places(location: str, radius: int, query: str) -> List[Dict[str, Any]]:
+    """Выполняет запрос Places Text Search и возвращает найденные места."""
+    response = get_gmaps_client().places(
+        query,
+        location=location,
+        radius=radius,
+        language=GMAPS_CONFIG['language']
+    )
+
+    if response.get("status") == "OK" and response.get("results"):
+        return response["results"]
+    logger.warning(f"Нет результатов для запроса: {query} в локации {location}")
+    return []
+
+
+def _fetch_place_details(place_id: str) -> Dict[str, Any]:
+    """Выполняет запрос Place Details и возвращает подробности о месте."""
+    details = get_gmaps_client().place(
+        place_id=place_id,
+        fields=("address_component", "formatted_address"),
+        language=GMAPS_CONFIG['language']
+    )
+    return details.get("result", {})
 
 
-@lru_cache(maxsize=128)
 def get_nearby_places(location: str, radius: int, query: str = "residential building") -> List[Dict[str, Any]]:
     """
     Получает список мест рядом с указанной локацией.
-    Результаты кэшируются для повторного использования.
+    Результаты сохраняются в постоянном кэше ответов (response_cache) и переживают перезапуск.
 
     Args:
         location: Координаты локации в формате "lat,lng"
@@ -134,52 +385,123 @@ def get_nearby_places(location: str, radius: int, query: str = "residential buil
 
     Returns:
         Список мест
+
+    Raises:
+        QuotaExceededError: если дневная квота исчерпана
     """
+    cache = get_response_cache()
+    key = _response_key(cache, location, radius, query)
+    places = cache.get('places', key)
+    inc('gmaps_response_cache_total', endpoint='places', result='miss' if places is None else 'hit')
+    if places is not None:
+        return places
+
     try:
-        response = gmaps.places(
-            query,
-            location=location,
-            radius=radius,
-            language=GMAPS_CONFIG['language']
-        )
-
-        if response.get("status") == "OK" and response.get("results"):
-            return response["results"]
-        else:
-            logger.warning(f"Нет результатов для запроса: {query} в локации {location}")
-            return []
+        places = call_with_rate_limit('places', partial(_search_places, location, radius, query))
+    except googlemaps.exceptions.ApiError as e:
+        logger.error(f"Google Maps API error: {e}")
+        return []
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.exception(f"Неожиданная ошибка при вызове Google Maps API: {e}")
+        return []
+
+    # Пустые результаты не кэшируются, чтобы временная ошибка не закрепилась за локацией
+    if places:
+        cache.put('places', key, places)
+    return places
+
 
+async def get_nearby_places_async(location: str, radius: int,
+                                  query: str = "residential building") -> List[Dict[str, Any]]:
+    """Асинхронный вариант get_nearby_places."""
+    cache = get_response_cache()
+    key = _response_key(cache, location, radius, query)
+    places = await _run_blocking(cache.get, 'places', key)
+    inc('gmaps_response_cache_total', endpoint='places', result='miss' if places is None else 'hit')
+    if places is not None:
+        return places
+
+    try:
+        places = await _shared_request('places', key, partial(
+            call_with_rate_limit_async, 'places', partial(_search_places, location, radius, query)))
     except googlemaps.exceptions.ApiError as e:
         logger.error(f"Google Maps API error: {e}")
         return []
+    except QuotaExceededError:
+        raise
     except Exception as e:
         logger.exception(f"Неожиданная ошибка при вызове Google Maps API: {e}")
         return []
 
+    if places:
+        await _run_blocking(cache.put, 'places', key, places)
+    return places
+
 
 def get_place_details(place_id: str) -> Dict[str, Any]:
     """
     Получает подробности о месте по его ID.
+    Результаты сохраняются в постоянном кэше ответов (response_cache).
 
     Args:
         place_id: ID места
 
     Returns:
         Словарь с подробностями о месте
+
+    Raises:
+        QuotaExceededError: если дневная квота исчерпана
     """
+    cache = get_response_cache()
+    key = _response_key(cache, place_id)
+    details = cache.get('details', key)
+    inc('gmaps_response_cache_total', endpoint='details', result='miss' if details is None else 'hit')
+    if details is not None:
+        return details
+
     try:
-        details = gmaps.place(
-            place_id=place_id,
-            fields=("address_component", "formatted_address")
-        )
-        return details.get("result", {})
+        details = call_with_rate_limit('details', partial(_fetch_place_details, place_id))
     except googlemaps.exceptions.ApiError as e:
         logger.error(f"Google Maps API error при получении деталей места: {e}")
         return {}
+    except QuotaExceededError:
+        raise
     except Exception as e:
         logger.exception(f"Неожиданная ошибка при получении деталей места: {e}")
         return {}
 
+    if details:
+        cache.put('details', key, details)
+    return details
+
+
+async def get_place_details_async(place_id: str) -> Dict[str, Any]:
+    """Асинхронный вариант get_place_details."""
+    cache = get_response_cache()
+    key = _response_key(cache, place_id)
+    details = await _run_blocking(cache.get, 'details', key)
+    inc('gmaps_response_cache_total', endpoint='details', result='miss' if details is None else 'hit')
+    if details is not None:
+        return details
+
+    try:
+        details = await _shared_request('details', key, partial(
+            call_with_rate_limit_async, 'details', partial(_fetch_place_details, place_id)))
+    except googlemaps.exceptions.ApiError as e:
+        logger.error(f"Google Maps API error при получении деталей места: {e}")
+        return {}
+    except QuotaExceededError:
+        raise
+    except Exception as e:
+        logger.exception(f"Неожиданная ошибка при получении деталей места: {e}")
+        return {}
+
+    if details:
+        await _run_blocking(cache.put, 'details', key, details)
+    return details
+
 
 def extract_address_components(address_components: List[Dict[str, Any]]) -> Dict[str, str]:
     """
@@ -213,44 +535,286 @@ def extract_address_components(address_components: List[Dict[str, Any]]) -> Dict
     return components
 
 
-def generate_address(country_code: str) -> Optional[str]:
+def generate_address(country_code: str, mode: Optional[str] = None,
+                     rng: Optional[random.Random] = None) -> Optional[str]:
     """
     Генерирует уникальный адрес жилого здания в заданной стране.
+
+    Args:
+        country_code: Код страны
+        mode: Режим получения адресов (online, offline, hybrid).
+            Если None, используется GMAPS_CONFIG['address_mode'].
+        rng: Генератор случайных чисел записи. Полностью воспроизводим только режим offline:
+            ответы API и содержимое кэша зависят от внешнего состояния.
+
+    Returns:
+        Адрес или None, если адрес получить не удалось
     """
-    # Максимальное количество попыток генерации уникального адреса
-    max_unique_attempts = 10
+    if mode is None:
+        mode = GMAPS_CONFIG['address_mode']
+
+    with timed('address_seconds', mode=mode):
+        address = _generate_address(country_code, mode, rng)
+    inc('addresses_total', mode=mode, result='ok' if address else 'empty')
+    return address
 
+
+def _generate_address(country_code: str, mode: str, rng: Optional[random.Random]) -> Optional[str]:
+    """Получает адрес в указанном режиме (см. generate_address)."""
+    if mode == 'offline':
+        return generate_offline_address(country_code, rng=rng)
+
+    if mode == 'hybrid':
+        address = get_unused_cached_address(country_code, rng=rng)
+        if address:
+            return address
+        address = generate_offline_address(country_code, rng=rng)
+        if address:
+            return address
+        logger.info(f"Офлайн-генерация не дала адреса для страны {country_code}, используется Google Maps API")
+
+    return generate_online_address(country_code, rng)
+
+
+def get_unused_cached_address(country_code: str, attempts: int = 3,
+                              rng: Optional[random.Random] = None) -> Optional[str]:
+    """
+    Возвращает адрес из кэша, еще не использованный в текущей генерации.
+
+    Args:
+        country_code: Код страны
+        attempts: Количество попыток выбрать неиспользованный адрес
+        rng: Генератор случайных чисел записи
+
+    Returns:
+        Адрес из кэша или None
+    """
+    for _ in range(attempts):
+        cached_address = get_cached_address(country_code, rng)
+        if not cached_address:
+            return None
+        if claim_address(cached_address):
+            logger.debug(f"Использован кэшированный адрес для страны {country_code}")
+            return cached_address
+        inc('address_duplicates_total', source='cache')
+    return None
+
+
+def generate_offline_address(country_code: str, max_unique_attempts: int = 10,
+                             rng: Optional[random.Random] = None) -> Optional[str]:
+    """
+    Генерирует уникальный адрес локально, без обращения к Google Maps API.
+    Такие адреса не добавляются в кэш, чтобы не смешивать их с реальными.
+
+    Args:
+        country_code: Код страны
+        max_unique_attempts: Максимальное количество попыток получить неиспользованный адрес
+        rng: Генератор случайных чисел записи
+
+    Returns:
+        Адрес или None
+    """
     for _ in range(max_unique_attempts):
-        # Пробуем получить адрес из кэша (с вероятностью 70%)
-        if random.random() < 0.7:
-            cached_address = get_cached_address(country_code)
-            if cached_address and cached_address not in USED_ADDRESSES:
+        address = synthesize_address(country_code, rng)
+        if address is None:
+            return None
+        if claim_address(address):
+            return address
+        inc('address_duplicates_total', source='offline')
+    return None
+
+
+def _pick_search_area(country_code: str, rng) -> Optional[Tuple[str, int]]:
+    """
+    Выбирает случайную локацию страны и радиус поиска для нее.
+
+    Returns:
+        Пара (координаты "lat,lng", радиус в метрах) или None, если данных по стране нет
+    """
+    # Получаем координаты для заданной страны
+    locations = CITY_COORDINATES.get(country_code, [])
+    if not locations:
+        logger.error(f"Нет координат для страны: {country_code}")
+        return None
+
+    # Выбираем случайную локацию
+    location = rng.choice(locations)
+
+    # Получаем информацию о радиусе поиска
+    radius_info = RADIUS_DATA.get(country_code, {})
+    if not radius_info:
+        logger.error(f"Нет данных по радиусу для страны: {country_code}")
+        return None
+
+    # Определяем радиус поиска в зависимости от локации
+    radius = (radius_info.get("border")
+              if location in radius_info.get("border_cities", [])
+              else radius_info.get("default"))
+    return location, radius
+
+
+def _ready_address(country_code: str) -> Optional[str]:
+    """Берет готовый адрес фонового пополнения, если оно включено (CACHE_REFILL_CONFIG['enabled'])."""
+    if not CACHE_REFILL_CONFIG['enabled']:
+        return None
+    # Импорт здесь: cache_refiller импортирует gmaps_api
+    from cache_refiller import take_ready_address
+    return take_ready_address(country_code)
+
+
+def _claim_cached_address(country_code: str, rng) -> Optional[str]:
+    """С вероятностью 70% пробует взять из кэша еще не использованный адрес."""
+    if rng.random() < 0.7:
+        cached_address = get_cached_address(country_code, rng)
+        if cached_address:
+            if claim_address(cached_address):
                 logger.info(f"Использован кэшированный адрес для страны {country_code}")
-                USED_ADDRESSES.add(cached_address)
                 return cached_address
+            inc('address_duplicates_total', source='cache')
+    return None
 
-        # Если не получили уникальный адрес из кэша, генерируем новый
-        logger.info(f"Генерация нового адреса для страны {country_code}")
 
-        # Получаем координаты для заданной страны
-        locations = CITY_COORDINATES.get(country_code, [])
-        if not locations:
-            logger.error(f"Нет координат для страны: {country_code}")
+def _place_address(country_code: str, place: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    """
+    Формирует нормализованный адрес из найденного места и его подробностей (без проверки уникальности).
+
+    Returns:
+        Валидный адрес или None, если место не дало подходящего адреса
+    """
+    # Если не получили детали, пробуем использовать форматированный адрес из результатов поиска
+    if not details:
+        formatted = place.get("formatted_address")
+        if formatted and re.search(r'\d+', formatted):
+            address = normalize_string(formatted)
+            if is_valid_address(address):
+                # Удаляем название страны, если оно присутствует
+                if COUNTRY_NAMES.get(country_code) and COUNTRY_NAMES[country_code] in address:
+                    address = remove_country_from_address(address, COUNTRY_NAMES[country_code])
+                return address
+        return None
+
+    # Извлекаем компоненты адреса
+    address_components = details.get("address_components", [])
+    if not address_components:
+        return None
+
+    # Извлекаем компоненты адреса
+    components = extract_address_components(address_components)
+
+    # Проверяем наличие необходимых компонентов
+    required_components = GMAPS_CONFIG['required_components']
+    if not all(comp in components for comp in required_components):
+        # Если номер дома отсутствует, считаем адрес недействительным
+        if 'street_number' not in components:
+            logger.info("Номер дома не найден в адресе, повторяем запрос...")
             return None
 
-        # Выбираем случайную локацию
-        location = random.choice(locations)
+    # Форматируем адрес
+    formatted_address = format_address_components(components)
 
-        # Получаем информацию о радиусе поиска
-        radius_info = RADIUS_DATA.get(country_code, {})
-        if not radius_info:
-            logger.error(f"Нет данных по радиусу для страны: {country_code}")
+    # Если не удалось сформировать адрес, пробуем использовать форматированный адрес из API
+    if not formatted_address:
+        formatted_address = details.get("formatted_address")
+        if not formatted_address or not re.search(r'\d+', formatted_address):
             return None
 
-        # Определяем радиус поиска в зависимости от локации
-        radius = (radius_info.get("border")
-                  if location in radius_info.get("border_cities", [])
-                  else radius_info.get("default"))
+    # Нормализуем адрес
+    normalized = normalize_string(formatted_address)
+
+    # Удаляем название страны, если оно присутствует
+    if COUNTRY_NAMES.get(country_code) and COUNTRY_NAMES[country_code] in normalized:
+        normalized = remove_country_from_address(normalized, COUNTRY_NAMES[country_code])
+
+    return normalized if is_valid_address(normalized) else None
+
+
+def _address_from_place(country_code: str, place: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    """
+    Формирует адрес из найденного места и его подробностей.
+    Валидный и еще не использованный адрес помечается как использованный и добавляется в кэш.
+
+    Returns:
+        Адрес или None, если место не дало подходящего адреса
+    """
+    address = _place_address(country_code, place, details)
+    if address and claim_address(address):
+        # Добавляем в кэш, список использованных и возвращаем
+        add_to_cache(country_code, address)
+        return address
+    return None
+
+
+def fetch_new_address(country_code: str, rng: Optional[random.Random] = None,
+                      new_only: bool = False) -> Optional[str]:
+    """
+    Запрашивает через Google Maps API один новый адрес и добавляет его в кэш,
+    не помечая как использованный (для фонового пополнения, см. cache_refiller.py).
+    Запросы проходят через общий ограничитель, поэтому укладываются в бюджет запросов.
+
+    Args:
+        country_code: Код страны
+        rng: Генератор случайных чисел
+        new_only: Возвращать только адреса, которых еще не было в кэше (для заполнения кэша)
+
+    Returns:
+        Адрес, еще не использованный в текущей генерации, или None
+
+    Raises:
+        QuotaExceededError: если дневная квота API исчерпана
+    """
+    rng = rng or random
+    area = _pick_search_area(country_code, rng)
+    if area is None:
+        return None
+    location, radius = area
+
+    try:
+        places = get_nearby_places(location, radius)
+        if not places:
+            return None
+        place = rng.choice(places)
+        address = _place_address(country_code, place, get_place_details(place.get("place_id")))
+    except QuotaExceededError:
+        raise
+    except googlemaps.exceptions.ApiError as e:
+        logger.error(f"Google Maps API error: {e}")
+        return None
+
+    if not address:
+        return None
+    with _address_lock:
+        if address in USED_ADDRESSES:
+            return None
+    if not add_to_cache(country_code, address) and new_only:
+        return None
+    return address
+
+
+def generate_online_address(country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
+    """
+    Генерирует уникальный адрес жилого здания в заданной стране с помощью кэша и Google Maps API.
+    """
+    rng = rng or random
+    # Адрес из очереди фонового пополнения не требует запросов к API
+    address = _ready_address(country_code)
+    if address:
+        return address
+
+    # Максимальное количество попыток генерации уникального адреса
+    max_unique_attempts = 10
+
+    for _ in range(max_unique_attempts):
+        # Пробуем получить адрес из кэша (с вероятностью 70%)
+        cached_address = _claim_cached_address(country_code, rng)
+        if cached_address:
+            return cached_address
+
+        # Если не получили уникальный адрес из кэша, генерируем новый
+        logger.info(f"Генерация нового адреса для страны {country_code}")
+        area = _pick_search_area(country_code, rng)
+        if area is None:
+            return None
+        location, radius = area
 
         # Максимальное количество попыток получения адреса
         max_attempts = GMAPS_CONFIG['max_retries']
@@ -266,83 +830,96 @@ def generate_address(country_code: str) -> Optional[str]:
                     attempt += 1
                     continue
 
-                # Выбираем случайное место
-                place = random.choice(places)
-                place_id = place.get("place_id")
-
-                # Получаем подробности о месте
-                details = get_place_details(place_id)
-
-                # Если не получили детали, пробуем использовать форматированный адрес из результатов поиска
-                if not details:
-                    formatted = place.get("formatted_address")
-                    if formatted and re.search(r'\d+', formatted):
-                        address = normalize_string(formatted)
-                        if is_valid_address(address) and address not in USED_ADDRESSES:
-                            # Удаляем название страны, если оно присутствует
-                            if COUNTRY_NAMES.get(country_code) and COUNTRY_NAMES[country_code] in address:
-                                address = remove_country_from_address(address, COUNTRY_NAMES[country_code])
-
-                            # Добавляем в кэш, список использованных и возвращаем
-                            add_to_cache(country_code, address)
-                            USED_ADDRESSES.add(address)
-                            return address
-                    attempt += 1
-                    continue
+                # Выбираем случайное место и получаем подробности о нем
+                place = rng.choice(places)
+                details = get_place_details(place.get("place_id"))
 
-                # Извлекаем компоненты адреса
-                address_components = details.get("address_components", [])
-                if not address_components:
-                    attempt += 1
-                    continue
+                address = _address_from_place(country_code, place, details)
+                if address:
+                    return address
+                attempt += 1
+                continue
 
-                # Извлекаем компоненты адреса
-                components = extract_address_components(address_components)
+            except QuotaExceededError as e:
+                logger.error(f"{e}. Генерация адресов через Google Maps API невозможна до конца суток.")
+                return None
+            except googlemaps.exceptions.ApiError as e:
+                logger.error(f"Google Maps API error: {e}")
+            except Exception as e:
+                logger.exception("Неожиданная ошибка при вызове Google Maps API")
 
-                # Проверяем наличие необходимых компонентов
-                required_components = GMAPS_CONFIG['required_components']
-                if not all(comp in components for comp in required_components):
-                    # Если номер дома отсутствует, считаем адрес недействительным
-                    if 'street_number' not in components:
-                        logger.info("Номер дома не найден в адресе, повторяем запрос...")
-                        attempt += 1
-                        continue
+            # Увеличиваем счетчик попыток и ждем перед повторным запросом
+            attempt += 1
+            if attempt < max_attempts:
+                sleep_time = GMAPS_CONFIG['retry_base_delay'] ** attempt
+                logger.info(f"Попытка {attempt}/{max_attempts} не удалась, повтор через {sleep_time} сек...")
+                time.sleep(sleep_time)
 
-                # Форматируем адрес
-                formatted_address = format_address_components(components)
+        logger.error(
+            f"Не удалось получить уникальный адрес для страны {country_code} после {max_unique_attempts} попыток.")
 
-                # Если не удалось сформировать адрес, пробуем использовать форматированный адрес из API
-                if not formatted_address:
-                    formatted_address = details.get("formatted_address")
-                    if not formatted_address or not re.search(r'\d+', formatted_address):
-                        attempt += 1
-                        continue
+    return None
 
-                # Нормализуем адрес
-                normalized = normalize_string(formatted_address)
 
-                # Удаляем название страны, если оно присутствует
-                if COUNTRY_NAMES.get(country_code) and COUNTRY_NAMES[country_code] in normalized:
-                    normalized = remove_country_from_address(normalized, COUNTRY_NAMES[country_code])
+async def generate_online_address_async(country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
+    """
+    Асинхронный вариант generate_online_address.
+    Запросы к API и обращения к SQLite (кэш адресов, реестр уникальности) выполняются
+    в пуле потоков, а ожидание слотов ограничителя и паузы между повторами -
+    через asyncio.sleep, не занимая потоки пула.
+    """
+    rng = rng or random
+    address = await _run_blocking(_ready_address, country_code)
+    if address:
+        return address
+
+    max_unique_attempts = 10
+
+    for _ in range(max_unique_attempts):
+        cached_address = await _run_blocking(_claim_cached_address, country_code, rng)
+        if cached_address:
+            return cached_address
+
+        logger.info(f"Генерация нового адреса для страны {country_code}")
+        area = _pick_search_area(country_code, rng)
+        if area is None:
+            return None
+        location, radius = area
+
+        max_attempts = GMAPS_CONFIG['max_retries']
+        attempt = 0
+
+        while attempt < max_attempts:
+            try:
+                places = await get_nearby_places_async(location, radius)
+
+                if not places:
+                    logger.warning(f"Нет подходящих мест для локации {location}")
+                    attempt += 1
+                    continue
+
+                place = rng.choice(places)
+                details = await get_place_details_async(place.get("place_id"))
 
-                # Проверяем валидность и уникальность адреса
-                if is_valid_address(normalized) and normalized not in USED_ADDRESSES:
-                    # Добавляем в кэш, список использованных и возвращаем
-                    add_to_cache(country_code, normalized)
-                    USED_ADDRESSES.add(normalized)
-                    return normalized
+                address = await _run_blocking(_address_from_place, country_code, place, details)
+                if address:
+                    return address
+                attempt += 1
+                continue
 
+            except QuotaExceededError as e:
+                logger.error(f"{e}. Генерация адресов через Google Maps API невозможна до конца суток.")
+                return None
             except googlemaps.exceptions.ApiError as e:
                 logger.error(f"Google Maps API error: {e}")
             except Exception as e:
                 logger.exception("Неожиданная ошибка при вызове Google Maps API")
 
-            # Увеличиваем счетчик попыток и ждем перед повторным запросом
             attempt += 1
             if attempt < max_attempts:
                 sleep_time = GMAPS_CONFIG['retry_base_delay'] ** attempt
                 logger.info(f"Попытка {attempt}/{max_attempts} не удалась, повтор через {sleep_time} сек...")
-                time.sleep(sleep_time)
+                await asyncio.sleep(sleep_time)
 
         logger.error(
             f"Не удалось получить уникальный адрес для страны {country_code} после {max_unique_attempts} попыток.")
@@ -350,6 +927,48 @@ def generate_address(country_code: str) -> Optional[str]:
     return None
 
 
+async def generate_address_async(country_code: str, rng: Optional[random.Random] = None) -> Optional[str]:
+    """
+    Асинхронно генерирует уникальный адрес в заданной стране.
+    Блокирующие вызовы Google Maps выполняются в ограниченном пуле потоков,
+    поэтому несколько адресов запрашиваются одновременно; ожидание лимитов
+    и повторов не блокирует ни цикл событий, ни потоки пула.
+
+    Args:
+        country_code: Код страны
+        rng: Генератор случайных чисел записи
+
+    Returns:
+        Адрес или None, если адрес получить не удалось
+    """
+    mode = GMAPS_CONFIG['address_mode']
+    start = time.perf_counter()
+    address = await _generate_address_async(country_code, mode, rng)
+    observe('address_seconds', time.perf_counter() - start, mode=mode)
+    inc('addresses_total', mode=mode, result='ok' if address else 'empty')
+    return address
+
+
+async def _generate_address_async(country_code: str, mode: str, rng: Optional[random.Random]) -> Optional[str]:
+    """Асинхронно получает адрес в указанном режиме (см. generate_address_async)."""
+    if mode == 'offline':
+        # Офлайн-генерация не обращается к сети, но отметка адреса в реестре уникальности - запись
+        # в SQLite, поэтому с реестром она выполняется в пуле потоков, без реестра - сразу
+        if get_ledger() is not None:
+            return await _run_blocking(generate_offline_address, country_code, rng=rng)
+        return generate_offline_address(country_code, rng=rng)
+
+    if mode == 'hybrid':
+        # Выборка из кэша и отметка адреса обращаются к SQLite, поэтому выполняются в пуле потоков
+        address = (await _run_blocking(get_unused_cached_address, country_code, rng=rng)
+                   or await _run_blocking(generate_offline_address, country_code, rng=rng))
+        if address:
+            return address
+        logger.info(f"Офлайн-генерация не дала адреса для страны {country_code}, используется Google Maps API")
+
+    return await generate_online_address_async(country_code, rng)
+
+
 def batch_generate_addresses(country_code: str, count: int = 10) -> List[str]:
     """
     Генерирует несколько адресов для указанной страны.
@@ -374,21 +993,3 @@ def batch_generate_addresses(country_code: str, count: int = 10) -> List[str]:
             logger.warning(f"Не удалось сгенерировать адрес {i + 1}/{count} для страны {country_code}")
 
     return addresses
-
-
-def prefill_address_cache(country_codes: List[str], addresses_per_country: int = 5):
-    """
-    Предварительно заполняет кэш адресов для указанных стран.
-
-    Args:
-        country_codes: Список кодов стран
-        addresses_per_country: Количество адресов для генерации для каждой страны
-    """
-    logger.info(f"Предварительное заполнение кэша адресов для стран: {', '.join(country_codes)}")
-
-    for country_code in country_codes:
-        batch_generate_addresses(country_code, addresses_per_country)
-
-    # Сохраняем кэш
-    save_address_cache()
-    logger.info("Предварительное заполнение кэша адресов завершено")
@@ -0,0 +1,386 @@
+# gmaps_stub.py
+import argparse
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque, Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+from config import GMAPS_STUB_CONFIG, CITY_COORDINATES, GOOGLE_MAPS_API_KEY
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEARCH_PATH = '/maps/api/place/textsearch/json'
+DETAILS_PATH = '/maps/api/place/details/json'
+
+LATENCY_DISTRIBUTIONS = ['fixed', 'uniform', 'lognormal']
+
+# Параметры запроса, не влияющие на ответ (ключи и подписи не попадают в записанные ответы)
+_AUTH_PARAMS = {'key', 'client', 'signature', 'channel'}
+
+
+def request_key(path: str, params: Dict[str, str]) -> str:
+    """
+    Формирует ключ запроса для записи и воспроизведения ответов.
+    Ключ API и пустые параметры (клиент googlemaps передает, например, minprice=None) не учитываются.
+    """
+    query = sorted((name, value) for name, value in params.items()
+                   if name not in _AUTH_PARAMS and value not in ('', 'None'))
+    return f"{path}?{urlencode(query)}"
+
+
+def _stable_rng(*parts: Any) -> random.Random:
+    """Генератор случайных чисел, зависящий только от параметров запроса: одинаковые запросы - одинаковые ответы."""
+    digest = hashlib.blake2b(json.dumps(parts, ensure_ascii=False).encode('utf-8'), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, 'big'))
+
+
+# Координаты городов из CITY_COORDINATES -> код страны
+_LOCATION_COUNTRIES = {location: country for country, locations in CITY_COORDINATES.items() for location in locations}
+
+
+def country_for_location(location: str) -> str:
+    """Определяет страну по координатам запроса: точное совпадение с CITY_COORDINATES или ближайший город."""
+    if location in _LOCATION_COUNTRIES:
+        return _LOCATION_COUNTRIES[location]
+    try:
+        lat, lng = (float(value) for value in location.split(','))
+    except ValueError:
+        return 'US'
+
+    def distance(item: Tuple[str, str]) -> float:
+        city_lat, city_lng = (float(value) for value in item[0].split(','))
+        return (city_lat - lat) ** 2 + (city_lng - lng) ** 2
+
+    return min(_LOCATION_COUNTRIES.items(), key=distance)[1] if _LOCATION_COUNTRIES else 'US'
+
+
+def _place_components(place_id: str) -> Tuple[str, Dict[str, str]]:
+    """Восстанавливает страну и компоненты адреса места по его идентификатору."""
+    # Импорт внутри функции: offline_address импортирует data_generator и Faker
+    from offline_address import synthesize_address_components
+
+    parts = place_id.split(':')
+    country = parts[1] if len(parts) == 3 and parts[0] == 'stub' else 'US'
+    return country, synthesize_address_components(country, _stable_rng(place_id))
+
+
+def _formatted_address(components: Dict[str, str], country: str) -> str:
+    return (f"{components['route']} {components['street_number']}, "
+            f"{components['postal_code']} {components['locality']}, {country}")
+
+
+def synthetic_text_search(params: Dict[str, str], results: int) -> Dict[str, Any]:
+    """Формирует ответ Places Text Search с синтетическими жилыми зданиями вокруг локации запроса."""
+    location = params.get('location', '')
+    country = country_for_location(location)
+    rng = _stable_rng(TEXT_SEARCH_PATH, location, params.get('radius'), params.get('query'))
+    try:
+        lat, lng = (float(value) for value in location.split(','))
+    except ValueError:
+        lat, lng = 0.0, 0.0
+
+    places = []
+    for _ in range(results):
+        place_id = f"stub:{country}:{rng.getrandbits(48):012x}"
+        _, components = _place_components(place_id)
+        places.append({
+            'place_id': place_id,
+            'name': f"{components['route']} {components['street_number']}",
+            'formatted_address': _formatted_address(components, country),
+            'types': ['premise', 'establishment'],
+            'geometry': {'location': {'lat': lat + rng.uniform(-0.05, 0.05), 'lng': lng + rng.uniform(-0.05, 0.05)}},
+        })
+    return {'status': 'OK', 'results': places, 'html_attributions': []}
+
+
+def synthetic_place_details(params: Dict[str, str]) -> Dict[str, Any]:
+    """Формирует ответ Place Details для места из synthetic_text_search."""
+    # Клиент googlemaps передает идентификатор в параметре placeid, текущая версия API - place_id
+    place_id = params.get('placeid') or params.get('place_id', '')
+    if not place_id.startswith('stub:'):
+        return {'status': 'NOT_FOUND', 'html_attributions': []}
+    country, components = _place_components(place_id)
+    address_components = [
+        {'long_name': components['street_number'], 'short_name': components['street_number'],
+         'types': ['street_number']},
+        {'long_name': components['route'], 'short_name': components['route'], 'types': ['route']},
+        {'long_name': components['locality'], 'short_name': components['locality'],
+         'types': ['locality', 'political']},
+        {'long_name': components['postal_code'], 'short_name': components['postal_code'], 'types': ['postal_code']},
+        {'long_name': country, 'short_name': country, 'types': ['country', 'political']},
+    ]
+    return {
+        'status': 'OK',
+        'result': {'address_components': address_components,
+                   'formatted_address': _formatted_address(components, country)},
+        'html_attributions': [],
+    }
+
+
+class GMapsStubServer:
+    """
+    Локальная заглушка Google Maps Places API (Text Search и Place Details) для нагрузочных замеров.
+
+    Отвечает синтетическими данными в формате Google: одинаковые запросы всегда получают
+    одинаковые ответы. Задержка ответа выбирается из заданного распределения; часть ответов
+    можно заменить ошибкой (UNKNOWN_ERROR, HTTP 503) или OVER_QUERY_LIMIT, в том числе
+    при превышении qps запросов в секунду.
+
+    При record_path запросы проксируются в настоящий API (upstream), а ответы дописываются в
+    NDJSON-файл; при replay_path ответы берутся из такого файла, а для отсутствующих
+    запросов формируются синтетические (или NOT_FOUND при strict_replay).
+    Параметры, равные None, берутся из GMAPS_STUB_CONFIG.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 latency_ms: Optional[float] = None, distribution: Optional[str] = None,
+                 jitter: Optional[float] = None, error_rate: Optional[float] = None,
+                 http_error_rate: Optional[float] = None, over_limit_rate: Optional[float] = None,
+                 qps: Optional[float] = None, results_per_search: Optional[int] = None,
+                 seed: Optional[int] = None, record_path: Optional[str] = None,
+                 replay_path: Optional[str] = None, strict_replay: bool = False,
+                 upstream: Optional[str] = None, upstream_key: Optional[str] = None):
+        def option(value, name):
+            return GMAPS_STUB_CONFIG[name] if value is None else value
+
+        self.host = option(host, 'host')
+        self.port = option(port, 'port')
+        self.latency_ms = option(latency_ms, 'latency_ms')
+        self.distribution = option(distribution, 'distribution')
+        if self.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Неизвестное распределение задержки: {self.distribution}")
+        self.jitter = option(jitter, 'jitter')
+        self.error_rate = option(error_rate, 'error_rate')
+        self.http_error_rate = option(http_error_rate, 'http_error_rate')
+        self.over_limit_rate = option(over_limit_rate, 'over_limit_rate')
+        self.qps = option(qps, 'qps')
+        self.results_per_search = option(results_per_search, 'results_per_search')
+        self.record_path = record_path
+        self.strict_replay = strict_replay
+        self.upstream = (upstream or GMAPS_STUB_CONFIG['upstream']).rstrip('/')
+        self.upstream_key = upstream_key or GOOGLE_MAPS_API_KEY
+        if record_path and replay_path:
+            raise ValueError("Запись и воспроизведение ответов нельзя включить одновременно")
+        if record_path and not self.upstream_key:
+            raise ValueError("Для записи ответов нужен ключ настоящего API (GOOGLE_MAPS_API_KEY)")
+
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: deque = deque()
+        self._recorded: Dict[str, Dict[str, Any]] = self._load_recording(replay_path) if replay_path else {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _load_recording(path: str) -> Dict[str, Dict[str, Any]]:
+        recorded = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recorded[entry['key']] = entry['response']
+        logger.info(f"Загружено {len(recorded)} записанных ответов из {path}")
+        return recorded
+
+    @property
+    def url(self) -> str:
+        """Базовый URL заглушки для GMAPS_CONFIG['base_url'] (--gmaps-url)."""
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}"
+
+    def _latency(self) -> float:
+        """Задержка ответа в секундах."""
+        if self.latency_ms <= 0:
+            return 0.0
+        with self._lock:
+            if self.distribution == 'uniform':
+                value = self._rng.uniform(self.latency_ms * (1 - self.jitter), self.latency_ms * (1 + self.jitter))
+            elif self.distribution == 'lognormal':
+                # latency_ms - медиана, jitter - сигма логарифма (0.5 дает p99 примерно в 3 раза выше медианы)
+                value = self._rng.lognormvariate(math.log(self.latency_ms), self.jitter)
+            else:
+                value = self.latency_ms
+        return max(value, 0.0) / 1000
+
+    def _injected_fault(self) -> Optional[str]:
+        """Выбирает, заменить ли ответ ошибкой: 'http', 'error', 'over_limit' или None."""
+        with self._lock:
+            if self.qps > 0:
+                # Скользящее окно в одну секунду, как у квоты Google
+                now = time.monotonic()
+                while self._recent and self._recent[0] <= now - 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.qps:
+                    return 'over_limit'
+                self._recent.append(now)
+            roll = self._rng.random()
+        if roll < self.http_error_rate:
+            return 'http'
+        roll -= self.http_error_rate
+        if roll < self.error_rate:
+            return 'error'
+        roll -= self.error_rate
+        if roll < self.over_limit_rate:
+            return 'over_limit'
+        return None
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _record(self, key: str, path: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """Выполняет запрос к настоящему API и дописывает ответ в файл записи."""
+        import requests
+
+        query = dict(params, key=self.upstream_key)
+        response = requests.get(f"{self.upstream}{path}", params=query, timeout=30).json()
+        if response.get('status') in ('OK', 'ZERO_RESULTS', 'NOT_FOUND'):
+            # Временные ошибки не записываются, чтобы не воспроизводить их потом как постоянные
+            with self._lock:
+                self._recorded[key] = response
+                with open(self.record_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'key': key, 'response': response}, ensure_ascii=False) + '\n')
+            self._count('recorded')
+        return response
+
+    def respond(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Формирует ответ на запрос.
+
+        Returns:
+            Пара (HTTP-статус, JSON-ответ)
+        """
+        if path not in (TEXT_SEARCH_PATH, DETAILS_PATH):
+            return 404, {'status': 'INVALID_REQUEST', 'error_message': f'Неизвестный путь {path}'}
+        self._count(path)
+
+        if self.record_path:
+            return 200, self._record(request_key(path, params), path, params)
+
+        time.sleep(self._latency())
+        fault = self._injected_fault()
+        if fault is not None:
+            self._count(fault)
+            if fault == 'http':
+                return 503, {'status': 'UNKNOWN_ERROR'}
+            if fault == 'over_limit':
+                return 200, {'status': 'OVER_QUERY_LIMIT', 'error_message': 'Превышен лимит запросов (заглушка)'}
+            return 200, {'status': 'UNKNOWN_ERROR', 'error_message': 'Внедренная ошибка (заглушка)'}
+
+        if self._recorded:
+            response = self._recorded.get(request_key(path, params))
+            if response is not None:
+                self._count('replayed')
+                return 200, response
+            self._count('replay_misses')
+            if self.strict_replay:
+                return 200, {'status': 'NOT_FOUND', 'html_attributions': []}
+
+        if path == TEXT_SEARCH_PATH:
+            return 200, synthetic_text_search(params, self.results_per_search)
+        return 200, synthetic_place_details(params)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == '/stats':
+                    status, body = 200, dict(stub.stats)
+                else:
+                    try:
+                        status, body = stub.respond(parsed.path, dict(parse_qsl(parsed.query)))
+                    except Exception as e:
+                        logger.exception(f"Ошибка заглушки Google Maps: {e}")
+                        status, body = 500, {'status': 'UNKNOWN_ERROR', 'error_message': str(e)}
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+        return Handler
+
+    def start(self) -> 'GMapsStubServer':
+        """Запускает сервер в фоновом потоке."""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='gmaps-stub', daemon=True)
+        self._thread.start()
+        logger.info(f"Заглушка Google Maps запущена: {self.url}")
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Локальная заглушка Google Maps Places API для нагрузочных замеров')
+    parser.add_argument('--host', type=str, help='Адрес сервера (по умолчанию: 127.0.0.1)')
+    parser.add_argument('--port', type=int, help='Порт сервера (по умолчанию: 8765)')
+    parser.add_argument('--latency-ms', type=float, help='Задержка ответа (медиана), мс')
+    parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, help='Распределение задержки')
+    parser.add_argument('--jitter', type=float,
+                        help='Разброс задержки: доля для uniform, сигма логарифма для lognormal')
+    parser.add_argument('--error-rate', type=float, help='Доля ответов UNKNOWN_ERROR')
+    parser.add_argument('--http-error-rate', type=float, help='Доля ответов HTTP 503')
+    parser.add_argument('--over-limit-rate', type=float, help='Доля ответов OVER_QUERY_LIMIT')
+    parser.add_argument('--qps', type=float,
+                        help='Лимит запросов в секунду, сверх него - OVER_QUERY_LIMIT (0 - без лимита)')
+    parser.add_argument('--seed', type=int, help='Сид задержек и внедряемых ошибок')
+    parser.add_argument('--record', type=str,
+                        help='Проксировать запросы в настоящий API и записывать ответы в NDJSON-файл')
+    parser.add_argument('--replay', type=str, help='Воспроизводить ответы из NDJSON-файла, записанного через --record')
+    parser.add_argument('--strict-replay', action='store_true',
+                        help='Отвечать NOT_FOUND на запросы, которых нет в записи (вместо синтетических ответов)')
+    parser.add_argument('-l', '--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Уровень логирования')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = GMapsStubServer(host=args.host, port=args.port, latency_ms=args.latency_ms,
+                             distribution=args.distribution, jitter=args.jitter, error_rate=args.error_rate,
+                             http_error_rate=args.http_error_rate, over_limit_rate=args.over_limit_rate,
+                             qps=args.qps, seed=args.seed, record_path=args.record, replay_path=args.replay,
+                             strict_replay=args.strict_replay)
+    server.start()
+    print(f"Заглушка Google Maps: {server.url} (python main.py --gmaps-url {server.url} ...)")
+    print("Для остановки нажмите Ctrl+C")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Статистика запросов: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
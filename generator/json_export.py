@@ -0,0 +1,145 @@
+# json_export.py
+import json
+import logging
+import os
+from typing import Optional, List, Dict, Any, BinaryIO
+
+import pandas as pd
+
+from compressed_io import open_output, split_compression
+
+logger = logging.getLogger(__name__)
+
+# orjson - необязательная зависимость: в несколько раз быстрее стандартного json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(record: Dict[str, Any]) -> bytes:
+    """Сериализует запись в компактный JSON (UTF-8, без экранирования не-ASCII символов)."""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def frame_records(data: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Преобразует DataFrame в список записей; пропущенные значения становятся null."""
+    return data.astype(object).where(data.notna(), None).to_dict('records')
+
+
+def encode_ndjson(data: pd.DataFrame) -> bytes:
+    """Кодирует партию данных в JSON Lines: одна запись на строку, каждая строка завершается переводом строки."""
+    return b''.join(dumps(record) + b'\n' for record in frame_records(data))
+
+
+def repair_ndjson_tail(filename: str) -> int:
+    """
+    Удаляет незавершенную последнюю строку NDJSON-файла (например, после прерванной записи),
+    чтобы дозапись начиналась с новой строки.
+
+    Returns:
+        Количество удаленных байт
+    """
+    if not os.path.exists(filename):
+        return 0
+    with open(filename, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return 0
+
+        # Ищем последний перевод строки, читая файл с конца блоками
+        position = size
+        while position > 0:
+            block = min(65536, position)
+            position -= block
+            f.seek(position)
+            index = f.read(block).rfind(b'\n')
+            if index != -1:
+                position += index + 1
+                break
+        f.truncate(position)
+    removed = size - position
+    logger.warning(f"Из файла {filename} удалена незавершенная последняя строка ({removed} байт)")
+    return removed
+
+
+class NDJSONWriter:
+    """
+    Потоково записывает партии данных в NDJSON (JSON Lines).
+
+    Каждая партия кодируется и записывается одним вызовом write, после чего буфер сбрасывается,
+    поэтому файл можно читать построчно (tail -f, jq) во время генерации.
+    При дозаписи незавершенная последняя строка прерванного запуска удаляется
+    (кроме сжатых файлов: их поврежденный конец восстановить нельзя).
+    """
+
+    def __init__(self, filename: str, append: bool = False, fsync: bool = False):
+        self.filename = filename
+        self.fsync = fsync
+        self.rows = 0
+        if append and split_compression(filename)[1] is None:
+            repair_ndjson_tail(filename)
+        self._file: Optional[BinaryIO] = open_output(filename, 'ab' if append else 'wb')
+
+    def write(self, data: pd.DataFrame):
+        """Дописывает партию данных."""
+        if data is None or data.empty:
+            return
+        self._file.write(encode_ndjson(data))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.rows += len(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JSONArrayWriter:
+    """
+    Потоково записывает партии данных в JSON-массив: по одной записи на строку,
+    без построения всего документа в памяти. Дозапись не поддерживается:
+    массив закрывается скобкой при close().
+    """
+
+    def __init__(self, filename: str, append: bool = False):
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            raise ValueError(f"Формат json не поддерживает дозапись в существующий файл {filename}, "
+                             f"используйте ndjson")
+        self.filename = filename
+        self.rows = 0
+        self._file: Optional[BinaryIO] = open_output(filename, 'wb')
+        self._file.write(b'[')
+
+    def write(self, data: pd.DataFrame):
+        """Дописывает партию данных в массив."""
+        if data is None or data.empty:
+            return
+        for record in frame_records(data):
+            self._file.write((b'\n' if self.rows == 0 else b',\n') + dumps(record))
+            self.rows += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.write(b'\n]\n' if self.rows else b']\n')
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,379 @@
+# metrics.py
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple, Callable, TYPE_CHECKING
+
+from config import METRICS_CONFIG
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Описания метрик для формата Prometheus
+METRIC_HELP = {
+    'gmaps_api_requests_total': 'Запросы к Google Maps API по конечным точкам и результату',
+    'gmaps_api_request_seconds': 'Длительность запроса к Google Maps API (без ожидания ограничителя)',
+    'gmaps_response_cache_total': 'Обращения к кэшу ответов Google Maps API',
+    'address_cache_lookups_total': 'Выборки случайного адреса из кэша адресов',
+    'address_duplicates_total': 'Адреса, отброшенные как уже использованные (в генерации или по реестру)',
+    'refill_fetches_total': 'Запросы адресов фоновым пополнением (result=empty - адрес не получен)',
+    'refill_takes_total': 'Обращения к очередям готовых адресов (result=miss - очередь пуста)',
+    'prefill_fetches_total': 'Запросы адресов при заполнении кэша (result=empty - новый адрес не получен)',
+    'ledger_claims_total': 'Проверки значений в реестре уникальности (result=duplicate - уже выдано)',
+    'addresses_total': 'Запросы адреса по режиму (result=empty - адрес не получен)',
+    'address_seconds': 'Время получения адреса по режиму',
+    'record_field_seconds': 'Время генерации поля записи',
+    'batch_field_seconds': 'Время генерации столбца для всей партии',
+    'record_retries_total': 'Повторы создания записи по причине',
+    'records_total': 'Созданные записи (address=empty - запись без адреса)',
+    'name_fallbacks_total': 'Имена, выбранные из пула запасной локали',
+    'records_per_second': 'Средняя скорость создания записей с начала запуска',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _label_text(key: LabelKey) -> str:
+    """Метки в виде 'endpoint=places,status=ok' для JSON-сводки."""
+    return ','.join(f"{name}={value}" for name, value in key)
+
+
+def _prometheus_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (как в Prometheus) и оценкой перцентилей."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Последняя корзина - значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Оценивает перцентиль линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else min(self.min, self.buckets[0])
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def state(self) -> tuple:
+        return self.buckets, list(self.counts), self.count, self.sum, self.min, self.max
+
+    def merge(self, state: tuple):
+        buckets, counts, count, total, minimum, maximum = state
+        if tuple(buckets) != self.buckets:
+            raise ValueError("Нельзя объединить гистограммы с разными корзинами")
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.count += count
+        self.sum += total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+
+class MetricsRegistry:
+    """
+    Потокобезопасное хранилище счетчиков и гистограмм с метками.
+
+    Метрики рабочих процессов передаются в основной процесс через snapshot()/merge().
+    """
+
+    def __init__(self, buckets: Optional[Tuple[float, ...]] = None):
+        self.buckets = tuple(buckets or METRICS_CONFIG['buckets'])
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Увеличивает счетчик."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Добавляет наблюдение (обычно длительность в секундах) в гистограмму."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        """Очищает все метрики и начинает отсчет времени запуска заново."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self, reset: bool = False) -> Dict[str, list]:
+        """Возвращает состояние метрик для передачи между процессами (объект сериализуется pickle)."""
+        with self._lock:
+            snapshot = {
+                'counters': [(name, labels, value) for (name, labels), value in self._counters.items()],
+                'histograms': [(name, labels, histogram.state())
+                               for (name, labels), histogram in self._histograms.items()],
+            }
+            if reset:
+                self._counters.clear()
+                self._histograms.clear()
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, list]):
+        """Добавляет метрики из snapshot() другого процесса."""
+        with self._lock:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, state in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(tuple(state[0]))
+                histogram.merge(state)
+
+    def _records(self) -> float:
+        return sum(value for (name, _), value in self._counters.items() if name == 'records_total')
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Возвращает сводку метрик для JSON: счетчики, гистограммы (count, sum, mean, p50, p95, p99, max),
+        доли результатов для счетчиков с меткой result и скорость создания записей.
+        """
+        with self._lock:
+            elapsed = time.time() - self.started
+            records = self._records()
+            counters: Dict[str, Dict[str, float]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, {})[_label_text(labels)] = value
+
+            histograms: Dict[str, Dict[str, Dict[str, float]]] = {}
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                histograms.setdefault(name, {})[_label_text(labels)] = {
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'mean': round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                    'p50': round(histogram.quantile(0.5), 6),
+                    'p95': round(histogram.quantile(0.95), 6),
+                    'p99': round(histogram.quantile(0.99), 6),
+                    'max': round(histogram.max, 6),
+                }
+
+            # Доли результатов (hit/miss/duplicate, ok/error) внутри групп с одинаковыми прочими метками
+            groups: Dict[Tuple[str, LabelKey], Dict[str, float]] = {}
+            for (name, labels), value in self._counters.items():
+                result = dict(labels).get('result') or dict(labels).get('status')
+                if result is None:
+                    continue
+                rest = tuple(pair for pair in labels if pair[0] not in ('result', 'status'))
+                groups.setdefault((name, rest), {})[result] = value
+            rates: Dict[str, Dict[str, float]] = {}
+            for (name, rest), results in sorted(groups.items()):
+                total = sum(results.values())
+                prefix = f"{_label_text(rest)}," if rest else ''
+                for result, value in sorted(results.items()):
+                    rates.setdefault(name, {})[f"{prefix}{result}"] = round(value / total, 4) if total else 0.0
+
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'records': records,
+            'records_per_second': round(records / elapsed, 2) if elapsed > 0 else 0.0,
+            'counters': counters,
+            'histograms': histograms,
+            'rates': rates,
+        }
+
+    def prometheus_text(self) -> str:
+        """Возвращает метрики в текстовом формате Prometheus (exposition format 0.0.4)."""
+        prefix = METRICS_CONFIG['prometheus_prefix']
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str, metric_type: str):
+            if name not in described:
+                described.add(name)
+                help_text = METRIC_HELP.get(name, name)
+                lines.append(f"# HELP {prefix}{name} {help_text}")
+                lines.append(f"# TYPE {prefix}{name} {metric_type}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                describe(name, 'counter')
+                lines.append(f"{prefix}{name}{_prometheus_labels(labels)} {value:g}")
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                describe(name, 'histogram')
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{prefix}{name}_bucket{_prometheus_labels(labels, ('le', f'{bound:g}'))} "
+                                 f"{cumulative}")
+                lines.append(f"{prefix}{name}_bucket{_prometheus_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{prefix}{name}_sum{_prometheus_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{prefix}{name}_count{_prometheus_labels(labels)} {histogram.count}")
+
+            elapsed = time.time() - self.started
+            rate = self._records() / elapsed if elapsed > 0 else 0.0
+        describe('records_per_second', 'gauge')
+        lines.append(f"{prefix}records_per_second {rate:.3f}")
+        return '\n'.join(lines) + '\n'
+
+
+# Общий реестр метрик процесса
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Возвращает общий реестр метрик процесса."""
+    return _registry
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Увеличивает счетчик общего реестра (ничего не делает, если метрики отключены)."""
+    if METRICS_CONFIG['enabled']:
+        _registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    """Добавляет наблюдение в гистограмму общего реестра (ничего не делает, если метрики отключены)."""
+    if METRICS_CONFIG['enabled']:
+        _registry.observe(name, value, **labels)
+
+
+@contextmanager
+def timed(name: str, **labels):
+    """
+    Замеряет время выполнения блока и добавляет его в гистограмму name.
+
+    Пример:
+        with timed('record_field_seconds', field='name'):
+            name = generate_name(country, rng)
+    """
+    if not METRICS_CONFIG['enabled']:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe(name, time.perf_counter() - start, **labels)
+
+
+def _write_atomic(path: str, text: str):
+    """Записывает файл через временный файл, чтобы читатель (node_exporter) не увидел его частично."""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def write_summary(path: str) -> Dict[str, Any]:
+    """Сохраняет JSON-сводку метрик в файл и возвращает ее."""
+    summary = _registry.summary()
+    _write_atomic(path, json.dumps(summary, ensure_ascii=False, indent=2))
+    logger.info(f"Сводка метрик сохранена в {path}")
+    return summary
+
+
+def write_prometheus(path: str):
+    """Сохраняет метрики в текстовом формате Prometheus (для textfile collector node_exporter)."""
+    _write_atomic(path, _registry.prometheus_text())
+
+
+def start_prometheus_file_writer(path: str, interval: Optional[float] = None) -> Callable[[], None]:
+    """
+    Периодически перезаписывает файл метрик Prometheus в фоновом потоке (для долгих запусков).
+
+    Args:
+        path: Путь к файлу (.prom)
+        interval: Период обновления в секундах. Если None, берется из METRICS_CONFIG.
+
+    Returns:
+        Функция остановки; при остановке файл записывается последний раз
+    """
+    interval = interval or METRICS_CONFIG['export_interval']
+    stopped = threading.Event()
+
+    def run():
+        while not stopped.wait(interval):
+            try:
+                write_prometheus(path)
+            except OSError as e:
+                logger.error(f"Не удалось записать метрики в {path}: {e}")
+
+    thread = threading.Thread(target=run, name='metrics-writer', daemon=True)
+    thread.start()
+
+    def stop():
+        stopped.set()
+        thread.join()
+        write_prometheus(path)
+
+    return stop
+
+
+def start_prometheus_server(port: int, host: str = '0.0.0.0') -> 'ThreadingHTTPServer':
+    """
+    Запускает HTTP-сервер, отдающий метрики Prometheus по адресу /metrics, в фоновом потоке.
+
+    Returns:
+        Сервер (остановка - server.shutdown())
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            payload = _registry.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Метрики Prometheus доступны по адресу http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -30,6 +30,18 @@ class User:
     # Убираем лишние поля: id, number, proxy, creation и т.д.
 
 
+# Столбцы записи пользователя в выходных данных (в порядке вывода) и соответствующие поля User
+USER_COLUMNS = {
+    'geo': 'geo',
+    'AppleID': 'apple_id',
+    'pass': 'password',
+    'number': 'number',
+    'name': 'name',
+    'address': 'address',
+    'birthday': 'birthday',
+}
+
+
 @dataclass
 class UserProfile:
     """
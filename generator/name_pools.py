@@ -0,0 +1,321 @@
+# name_pools.py
+import atexit
+import json
+import logging
+import os
+import random
+import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Optional, Dict, List, Tuple, Any, Callable
+
+import numpy as np
+
+from config import NAME_POOL_CONFIG
+from utils import normalize_string
+
+logger = logging.getLogger(__name__)
+
+# Пулы имен по локалям
+_pools: Dict[str, 'NamePool'] = {}
+_pools_lock = threading.Lock()
+
+# Пулы, загруженные из файла кэша (заполняется при первом обращении)
+_disk_pools: Optional[Dict[str, Dict[str, Any]]] = None
+
+# Построены пулы, которых нет в файле кэша (файл сохраняется один раз, см. save_name_pools)
+_unsaved = False
+_save_registered = False
+
+# Атрибуты провайдера person с именами и фамилиями: латинские варианты (ja_JP, zh_CN, zh_TW)
+# предпочтительнее транслитерации иероглифов, иначе объединяются все списки локали
+# (в части локалей first_names - заглушка базового провайдера, а имена - в списках по полу)
+_FIRST_NAME_ATTRIBUTES = [
+    ('first_romanized_names',),
+    ('first_names', 'first_names_male', 'first_names_female', 'first_names_unisex'),
+]
+_LAST_NAME_ATTRIBUTES = [
+    ('last_romanized_names',),
+    ('last_names', 'last_names_male', 'last_names_female', 'male_last_names', 'female_last_names',
+     'unisex_last_names'),
+]
+
+# Имя или фамилия после транслитерации: слово с заглавной буквы, возможно с дефисом, апострофом
+# или заглавной буквой внутри (Marie-Claire, O'Neil, McDonald)
+_NAME_RE = re.compile(r"[A-Z][a-z]*(?:[-']?[A-Z]?[a-z]+)+")
+
+
+class NamePart:
+    """
+    Пул имен или фамилий: нормализованные значения и накопленные веса (None - равные веса).
+    """
+
+    __slots__ = ('values', 'cumulative', '_probabilities')
+
+    def __init__(self, values: List[str], weights: Optional[List[float]] = None):
+        self.values = tuple(values)
+        self.cumulative = list(accumulate(weights)) if weights else None
+        self._probabilities: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def draw(self, rng) -> str:
+        """Выбирает одно значение (одно обращение к генератору)."""
+        if self.cumulative is None:
+            return self.values[int(rng.random() * len(self.values))]
+        index = bisect_right(self.cumulative, rng.random() * self.cumulative[-1])
+        return self.values[min(index, len(self.values) - 1)]
+
+    def sample(self, size: int, generator: np.random.Generator) -> np.ndarray:
+        """Выбирает size индексов значений одним вызовом NumPy."""
+        if self.cumulative is None:
+            return generator.integers(0, len(self.values), size)
+        if self._probabilities is None:
+            weights = np.diff(np.asarray(self.cumulative, dtype=np.float64), prepend=0.0)
+            self._probabilities = weights / weights.sum()
+        return generator.choice(len(self.values), size=size, p=self._probabilities)
+
+    def to_dict(self) -> Dict[str, Any]:
+        weights = None
+        if self.cumulative is not None:
+            weights = [round(b - a, 6) for a, b in zip([0.0] + self.cumulative[:-1], self.cumulative)]
+        return {'values': list(self.values), 'weights': weights}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NamePart':
+        return cls(data['values'], data.get('weights'))
+
+
+class NamePool:
+    """
+    Пул полных имен локали: заранее транслитерированные имена и фамилии из одного слова в ASCII.
+    Полное имя - "Имя Фамилия" - выбирается двумя индексами без повторных попыток.
+    """
+
+    __slots__ = ('key', 'first', 'last', 'fallback')
+
+    def __init__(self, key: str, first: NamePart, last: NamePart, fallback: bool = False):
+        self.key = key
+        self.first = first
+        self.last = last
+        # True - у локали нет подходящих имен, пул построен по запасной локали
+        self.fallback = fallback
+
+    def draw(self, rng=None) -> str:
+        """
+        Выбирает полное имя.
+
+        Args:
+            rng: Генератор случайных чисел (random.Random; по умолчанию - модуль random)
+        """
+        rng = rng or random
+        first = self.first.draw(rng)
+        return f"{first} {self.last.draw(rng)}"
+
+    def sample(self, size: int, generator: Optional[np.random.Generator] = None) -> List[str]:
+        """
+        Выбирает size полных имен векторно (для пакетной генерации).
+
+        Args:
+            size: Количество имен
+            generator: Генератор NumPy (по умолчанию - новый, без сида)
+        """
+        generator = generator or np.random.default_rng()
+        first = np.asarray(self.first.values, dtype=object)[self.first.sample(size, generator)]
+        last = np.asarray(self.last.values, dtype=object)[self.last.sample(size, generator)]
+        return [f"{a} {b}" for a, b in zip(first, last)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'first': self.first.to_dict(), 'last': self.last.to_dict(), 'fallback': self.fallback}
+
+    @classmethod
+    def from_dict(cls, key: str, data: Dict[str, Any]) -> 'NamePool':
+        return cls(key, NamePart.from_dict(data['first']), NamePart.from_dict(data['last']), data['fallback'])
+
+
+def _person_provider(faker):
+    """Возвращает провайдер person объекта Faker (или None)."""
+    for provider in faker.get_providers():
+        if provider.__class__.__module__.startswith('faker.providers.person'):
+            return provider
+    return None
+
+
+def _provider_values(provider, attribute_groups) -> Tuple[List[str], Optional[List[float]]]:
+    """
+    Собирает значения и веса из первой непустой группы атрибутов провайдера.
+    Атрибуты, унаследованные от базового провайдера без изменений (John, Jane, Doe), пропускаются.
+    """
+    from faker.providers.person import Provider as BaseProvider
+
+    for group in attribute_groups:
+        values: List[str] = []
+        weights: List[float] = []
+        for attribute in group:
+            data = getattr(provider, attribute, None)
+            if not data or data is getattr(BaseProvider, attribute, None):
+                continue
+            if isinstance(data, dict):
+                values.extend(data.keys())
+                weights.extend(float(weight) for weight in data.values())
+            else:
+                values.extend(data)
+                weights.extend([1.0] * len(data))
+        if values:
+            return values, weights
+    return [], None
+
+
+def build_name_part(values: List[str], weights: Optional[List[float]] = None) -> NamePart:
+    """
+    Транслитерирует значения провайдера и оставляет только одно слово в ASCII
+    с заглавной буквы (см. _NAME_RE).
+    Веса совпавших после транслитерации значений складываются.
+    """
+    merged: Dict[str, float] = {}
+    for index, value in enumerate(values):
+        normalized = normalize_string(str(value))
+        # Письменности без заглавных букв (хинди, корейский) дают строчные буквы,
+        # латинские варианты zh_TW записаны заглавными
+        if normalized.islower() or normalized.isupper():
+            normalized = normalized.title()
+        if not _NAME_RE.fullmatch(normalized):
+            continue
+        merged[normalized] = merged.get(normalized, 0.0) + (weights[index] if weights else 1.0)
+
+    uniform = len(set(merged.values())) <= 1
+    return NamePart(list(merged), None if uniform else list(merged.values()))
+
+
+def _build_pool(key: str, faker) -> Optional[NamePool]:
+    provider = _person_provider(faker)
+    if provider is None:
+        return None
+    first = build_name_part(*_provider_values(provider, _FIRST_NAME_ATTRIBUTES))
+    last = build_name_part(*_provider_values(provider, _LAST_NAME_ATTRIBUTES))
+    if len(first) < NAME_POOL_CONFIG['min_size'] or len(last) < NAME_POOL_CONFIG['min_size']:
+        logger.info(f"Недостаточно имен в ASCII для {key}: имен {len(first)}, фамилий {len(last)}")
+        return None
+    return NamePool(key, first, last)
+
+
+def _load_disk_pools() -> Dict[str, Dict[str, Any]]:
+    """Загружает пулы из файла кэша, если он создан той же версией Faker."""
+    global _disk_pools
+    if _disk_pools is not None:
+        return _disk_pools
+    _disk_pools = {}
+    path = NAME_POOL_CONFIG['cache_path']
+    if path and os.path.exists(path):
+        from faker import VERSION
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('faker_version') == VERSION:
+                _disk_pools = data.get('pools', {})
+            else:
+                logger.info(f"Кэш пулов имен {path} создан другой версией Faker и будет перестроен")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить кэш пулов имен {path}: {e}")
+    return _disk_pools
+
+
+def _save_disk_pools():
+    """Сохраняет пулы в файл кэша вместе с загруженными из него ранее."""
+    path = NAME_POOL_CONFIG['cache_path']
+    if not path:
+        return
+    from faker import VERSION
+    pools = dict(_disk_pools or {})
+    pools.update((key, pool.to_dict()) for key, pool in _pools.items() if key != 'fallback')
+    data = {'faker_version': VERSION, 'pools': pools}
+    try:
+        # Рабочие процессы могут сохранять кэш одновременно: у каждого свой временный файл
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить кэш пулов имен {path}: {e}")
+
+
+def get_name_pool(locale: str, faker_factory: Callable[[], Any],
+                  fallback_factory: Optional[Callable[[], Any]] = None) -> NamePool:
+    """
+    Возвращает пул имен локали, строя его при первом обращении.
+
+    Пул строится из данных провайдера person (имена, фамилии и их веса). Если задан
+    NAME_POOL_CONFIG['cache_path'], пулы сохраняются в файл и в следующих запусках
+    загружаются из него без создания объектов Faker. Если у локали нет достаточного
+    количества имен в ASCII, используется пул запасной локали, помеченный как запасной.
+
+    Args:
+        locale: Локаль (ключ пула)
+        faker_factory: Функция, возвращающая объект Faker локали
+        fallback_factory: Функция, возвращающая объект Faker запасной локали (обычно en_US)
+
+    Returns:
+        Пул имен
+    """
+    pool = _pools.get(locale)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(locale)
+        if pool is not None:
+            return pool
+
+        cached = _load_disk_pools().get(locale)
+        if cached is not None:
+            pool = NamePool.from_dict(locale, cached)
+        else:
+            pool = _build_pool(locale, faker_factory())
+            if pool is None:
+                if fallback_factory is None:
+                    raise ValueError(f"Нет подходящих имен для локали {locale} и не задана запасная локаль")
+                logger.warning(f"Для локали {locale} нет подходящих имен в ASCII, "
+                               f"используются имена запасной локали")
+                base = _pools.get('fallback') or _build_pool('fallback', fallback_factory())
+                _pools['fallback'] = base
+                pool = NamePool(locale, base.first, base.last, fallback=True)
+        _pools[locale] = pool
+        if cached is None:
+            _mark_unsaved()
+        return pool
+
+
+def _mark_unsaved():
+    """Отмечает, что файл кэша нужно сохранить, и регистрирует сохранение при выходе."""
+    global _unsaved, _save_registered
+    _unsaved = True
+    if not _save_registered and NAME_POOL_CONFIG['cache_path']:
+        atexit.register(save_name_pools)
+        _save_registered = True
+
+
+def save_name_pools():
+    """
+    Сохраняет построенные пулы в файл кэша, если появились новые.
+
+    Вызывается при выходе из процесса и после генерации части в рабочем процессе
+    (в рабочих процессах multiprocessing обработчики atexit не выполняются), поэтому
+    файл перезаписывается один раз, а не после построения каждой локали.
+    """
+    global _unsaved
+    with _pools_lock:
+        if not _unsaved:
+            return
+        _save_disk_pools()
+        _unsaved = False
+
+
+def clear_name_pools():
+    """Сбрасывает построенные пулы (например, после изменения NAME_POOL_CONFIG)."""
+    global _disk_pools, _unsaved
+    with _pools_lock:
+        _pools.clear()
+        _disk_pools = None
+        _unsaved = False
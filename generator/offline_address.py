@@ -0,0 +1,72 @@
+# offline_address.py
+import random
+import re
+import logging
+from typing import Optional, Dict
+
+from config import CITY_NAMES
+from utils import normalize_string, is_valid_address, format_address_components
+
+logger = logging.getLogger(__name__)
+
+
+def synthesize_address_components(country_code: str, rng: Optional[random.Random] = None) -> Dict[str, str]:
+    """
+    Генерирует компоненты адреса без обращения к Google Maps.
+    Улица, номер дома и индекс берутся из локали Faker страны, город - из CITY_NAMES.
+
+    Args:
+        country_code: Код страны
+        rng: Генератор случайных чисел (по умолчанию - модуль random)
+
+    Returns:
+        Словарь компонентов в формате extract_address_components
+    """
+    # Импорт внутри функции, чтобы избежать циклического импорта с data_generator
+    from data_generator import draw_faker_values
+
+    street, number, postal, faker_city = (
+        normalize_string(value)
+        for value in draw_faker_values(country_code, ['street_name', 'building_number', 'postcode', 'city'], rng)
+    )
+    rng = rng or random
+
+    # Номер дома должен содержать цифры и не быть нулевым
+    if not re.search(r'[1-9]', number):
+        number = str(rng.randint(1, 250))
+    if not re.search(r'\d', postal):
+        postal = f"{rng.randint(10000, 99999)}"
+
+    cities = CITY_NAMES.get(country_code)
+    city = normalize_string(rng.choice(cities)) if cities else faker_city
+
+    return {
+        'route': street,
+        'street_number': number,
+        'postal_code': postal,
+        'locality': city,
+    }
+
+
+def synthesize_address(country_code: str, rng: Optional[random.Random] = None,
+                       max_attempts: int = 5) -> Optional[str]:
+    """
+    Генерирует правдоподобный адрес для страны без обращения к API.
+    Адрес формируется через format_address_components и проходит проверку is_valid_address.
+
+    Args:
+        country_code: Код страны
+        rng: Генератор случайных чисел (по умолчанию - модуль random)
+        max_attempts: Максимальное количество попыток получить валидный адрес
+
+    Returns:
+        Строка адреса или None, если сгенерировать валидный адрес не удалось
+    """
+    for _ in range(max_attempts):
+        components = synthesize_address_components(country_code, rng)
+        address = format_address_components(components)
+        if is_valid_address(address):
+            return address
+
+    logger.warning(f"Не удалось сгенерировать офлайн-адрес для страны {country_code}")
+    return None
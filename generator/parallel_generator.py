@@ -0,0 +1,205 @@
+# parallel_generator.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import date
+from typing import List, Optional, Dict, Any, Tuple
+
+import pandas as pd
+
+from config import GMAPS_CONFIG, LEDGER_CONFIG, CACHE_REFILL_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Пул процессов переиспользуется между вызовами (например, между партиями --large)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+# Настройки генерации адресов, уже примененные в текущем рабочем процессе
+_worker_settings: Optional[Dict[str, Any]] = None
+
+
+def shard_plan(plan: List[str], shards: int, start_index: int = 0) -> List[Tuple[int, List[str]]]:
+    """
+    Делит план генерации (код страны для каждого индекса записи) на непрерывные части.
+    Размеры частей отличаются не более чем на одну запись.
+
+    Args:
+        plan: Список кодов стран (см. data_generator.plan_records)
+        shards: Количество частей
+        start_index: Глобальный индекс первой записи плана
+
+    Returns:
+        Список пар (глобальный индекс первой записи части, коды стран части); пустые части отбрасываются
+    """
+    result = []
+    base, remainder = divmod(len(plan), shards)
+    offset = 0
+    for i in range(shards):
+        size = base + (1 if i < remainder else 0)
+        if size:
+            result.append((start_index + offset, plan[offset:offset + size]))
+        offset += size
+    return result
+
+
+def get_process_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    Возвращает пул процессов указанного размера, создавая его при необходимости.
+    Используется контекст spawn: каждый процесс создает собственные объекты Faker и клиенты API.
+    """
+    global _pool, _pool_size
+    if _pool is None or _pool_size != processes:
+        shutdown_process_pool()
+        _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        _pool_size = processes
+        logger.info(f"Запущен пул из {processes} процессов генерации")
+    return _pool
+
+
+def shutdown_process_pool():
+    """Останавливает пул процессов генерации, если он запущен."""
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_size = 0
+
+
+def _apply_worker_settings(settings: Dict[str, Any]):
+    """Применяет настройки генерации адресов в рабочем процессе (однократно для одинаковых настроек)."""
+    global _worker_settings
+    if settings == _worker_settings:
+        return
+
+    from gmaps_api import configure_address_pipeline
+    from uniqueness_ledger import configure_ledger
+
+    pipeline = dict(settings)
+    ledger_path = pipeline.pop('ledger_path', None)
+    configure_address_pipeline(**pipeline)
+    # Реестр задается явно: None отключает реестр предыдущего вызова (например, временный)
+    if _worker_settings is None or ledger_path != _worker_settings.get('ledger_path'):
+        configure_ledger(ledger_path)
+    _worker_settings = dict(settings)
+
+
+def _generate_shard(shard_start: int, countries: List[str], settings: Dict[str, Any],
+                    seed: Optional[int], reference_date: Optional[date]) -> Tuple[Dict[str, list], Dict[str, list]]:
+    """
+    Генерирует часть пользователей в рабочем процессе.
+
+    Args:
+        shard_start: Глобальный индекс первой записи части
+        countries: Коды стран записей части
+        settings: Настройки configure_address_pipeline
+        seed: Сид запуска (или None)
+        reference_date: Опорная дата запуска (или None)
+
+    Returns:
+        Пара (словарь столбцов с данными пользователей, метрики части для metrics.MetricsRegistry.merge)
+    """
+    from data_generator import create_planned_batch
+    from gmaps_api import clear_used_addresses
+    from metrics import get_registry
+    from name_pools import save_name_pools
+    from seeding import set_run_seed
+
+    _apply_worker_settings(settings)
+    set_run_seed(seed, reference_date)
+    clear_used_addresses()
+
+    # Метрики части передаются в основной процесс и обнуляются: процесс пула переиспользуется
+    registry = get_registry()
+    registry.snapshot(reset=True)
+    batch = asyncio.run(create_planned_batch(countries, shard_start))
+    save_name_pools()
+    return batch.to_columns(), registry.snapshot(reset=True)
+
+
+def generate_user_data_parallel(num_users: int = 20, country_codes: Optional[List[str]] = None,
+                                processes: Optional[int] = None, start_index: int = 0) -> pd.DataFrame:
+    """
+    Генерирует данные пользователей в нескольких процессах.
+
+    План генерации (как в generate_user_data_async) делится на непрерывные части по индексам
+    записей, каждый процесс возвращает данные в виде столбцов, которые объединяются
+    в один DataFrame и перемешиваются так же, как при генерации в одном процессе.
+    Поэтому при заданном сиде запуска результат не зависит от количества процессов
+    (в режиме offline).
+    Бюджет запросов к API делится поровну между процессами.
+    Адреса отмечаются в реестре уникальности, общем для всех процессов: в заданном
+    LEDGER_CONFIG['path'] или, если он не задан, во временном реестре на время вызова
+    (части плана одной страны попадают в разные процессы).
+
+    Args:
+        num_users: Количество пользователей для генерации
+        country_codes: Список кодов стран. Если None, используются все доступные страны.
+        processes: Количество процессов. Если None, используется количество ядер CPU.
+        start_index: Глобальный индекс первой записи
+
+    Returns:
+        DataFrame с данными пользователей
+    """
+    from data_generator import distribute_users, plan_records, shuffle_records
+    from record_batch import UserBatch
+    from metrics import get_registry
+    from seeding import get_run_seed, get_reference_date
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    country_counts = distribute_users(num_users, country_codes)
+    shards = shard_plan(plan_records(country_counts), min(processes, max(1, num_users)), start_index)
+    if not shards:
+        return UserBatch().to_frame()
+
+    # Общий бюджет запросов и корзины конечных точек делятся поровну между процессами;
+    # дневная квота общая - ее счетчик в SQLite увеличивается атомарно
+    settings = {
+        'address_mode': GMAPS_CONFIG['address_mode'],
+        'max_concurrency': GMAPS_CONFIG['max_concurrency'],
+        'requests_per_second': GMAPS_CONFIG['requests_per_second'],
+        'rate_share': 1 / len(shards),
+        'base_url': GMAPS_CONFIG['base_url'],
+        'ledger_path': LEDGER_CONFIG['path'],
+        'refill': CACHE_REFILL_CONFIG['enabled'],
+    }
+    # Без постоянного реестра процессы делят временный: иначе каждый проверял бы
+    # повторы адресов только по своему множеству USED_ADDRESSES
+    temporary_dir = None
+    if settings['ledger_path'] is None and len(shards) > 1:
+        temporary_dir = tempfile.mkdtemp(prefix='user_generator_ledger_')
+        settings['ledger_path'] = os.path.join(temporary_dir, 'ledger.db')
+    seed = get_run_seed()
+    reference_date = get_reference_date().date()
+
+    logger.info(f"Генерация данных для {num_users} пользователей в {len(shards)} процессах "
+                f"из стран: {', '.join(country_counts.keys())}")
+
+    pool = get_process_pool(processes)
+    futures = [pool.submit(_generate_shard, shard_start, countries, settings, seed, reference_date)
+               for shard_start, countries in shards]
+
+    # Объединяем столбцы и метрики всех процессов
+    batch = UserBatch()
+    try:
+        for future in futures:
+            columns, shard_metrics = future.result()
+            get_registry().merge(shard_metrics)
+            batch.extend(columns)
+    finally:
+        if temporary_dir is not None:
+            # Файл удаляется после завершения всех частей; рабочие процессы закроют его
+            # при следующей настройке реестра
+            wait(futures)
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+    # Перемешиваем записи той же перестановкой, что и generate_user_data_async
+    order = list(range(len(batch)))
+    shuffle_records(order, start_index)
+    return batch.to_frame(order)
@@ -0,0 +1,264 @@
+# rate_limit.py
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+from config import GMAPS_CONFIG, RATE_LIMIT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_limiter: Optional['RateLimiter'] = None
+_limiter_lock = threading.Lock()
+
+
+class QuotaExceededError(Exception):
+    """Дневная квота запросов к конечной точке API исчерпана."""
+
+    def __init__(self, endpoint: str, limit: int):
+        self.endpoint = endpoint
+        self.limit = limit
+        super().__init__(f"Дневная квота запросов {endpoint} исчерпана ({limit})")
+
+
+class TokenBucket:
+    """
+    Корзина токенов: не более rate запросов в секунду в среднем, всплески до capacity запросов.
+
+    Каждый вызов reserve() сразу резервирует токен (баланс может стать отрицательным)
+    и возвращает время ожидания своего слота, поэтому одновременные запросы
+    выстраиваются в очередь без повторных проверок и их поток в точности равен rate.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Резервирует токены.
+
+        Returns:
+            Время в секундах, которое нужно подождать перед запросом (0 - можно сразу)
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Откладывает все следующие запросы не менее чем на seconds секунд."""
+        if not self.rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class DailyQuota:
+    """
+    Счетчик запросов к API за сутки, хранящийся в SQLite.
+
+    Счетчик увеличивается атомарно одним запросом UPDATE, поэтому квота
+    соблюдается точно даже при генерации в нескольких процессах.
+    Сутки отсчитываются по времени UTC.
+    """
+
+    def __init__(self, path: str, limits: Optional[Dict[str, Optional[int]]] = None):
+        self.path = path
+        self.limits = dict(limits or {})
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quota ("
+                " day TEXT NOT NULL,"
+                " endpoint TEXT NOT NULL,"
+                " used INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (day, endpoint))"
+            )
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def consume(self, endpoint: str):
+        """
+        Учитывает один запрос к конечной точке.
+
+        Raises:
+            QuotaExceededError: если дневная квота конечной точки исчерпана
+        """
+        limit = self.limits.get(endpoint)
+        day = self._today()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT OR IGNORE INTO quota (day, endpoint, used) VALUES (?, ?, 0)", (day, endpoint))
+            cursor = conn.execute(
+                "UPDATE quota SET used = used + 1 WHERE day = ? AND endpoint = ? AND (? IS NULL OR used < ?)",
+                (day, endpoint, limit, limit)
+            )
+        if cursor.rowcount != 1:
+            raise QuotaExceededError(endpoint, limit)
+
+    def used(self, endpoint: str) -> int:
+        """Возвращает количество запросов к конечной точке за текущие сутки."""
+        with self._lock:
+            row = self._connect().execute("SELECT used FROM quota WHERE day = ? AND endpoint = ?",
+                                          (self._today(), endpoint)).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, endpoint: str) -> Optional[int]:
+        """Возвращает остаток квоты на текущие сутки или None, если квота не ограничена."""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return None
+        return max(0, limit - self.used(endpoint))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RateLimiter:
+    """
+    Ограничитель запросов к Google Maps API: общий бюджет запросов в секунду,
+    отдельные корзины токенов для каждой конечной точки и дневная квота.
+    """
+
+    def __init__(self, global_bucket: TokenBucket, buckets: Dict[str, TokenBucket],
+                 quota: Optional[DailyQuota] = None, over_limit_pause: float = 2.0):
+        self.global_bucket = global_bucket
+        self.buckets = buckets
+        self.quota = quota
+        self.over_limit_pause = over_limit_pause
+        self._paused_until: Dict[str, float] = {}
+
+    def reserve(self, endpoint: str) -> float:
+        """
+        Учитывает запрос в квоте и резервирует слот в корзинах токенов.
+
+        Returns:
+            Время ожидания слота в секундах
+
+        Raises:
+            QuotaExceededError: если дневная квота исчерпана
+        """
+        if self.quota is not None:
+            self.quota.consume(endpoint)
+        return self._reserve_slot(endpoint)
+
+    def _reserve_slot(self, endpoint: str) -> float:
+        """Резервирует слот в корзинах токенов и возвращает время ожидания в секундах."""
+        delay = self.global_bucket.reserve()
+        bucket = self.buckets.get(endpoint)
+        if bucket is not None:
+            delay = max(delay, bucket.reserve())
+        return max(delay, self._paused_until.get(endpoint, 0.0) - time.monotonic())
+
+    def acquire(self, endpoint: str):
+        """Блокирует поток до наступления слота запроса к конечной точке."""
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, endpoint: str):
+        """
+        Асинхронно ожидает слот запроса, не блокируя цикл событий.
+        Запись счетчика квоты в SQLite (возможно, ожидающая другой процесс) выполняется в пуле потоков.
+        """
+        if self.quota is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.quota.consume, endpoint)
+        delay = self._reserve_slot(endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def report_over_limit(self, endpoint: str):
+        """
+        Сообщает об ответе OVER_QUERY_LIMIT: все следующие запросы к конечной точке
+        откладываются на over_limit_pause секунд.
+        """
+        logger.warning(f"Превышен лимит запросов Google Maps API ({endpoint}), "
+                       f"пауза {self.over_limit_pause} сек")
+        self._paused_until[endpoint] = time.monotonic() + self.over_limit_pause
+        # Сдвигаем и очередь корзины, чтобы после паузы запросы не ушли одновременно
+        self.buckets.get(endpoint, self.global_bucket).pause(self.over_limit_pause)
+
+
+def create_rate_limiter(requests_per_second: Optional[float] = None, rate_share: float = 1.0) -> RateLimiter:
+    """
+    Создает ограничитель запросов по настройкам GMAPS_CONFIG и RATE_LIMIT_CONFIG.
+
+    Args:
+        requests_per_second: Общий бюджет запросов в секунду. Если None, берется из GMAPS_CONFIG.
+        rate_share: Доля бюджета для текущего процесса (при генерации в нескольких процессах)
+
+    Returns:
+        Ограничитель запросов
+    """
+    if requests_per_second is None:
+        requests_per_second = GMAPS_CONFIG['requests_per_second']
+
+    global_rate = (requests_per_second or 0) * rate_share
+    global_bucket = TokenBucket(global_rate, RATE_LIMIT_CONFIG['burst'] * rate_share)
+
+    buckets = {}
+    limits = {}
+    for endpoint, settings in RATE_LIMIT_CONFIG['endpoints'].items():
+        rate = settings.get('requests_per_second')
+        if rate:
+            burst = settings.get('burst') or RATE_LIMIT_CONFIG['burst']
+            buckets[endpoint] = TokenBucket(rate * rate_share, burst * rate_share)
+        limits[endpoint] = settings.get('daily_quota')
+
+    quota = None
+    if RATE_LIMIT_CONFIG['quota_path']:
+        quota = DailyQuota(RATE_LIMIT_CONFIG['quota_path'], limits)
+
+    return RateLimiter(global_bucket, buckets, quota, RATE_LIMIT_CONFIG['over_limit_pause'])
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Возвращает общий для процесса ограничитель запросов, создавая его при первом обращении."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = create_rate_limiter()
+    return _limiter
+
+
+def configure_rate_limiter(requests_per_second: Optional[float] = None, rate_share: float = 1.0):
+    """
+    Пересоздает общий ограничитель запросов с новыми настройками.
+
+    Args:
+        requests_per_second: Общий бюджет запросов в секунду. Если None, берется из GMAPS_CONFIG.
+        rate_share: Доля бюджета для текущего процесса
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is not None and _limiter.quota is not None:
+            _limiter.quota.close()
+        _limiter = create_rate_limiter(requests_per_second, rate_share)
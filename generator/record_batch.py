@@ -0,0 +1,69 @@
+# record_batch.py
+from typing import List, Dict, Optional, Sequence, Any
+
+import pandas as pd
+
+from models import USER_COLUMNS
+from metrics import timed
+from utils import generate_passwords
+
+
+class UserBatch:
+    """
+    Партия записей пользователей в виде столбцов (struct of arrays).
+
+    Каждый столбец - список длины партии, генераторы записывают значения по индексу записи
+    без промежуточных объектов User и словарей записей. Столбцы, не зависящие от сида
+    записи (пароли), генерируются сразу для всей партии. Из столбцов напрямую собираются
+    DataFrame или данные для передачи между процессами.
+    """
+
+    __slots__ = ('columns',)
+
+    def __init__(self, countries: Sequence[str] = ()):
+        """
+        Args:
+            countries: Коды стран записей партии (столбец geo)
+        """
+        size = len(countries)
+        self.columns: Dict[str, list] = {column: [''] * size for column in USER_COLUMNS}
+        self.columns['geo'] = list(countries)
+        if size:
+            with timed('batch_field_seconds', field='password'):
+                self.columns['pass'] = generate_passwords(size)
+
+    def __len__(self) -> int:
+        return len(self.columns['geo'])
+
+    def set_record(self, index: int, name: str, address: str, birthday: str):
+        """Записывает поля записи index, зависящие от сида записи."""
+        columns = self.columns
+        columns['name'][index] = name
+        columns['address'][index] = address
+        columns['birthday'][index] = birthday
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Возвращает запись index в виде словаря (столбец -> значение)."""
+        return {column: values[index] for column, values in self.columns.items()}
+
+    def extend(self, columns: Dict[str, list]):
+        """Добавляет в конец партии записи из словаря столбцов (например, от рабочего процесса)."""
+        rows = len(next(iter(columns.values()), []))
+        for column, values in self.columns.items():
+            values.extend(columns.get(column, [''] * rows))
+
+    def to_columns(self, order: Optional[List[int]] = None) -> Dict[str, list]:
+        """
+        Возвращает словарь столбцов.
+
+        Args:
+            order: Перестановка индексов записей (см. data_generator.shuffle_records).
+                Если None, возвращаются столбцы партии без копирования.
+        """
+        if order is None:
+            return self.columns
+        return {column: [values[i] for i in order] for column, values in self.columns.items()}
+
+    def to_frame(self, order: Optional[List[int]] = None) -> pd.DataFrame:
+        """Собирает DataFrame из столбцов партии (в порядке order, если задан)."""
+        return pd.DataFrame(self.to_columns(order), columns=list(USER_COLUMNS))
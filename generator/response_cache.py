@@ -0,0 +1,174 @@
+# response_cache.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional, Any, Dict
+
+from config import RESPONSE_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_cache: Optional['ResponseCache'] = None
+_cache_lock = threading.Lock()
+
+
+class ResponseCache:
+    """
+    Постоянный кэш ответов Google Maps API в SQLite.
+
+    Записи хранятся по виду запроса ('places', 'details') и ключу, устаревают
+    через ttl секунд (отдельно для каждого вида) и вытесняются по давности
+    последнего обращения, когда общее количество записей превышает max_entries.
+    """
+
+    def __init__(self, path: str, ttl: Optional[Dict[str, Optional[float]]] = None,
+                 max_entries: Optional[int] = None):
+        self.path = path
+        self.ttl = dict(ttl or {})
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._count: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " kind TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL,"
+                " PRIMARY KEY (kind, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Формирует ключ записи из параметров запроса."""
+        return json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Возвращает сохраненный ответ или None, если его нет или он устарел.
+
+        Args:
+            kind: Вид запроса ('places', 'details')
+            key: Ключ запроса (см. make_key)
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created FROM responses WHERE kind = ? AND key = ?",
+                               (kind, key)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            ttl = self.ttl.get(kind)
+            if ttl is not None and now - row[1] > ttl:
+                conn.execute("DELETE FROM responses WHERE kind = ? AND key = ?", (kind, key))
+                self._count = None
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE responses SET accessed = ? WHERE kind = ? AND key = ?", (now, kind, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, kind: str, key: str, value: Any):
+        """
+        Сохраняет ответ. При превышении max_entries удаляются записи,
+        к которым дольше всего не обращались.
+        """
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            existed = conn.execute("SELECT 1 FROM responses WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO responses (kind, key, value, created, accessed) "
+                         "VALUES (?, ?, ?, ?, ?)", (kind, key, data, now, now))
+            if existed:
+                return
+
+            count = self.count() if self._count is None else self._count + 1
+            if self.max_entries and count > self.max_entries:
+                # Удаляем с запасом 10%, чтобы не чистить кэш при каждой записи
+                excess = count - int(self.max_entries * 0.9)
+                conn.execute("DELETE FROM responses WHERE rowid IN ("
+                             " SELECT rowid FROM responses ORDER BY accessed LIMIT ?)", (excess,))
+                count -= excess
+                logger.debug(f"Из кэша ответов API вытеснено {excess} записей")
+            self._count = count
+
+    def count(self) -> int:
+        """Возвращает количество записей в кэше."""
+        with self._lock:
+            self._count = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return self._count
+
+    def purge_expired(self) -> int:
+        """
+        Удаляет устаревшие записи.
+
+        Returns:
+            Количество удаленных записей
+        """
+        now = time.time()
+        removed = 0
+        with self._lock:
+            conn = self._connect()
+            for kind, ttl in self.ttl.items():
+                if ttl is not None:
+                    removed += conn.execute("DELETE FROM responses WHERE kind = ? AND created < ?",
+                                            (kind, now - ttl)).rowcount
+            self._count = None
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._count = None
+
+
+def create_response_cache(path: Optional[str] = None) -> ResponseCache:
+    """
+    Создает кэш ответов API по настройкам RESPONSE_CACHE_CONFIG.
+
+    Args:
+        path: Путь к файлу кэша. Если None, берется из конфигурации
+            (если и там None, кэш хранится только в памяти процесса).
+    """
+    path = path or RESPONSE_CACHE_CONFIG['path'] or ':memory:'
+    return ResponseCache(path, RESPONSE_CACHE_CONFIG['ttl'], RESPONSE_CACHE_CONFIG['max_entries'])
+
+
+def get_response_cache() -> ResponseCache:
+    """Возвращает общий для процесса кэш ответов API, создавая его при первом обращении."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_response_cache()
+    return _cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]):
+    """Заменяет общий кэш ответов API. Предыдущий кэш закрывается."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None and _cache is not cache:
+            _cache.close()
+        _cache = cache
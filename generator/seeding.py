@@ -0,0 +1,71 @@
+# seeding.py
+import hashlib
+import random
+from datetime import datetime, date
+from typing import Optional
+
+# Параметры воспроизводимого запуска: сид и дата, от которой отсчитываются дни рождения и даты создания
+_run_seed: Optional[int] = None
+_reference_date: Optional[date] = None
+
+
+def set_run_seed(seed: Optional[int], reference_date: Optional[date] = None):
+    """
+    Задает сид запуска. При заданном сиде каждая запись генерируется собственным
+    генератором случайных чисел, производным от сида и индекса записи.
+
+    Args:
+        seed: Сид или None для случайной генерации
+        reference_date: Дата, относительно которой генерируются даты.
+            Если None, используется текущая дата.
+    """
+    global _run_seed, _reference_date
+    _run_seed = seed
+    _reference_date = reference_date
+
+
+def get_run_seed() -> Optional[int]:
+    """Возвращает сид текущего запуска или None."""
+    return _run_seed
+
+
+def get_reference_date() -> datetime:
+    """Возвращает дату, относительно которой генерируются даты рождения и создания аккаунтов."""
+    if _reference_date is None:
+        return datetime.today()
+    return datetime.combine(_reference_date, datetime.min.time())
+
+
+def derive_seed(seed: int, index: int, stream: str = '') -> int:
+    """
+    Детерминированно выводит 64-битный сид из общего сида, индекса и названия потока.
+    Не зависит от процесса и PYTHONHASHSEED, поэтому одинаков во всех рабочих процессах.
+
+    Args:
+        seed: Общий сид запуска
+        index: Индекс записи (или партии)
+        stream: Название потока случайных чисел (например, 'shuffle')
+
+    Returns:
+        Производный сид
+    """
+    digest = hashlib.blake2b(f"{seed}:{index}:{stream}".encode('ascii'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def record_rng(index: int, seed: Optional[int] = None) -> Optional[random.Random]:
+    """
+    Возвращает генератор случайных чисел для записи с указанным индексом.
+
+    Args:
+        index: Глобальный индекс записи в наборе данных
+        seed: Сид. Если None, используется сид запуска.
+
+    Returns:
+        Генератор случайных чисел или None, если сид не задан
+    """
+    if seed is None:
+        seed = _run_seed
+    if seed is None:
+        return None
+    return random.Random(derive_seed(seed, index))
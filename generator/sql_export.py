@@ -0,0 +1,227 @@
+# sql_export.py
+import logging
+import math
+from dataclasses import fields
+from typing import Optional, List, Any, Iterable, TextIO
+
+import pandas as pd
+
+from config import SQL_EXPORT_CONFIG, SQL_DIALECTS
+from models import User, USER_COLUMNS
+from compressed_io import open_output
+
+logger = logging.getLogger(__name__)
+
+# Столбцы DataFrame, названия которых отличаются от полей models.User
+COLUMN_FIELDS = {column: field for column, field in USER_COLUMNS.items() if column != field}
+
+# Типы столбцов для полей models.User
+_SQL_TYPES = {
+    'sqlite': {str: 'TEXT', int: 'INTEGER', float: 'REAL', bool: 'INTEGER'},
+    'postgresql': {str: 'TEXT', int: 'BIGINT', float: 'DOUBLE PRECISION', bool: 'BOOLEAN'},
+    'mysql': {str: 'VARCHAR(255)', int: 'BIGINT', float: 'DOUBLE', bool: 'TINYINT(1)'},
+}
+
+# Экранирование значений для COPY ... FROM stdin (текстовый формат PostgreSQL)
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def configure_sql_export(dialect: Optional[str] = None, table: Optional[str] = None,
+                         chunk_size: Optional[int] = None):
+    """
+    Настраивает экспорт в SQL.
+
+    Args:
+        dialect: Диалект SQL (sqlite, postgresql, mysql)
+        table: Имя таблицы
+        chunk_size: Количество строк в одном INSERT (или блоке COPY)
+    """
+    if dialect is not None:
+        if dialect not in SQL_DIALECTS:
+            raise ValueError(f"Неизвестный диалект SQL: {dialect}")
+        SQL_EXPORT_CONFIG['dialect'] = dialect
+    if table is not None:
+        SQL_EXPORT_CONFIG['table'] = table
+    if chunk_size is not None:
+        if chunk_size < 1:
+            raise ValueError("Размер блока INSERT должен быть не меньше 1.")
+        SQL_EXPORT_CONFIG['chunk_size'] = chunk_size
+
+
+def column_name(column: str) -> str:
+    """Возвращает имя столбца таблицы для столбца DataFrame."""
+    return COLUMN_FIELDS.get(column, column)
+
+
+def quote_identifier(name: str, dialect: str) -> str:
+    """Заключает идентификатор в кавычки диалекта."""
+    if dialect == 'mysql':
+        return '`' + name.replace('`', '``') + '`'
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _field_type(field_type) -> type:
+    """Возвращает базовый тип поля dataclass (Optional[str] -> str)."""
+    args = getattr(field_type, '__args__', None)
+    if args:
+        return next((arg for arg in args if arg is not type(None)), str)
+    return field_type if isinstance(field_type, type) else str
+
+
+def create_table_sql(table: str, dialect: str, columns: Optional[List[str]] = None) -> str:
+    """
+    Формирует CREATE TABLE по полям models.User.
+
+    Args:
+        table: Имя таблицы
+        dialect: Диалект SQL
+        columns: Столбцы DataFrame. Столбцы, которых нет в models.User, добавляются как текстовые.
+
+    Returns:
+        Оператор CREATE TABLE
+    """
+    types = _SQL_TYPES[dialect]
+    definitions = {field.name: types.get(_field_type(field.type), types[str]) for field in fields(User)}
+    for column in columns or []:
+        definitions.setdefault(column_name(column), types[str])
+
+    body = ",\n".join(f"    {quote_identifier(name, dialect)} {sql_type}" for name, sql_type in definitions.items())
+    return f"CREATE TABLE IF NOT EXISTS {quote_identifier(table, dialect)} (\n{body}\n);\n"
+
+
+def sql_literal(value: Any, dialect: str) -> str:
+    """Преобразует значение в литерал SQL."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NULL'
+    if isinstance(value, bool):
+        return ('TRUE' if value else 'FALSE') if dialect == 'postgresql' else str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value).replace("'", "''")
+    if dialect == 'mysql':
+        # В режиме по умолчанию MySQL трактует обратную косую черту как экранирующий символ
+        text = text.replace('\\', '\\\\')
+    return f"'{text}'"
+
+
+def copy_value(value: Any) -> str:
+    """Преобразует значение для блока COPY ... FROM stdin."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class SQLDumpWriter:
+    """
+    Потоково записывает партии данных в SQL-дамп.
+
+    Для каждой партии формируются многострочные INSERT по chunk_size строк
+    (для PostgreSQL по умолчанию - блоки COPY ... FROM stdin), весь дамп
+    выполняется в одной транзакции. Файл открывается при создании объекта
+    и закрывается вызовом close().
+    """
+
+    def __init__(self, filename: str, dialect: Optional[str] = None, table: Optional[str] = None,
+                 chunk_size: Optional[int] = None, create_table: Optional[bool] = None,
+                 use_copy: Optional[bool] = None, append: bool = False):
+        self.dialect = dialect or SQL_EXPORT_CONFIG['dialect']
+        if self.dialect not in SQL_DIALECTS:
+            raise ValueError(f"Неизвестный диалект SQL: {self.dialect}")
+        self.table = table or SQL_EXPORT_CONFIG['table']
+        self.chunk_size = chunk_size or SQL_EXPORT_CONFIG['chunk_size']
+        # При дозаписи таблица уже создана предыдущей частью дампа
+        if create_table is None:
+            create_table = SQL_EXPORT_CONFIG['create_table']
+        self.create_table = create_table and not append
+        if use_copy is None:
+            use_copy = SQL_EXPORT_CONFIG['postgresql_copy']
+        self.use_copy = use_copy and self.dialect == 'postgresql'
+        self.filename = filename
+        self.rows = 0
+        self._columns: Optional[List[str]] = None
+        self._file: Optional[TextIO] = open_output(filename, 'a' if append else 'w', encoding='utf-8', newline='\n')
+        self._file.write(self._begin_statement())
+
+    def _begin_statement(self) -> str:
+        if self.dialect == 'mysql':
+            return "SET NAMES utf8mb4;\nSTART TRANSACTION;\n"
+        if self.dialect == 'sqlite':
+            return "BEGIN TRANSACTION;\n"
+        return "BEGIN;\n"
+
+    def _column_list(self) -> str:
+        return ", ".join(quote_identifier(column_name(column), self.dialect) for column in self._columns)
+
+    def write(self, data: pd.DataFrame):
+        """Дописывает партию данных в дамп."""
+        if data is None or data.empty:
+            return
+
+        if self._columns is None:
+            self._columns = list(data.columns)
+            if self.create_table:
+                self._file.write(create_table_sql(self.table, self.dialect, self._columns))
+        else:
+            # Приводим партии к столбцам первой партии, чтобы значения не сдвигались
+            data = data.reindex(columns=self._columns)
+
+        rows = data.itertuples(index=False, name=None)
+        if self.use_copy:
+            self._write_copy(rows)
+        else:
+            self._write_inserts(rows)
+        self.rows += len(data)
+
+    def _write_inserts(self, rows: Iterable[tuple]):
+        prefix = f"INSERT INTO {quote_identifier(self.table, self.dialect)} ({self._column_list()}) VALUES\n"
+        chunk: List[str] = []
+        for row in rows:
+            chunk.append("(" + ", ".join(sql_literal(value, self.dialect) for value in row) + ")")
+            if len(chunk) >= self.chunk_size:
+                self._file.write(prefix + ",\n".join(chunk) + ";\n")
+                chunk = []
+        if chunk:
+            self._file.write(prefix + ",\n".join(chunk) + ";\n")
+
+    def _write_copy(self, rows: Iterable[tuple]):
+        header = f"COPY {quote_identifier(self.table, self.dialect)} ({self._column_list()}) FROM stdin;\n"
+        chunk: List[str] = []
+        for row in rows:
+            chunk.append("\t".join(copy_value(value) for value in row))
+            if len(chunk) >= self.chunk_size:
+                self._file.write(header + "\n".join(chunk) + "\n\\.\n")
+                chunk = []
+        if chunk:
+            self._file.write(header + "\n".join(chunk) + "\n\\.\n")
+
+    def close(self):
+        """Завершает транзакцию и закрывает файл."""
+        if self._file is not None:
+            self._file.write("COMMIT;\n")
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_sql_dump(data: pd.DataFrame, filename: str, **options) -> int:
+    """
+    Сохраняет DataFrame в SQL-дамп.
+
+    Args:
+        data: DataFrame для сохранения
+        filename: Имя файла
+        **options: Параметры SQLDumpWriter (dialect, table, chunk_size, ...)
+
+    Returns:
+        Количество записанных строк
+    """
+    with SQLDumpWriter(filename, **options) as writer:
+        writer.write(data)
+    return writer.rows
@@ -0,0 +1,8 @@
+# conftest.py
+import os
+import sys
+
+# Модули генератора импортируются без пакета (как при запуске main.py из каталога generator)
+GENERATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if GENERATOR_DIR not in sys.path:
+    sys.path.insert(0, GENERATOR_DIR)
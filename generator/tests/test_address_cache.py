@@ -0,0 +1,67 @@
+# test_address_cache.py
+import random
+from collections import Counter
+
+import pytest
+
+from address_cache import SQLiteAddressCache, JSONAddressCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SQLiteAddressCache(str(tmp_path / 'addresses.db'))
+    yield cache
+    cache.close()
+
+
+def test_add_rejects_duplicates(cache):
+    assert cache.add('US', '1 Main St')
+    assert not cache.add('US', '1 Main St')
+    assert cache.add('DE', '1 Main St')
+    assert cache.count('US') == 1
+    assert cache.count() == 2
+
+
+def test_random_address_is_uniform_across_interleaved_ids(cache):
+    # id общие для всех стран: поздние адреса US идут после большого блока адресов DE
+    for i in range(500):
+        cache.add('US', f"us {i}")
+    for i in range(5000):
+        cache.add('DE', f"de {i}")
+    for i in range(500, 505):
+        cache.add('US', f"us {i}")
+
+    rng = random.Random(1)
+    picks = Counter(cache.random_address('US', rng) for _ in range(10000))
+    assert set(picks) <= {f"us {i}" for i in range(505)}
+    # Ожидается около 20 выборов каждого адреса
+    assert max(picks.values()) < 60
+    assert cache.random_address('FR', rng) is None
+
+
+def test_max_per_country_keeps_newest(tmp_path):
+    cache = SQLiteAddressCache(str(tmp_path / 'addresses.db'), max_per_country=100)
+    try:
+        for i in range(150):
+            cache.add('US', f"us {i}")
+            cache.add('DE', f"de {i}")
+        assert cache.count('US') == 100
+        assert cache.count('DE') == 100
+        rng = random.Random(0)
+        picks = {cache.random_address('US', rng) for _ in range(2000)}
+        assert picks == {f"us {i}" for i in range(50, 150)}
+    finally:
+        cache.close()
+
+
+def test_legacy_json_is_migrated(tmp_path):
+    legacy = JSONAddressCache(str(tmp_path / 'addresses.json'))
+    legacy.add('US', '1 Main St')
+    legacy.flush()
+
+    cache = SQLiteAddressCache(str(tmp_path / 'addresses.db'), legacy_json_path=str(tmp_path / 'addresses.json'))
+    try:
+        assert cache.count('US') == 1
+        assert cache.random_address('US') == '1 Main St'
+    finally:
+        cache.close()
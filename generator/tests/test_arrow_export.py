@@ -0,0 +1,42 @@
+# test_arrow_export.py
+import logging
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from arrow_export import ArrowBatchWriter
+
+
+def _batches():
+    return [
+        pd.DataFrame({'geo': ['US', 'DE', 'US'], 'name': ['Ann Lee', 'Max Paul', 'Bob Ray']}),
+        pd.DataFrame({'geo': ['FR', 'US'], 'name': ['Eve Roy', 'Tom Fox']}),
+    ]
+
+
+@pytest.mark.parametrize('format', ['parquet', 'feather'])
+def test_geo_is_dictionary_encoded(tmp_path, format):
+    filename = str(tmp_path / f"users.{format}")
+    with ArrowBatchWriter(filename, format, row_group_size=2) as writer:
+        for batch in _batches():
+            writer.write(batch)
+
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(filename)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(filename)
+    assert writer.rows == 5
+    assert pa.types.is_dictionary(table.schema.field('geo').type)
+    assert pa.types.is_string(table.schema.field('name').type)
+    assert table.column('geo').to_pylist() == ['US', 'DE', 'US', 'FR', 'US']
+
+
+def test_missing_dictionary_column_warns(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING, logger='arrow_export'):
+        with ArrowBatchWriter(str(tmp_path / 'users.parquet'), dictionary_columns=['geo', 'country_name']) as writer:
+            writer.write(_batches()[0])
+    assert 'отсутствуют в данных: country_name' in caplog.text
@@ -0,0 +1,66 @@
+# test_cache_refiller.py
+import pytest
+
+from cache_refiller import CacheRefiller
+from gmaps_api import clear_used_addresses, claim_address
+from uniqueness_ledger import configure_ledger
+
+
+@pytest.fixture
+def refiller():
+    configure_ledger(None)
+    clear_used_addresses()
+    # Фоновый поток не запускается: очередь заполняется напрямую
+    yield CacheRefiller(low_water=2, high_water=4, workers=3)
+    clear_used_addresses()
+
+
+def test_take_registers_unknown_country(refiller):
+    assert refiller.take('US') is None
+    assert refiller.depth('US') == 0
+    assert refiller._jobs() == ['US', 'US', 'US']
+
+
+def test_take_skips_used_addresses(refiller):
+    refiller.register(['US'])
+    for address in ['1 Main St', '1 Main St', '2 Main St', '3 Main St']:
+        refiller._record('US', address)
+    claim_address('2 Main St')
+
+    assert [refiller.take('US') for _ in range(3)] == ['1 Main St', '3 Main St', None]
+    assert refiller.depth('US') == 0
+
+
+def test_refill_between_low_and_high_water(refiller):
+    refiller.register(['US'])
+    for address in ['1 Main St', '2 Main St', '3 Main St']:
+        refiller._record('US', address)
+    # Очередь не ниже нижней границы: пополнение не начиналось
+    assert refiller._jobs() == []
+
+    refiller.take('US')
+    refiller.take('US')
+    # Ниже нижней границы: запрашивается до верхней, но не больше workers за раунд
+    assert refiller._jobs() == ['US', 'US', 'US']
+    refiller._record('US', '4 Main St')
+    refiller._record('US', '5 Main St')
+    # Пополнение продолжается до верхней границы, хотя очередь уже выше нижней
+    assert refiller._jobs() == ['US']
+    refiller._record('US', '6 Main St')
+    assert refiller._jobs() == []
+
+
+def test_failures_pause_country(refiller):
+    refiller = CacheRefiller(low_water=1, high_water=2, max_failures=2, failure_pause=60)
+    refiller.register(['US'])
+    refiller._record('US', None)
+    assert refiller._jobs() == ['US']
+    refiller._record('US', None)
+    assert refiller._jobs() == []
+
+
+def test_invalid_marks():
+    with pytest.raises(ValueError):
+        CacheRefiller(low_water=4, high_water=4)
+    with pytest.raises(ValueError):
+        CacheRefiller(low_water=1, high_water=2, country_marks={'US': (3, 2)})
@@ -0,0 +1,95 @@
+# test_rate_limit.py
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pytest
+
+import gmaps_api
+from rate_limit import TokenBucket, DailyQuota, RateLimiter, QuotaExceededError
+from uniqueness_ledger import configure_ledger
+
+QUOTA_LIMIT = 300
+
+
+def _consume_quota(path: str, attempts: int) -> int:
+    """Учитывает attempts запросов в рабочем процессе и возвращает число успешных."""
+    quota = DailyQuota(path, {'nearby': QUOTA_LIMIT})
+    consumed = 0
+    try:
+        for _ in range(attempts):
+            try:
+                quota.consume('nearby')
+                consumed += 1
+            except QuotaExceededError:
+                pass
+    finally:
+        quota.close()
+    return consumed
+
+
+def test_token_bucket_burst_then_spaced_slots():
+    rate, capacity, calls = 50.0, 5, 30
+    bucket = TokenBucket(rate, capacity)
+    delays = [bucket.reserve() for _ in range(calls)]
+
+    assert delays[:capacity] == [0.0] * capacity
+    assert delays == sorted(delays)
+    assert delays[-1] == pytest.approx((calls - capacity) / rate, abs=0.05)
+
+
+def test_token_bucket_pause_and_unlimited():
+    bucket = TokenBucket(50.0, 5)
+    bucket.pause(1.0)
+    assert bucket.reserve() >= 0.95
+    assert TokenBucket(0).reserve() == 0
+
+
+def test_daily_quota_is_exact_across_processes(tmp_path):
+    path = str(tmp_path / 'quota.db')
+    with ProcessPoolExecutor(max_workers=2, mp_context=get_context('spawn')) as executor:
+        consumed = sum(executor.map(_consume_quota, [path] * 2, [QUOTA_LIMIT] * 2))
+
+    assert consumed == QUOTA_LIMIT
+    quota = DailyQuota(path, {'nearby': QUOTA_LIMIT})
+    try:
+        assert quota.used('nearby') == QUOTA_LIMIT
+        assert quota.remaining('nearby') == 0
+        assert quota.remaining('details') is None
+    finally:
+        quota.close()
+
+
+def test_acquire_async_consumes_quota(tmp_path):
+    quota = DailyQuota(str(tmp_path / 'quota.db'), {'details': 2})
+    limiter = RateLimiter(TokenBucket(0), {}, quota)
+
+    async def acquire(times):
+        for _ in range(times):
+            await limiter.acquire_async('details')
+
+    try:
+        asyncio.run(acquire(2))
+        assert quota.used('details') == 2
+        with pytest.raises(QuotaExceededError):
+            asyncio.run(acquire(1))
+    finally:
+        quota.close()
+
+
+def test_offline_address_with_ledger_runs_off_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    def fake_offline_address(country_code, rng=None):
+        threads.append(threading.current_thread())
+        return f"{country_code} address"
+
+    monkeypatch.setitem(gmaps_api.GMAPS_CONFIG, 'address_mode', 'offline')
+    monkeypatch.setattr(gmaps_api, 'generate_offline_address', fake_offline_address)
+    configure_ledger(str(tmp_path / 'ledger.db'))
+    try:
+        assert asyncio.run(gmaps_api.generate_address_async('US')) == 'US address'
+    finally:
+        configure_ledger(None)
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,83 @@
+# test_uniqueness_ledger.py
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List
+
+import pytest
+
+from uniqueness_ledger import UniquenessLedger
+
+CLAIM_CHUNK = 50
+
+
+def _claim_values(path: str, values: List[str]) -> List[str]:
+    """Отмечает значения частями в рабочем процессе и возвращает выданные этому процессу."""
+    ledger = UniquenessLedger(path)
+    claimed = []
+    try:
+        for start in range(0, len(values), CLAIM_CHUNK):
+            chunk = values[start:start + CLAIM_CHUNK]
+            claimed.extend(value for value, new in zip(chunk, ledger.claim_many('email', chunk)) if new)
+    finally:
+        ledger.close()
+    return claimed
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UniquenessLedger(str(tmp_path / 'ledger.db'))
+    yield ledger
+    ledger.close()
+
+
+def test_claim_many_across_processes_issues_each_value_once(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    values = [f"user{i}@example.com" for i in range(2000)]
+    # Первый процесс отмечает значения по возрастанию, второй - по убыванию: половина значений общая
+    parts = [values[:1500], values[500:][::-1]]
+    with ProcessPoolExecutor(max_workers=2, mp_context=get_context('spawn')) as executor:
+        first, second = (set(claimed) for claimed in executor.map(_claim_values, [path] * 2, parts))
+
+    assert not first & second
+    assert first | second == set(values)
+    ledger = UniquenessLedger(path)
+    try:
+        assert ledger.count('email') == len(values)
+    finally:
+        ledger.close()
+
+
+def test_claim_many_rejects_repeats_within_batch_and_normalizes(ledger):
+    assert ledger.claim_many('email', ['a@example.com', 'A@Example.com ', 'b@example.com']) == [True, False, True]
+    assert ledger.claim_many('email', ['b@example.com', 'c@example.com']) == [False, True]
+    assert ledger.count('email') == 3
+
+
+def test_claim_is_scoped_by_kind(ledger):
+    assert ledger.claim('email', 'x@example.com')
+    assert not ledger.claim('email', 'x@example.com')
+    assert ledger.claim('address', 'x@example.com')
+    assert ledger.contains('address', 'x@example.com')
+    assert not ledger.contains('phone', 'x@example.com')
+
+
+def test_digest_size_mismatch_raises(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    ledger = UniquenessLedger(path, digest_size=8)
+    ledger.claim('phone', '+1 555 0100')
+    ledger.close()
+
+    with pytest.raises(ValueError, match='размером хэша 8'):
+        UniquenessLedger(path, digest_size=16).contains('phone', '+1 555 0100')
+
+    ledger = UniquenessLedger(path, digest_size=8)
+    try:
+        assert ledger.contains('phone', '+1 555 0100')
+    finally:
+        ledger.close()
+
+
+@pytest.mark.parametrize('digest_size', [3, 33])
+def test_digest_size_out_of_range(tmp_path, digest_size):
+    with pytest.raises(ValueError):
+        UniquenessLedger(str(tmp_path / 'ledger.db'), digest_size=digest_size)
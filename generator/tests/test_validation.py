@@ -0,0 +1,50 @@
+# test_validation.py
+import pandas as pd
+
+from data_generator import validate_user_data, GENERATED_REQUIRED_FIELDS
+
+
+def _generated_frame():
+    # Столбцы сгенерированной партии (models.USER_COLUMNS): без id, AppleID и number пустые
+    return pd.DataFrame({
+        'geo': ['US', 'DE', 'FR'],
+        'AppleID': ['', '', ''],
+        'pass': ['Aa1!bcdefgh', 'Bb2@cdefghi', 'short'],
+        'number': ['', '', ''],
+        'name': ['Ann Lee', '', 'Eve Roy'],
+        'address': ['1 Main St', '2 Main St', '3 Main St'],
+        'birthday': ['01.01.1990', '02.02.1991', '03.03.1992'],
+    })
+
+
+def test_default_required_fields_cover_external_records():
+    records = pd.DataFrame({
+        'id': ['u1', 'u2', None],
+        'geo': ['US', 'US', 'US'],
+        'apple_id': ['a@example.com', 'not-an-email', 'c@example.com'],
+        'password': ['Aa1!bcdefgh', 'Bb2@cdefghi', 'Cc3#defghij'],
+        'name': ['Ann Lee', 'Bob Ray', 'Eve Roy'],
+    })
+    valid, errors = validate_user_data(records)
+
+    assert valid['id'].tolist() == ['u1']
+    assert errors == [
+        {'id': 'u2', 'errors': ["Некорректный формат email"]},
+        {'id': 'unknown', 'errors': ["Отсутствует обязательное поле: id"]},
+    ]
+
+
+def test_default_required_fields_reject_generated_batch():
+    valid, errors = validate_user_data(_generated_frame())
+    assert valid.empty
+    assert all("Отсутствует обязательное поле: apple_id" in error['errors'] for error in errors)
+
+
+def test_generated_required_fields():
+    valid, errors = validate_user_data(_generated_frame(), GENERATED_REQUIRED_FIELDS)
+
+    assert valid['geo'].tolist() == ['US']
+    assert [error['errors'] for error in errors] == [
+        ["Отсутствует обязательное поле: name"],
+        ["Пароль слишком короткий (менее 8 символов)"],
+    ]
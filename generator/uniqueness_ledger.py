@@ -0,0 +1,172 @@
+# uniqueness_ledger.py
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Optional, List, Iterable
+
+from config import LEDGER_CONFIG
+from metrics import inc
+
+logger = logging.getLogger(__name__)
+
+_ledger: Optional['UniquenessLedger'] = None
+_ledger_lock = threading.Lock()
+
+
+class UniquenessLedger:
+    """
+    Постоянный реестр выданных значений (адресов, email, телефонов) в SQLite.
+
+    Хранятся только хэши значений фиксированного размера (digest_size байт) в таблице
+    без rowid, поэтому память процесса не растет с числом выданных значений, а проверка
+    и отметка значения - один запрос INSERT OR IGNORE. Запрос атомарен, поэтому одно
+    значение не будет выдано дважды ни в разных партиях, ни в разных процессах, ни в
+    разных запусках с тем же файлом реестра.
+
+    Значение сравнивается без учета регистра и пробелов по краям. Вероятность того, что
+    новое значение будет ошибочно отклонено из-за совпадения хэшей, - около
+    n / 2**(8 * digest_size) для n выданных значений (для 8 байт и 10 млн значений - 5e-13).
+    """
+
+    def __init__(self, path: str, digest_size: int = 8):
+        if not 4 <= digest_size <= 32:
+            raise ValueError("Размер хэша реестра уникальности должен быть от 4 до 32 байт.")
+        self.path = path
+        self.digest_size = digest_size
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("CREATE TABLE IF NOT EXISTS ledger_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS issued ("
+                " kind TEXT NOT NULL,"
+                " digest BLOB NOT NULL,"
+                " PRIMARY KEY (kind, digest)) WITHOUT ROWID"
+            )
+            # Размер хэша фиксируется при создании реестра: хэши другого размера не совпали бы
+            conn.execute("INSERT OR IGNORE INTO ledger_meta (name, value) VALUES ('digest_size', ?)",
+                         (str(self.digest_size),))
+            stored = int(conn.execute("SELECT value FROM ledger_meta WHERE name = 'digest_size'").fetchone()[0])
+            if stored != self.digest_size:
+                conn.close()
+                raise ValueError(f"Реестр уникальности {self.path} создан с размером хэша {stored} байт, "
+                                 f"а не {self.digest_size}")
+            self._conn = conn
+        return self._conn
+
+    def digest(self, kind: str, value: str) -> bytes:
+        """Хэш нормализованного значения (вид значения входит в хэш)."""
+        data = f"{kind}\x00{value.strip().casefold()}".encode('utf-8')
+        return hashlib.blake2b(data, digest_size=self.digest_size).digest()
+
+    def claim(self, kind: str, value: str) -> bool:
+        """
+        Атомарно отмечает значение как выданное.
+
+        Args:
+            kind: Вид значения ('address', 'email', 'phone')
+            value: Значение
+
+        Returns:
+            True, если значение еще не выдавалось
+        """
+        digest = self.digest(kind, value)
+        with self._lock:
+            cursor = self._connect().execute("INSERT OR IGNORE INTO issued (kind, digest) VALUES (?, ?)",
+                                             (kind, digest))
+        claimed = cursor.rowcount == 1
+        inc('ledger_claims_total', kind=kind, result='new' if claimed else 'duplicate')
+        return claimed
+
+    def claim_many(self, kind: str, values: Iterable[str]) -> List[bool]:
+        """
+        Отмечает значения одной транзакцией (для пакетной генерации).
+
+        Returns:
+            Для каждого значения: True, если оно выдано впервые (повтор внутри values - False)
+        """
+        digests = [self.digest(kind, value) for value in values]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                claimed = [conn.execute("INSERT OR IGNORE INTO issued (kind, digest) VALUES (?, ?)",
+                                        (kind, digest)).rowcount == 1 for digest in digests]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        new = sum(claimed)
+        inc('ledger_claims_total', new, kind=kind, result='new')
+        inc('ledger_claims_total', len(claimed) - new, kind=kind, result='duplicate')
+        return claimed
+
+    def contains(self, kind: str, value: str) -> bool:
+        """Проверяет, выдавалось ли значение (без отметки)."""
+        with self._lock:
+            row = self._connect().execute("SELECT 1 FROM issued WHERE kind = ? AND digest = ?",
+                                          (kind, self.digest(kind, value))).fetchone()
+        return row is not None
+
+    def count(self, kind: Optional[str] = None) -> int:
+        """Количество выданных значений (всех или одного вида)."""
+        with self._lock:
+            conn = self._connect()
+            if kind is None:
+                return conn.execute("SELECT COUNT(*) FROM issued").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM issued WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def get_ledger() -> Optional[UniquenessLedger]:
+    """
+    Возвращает общий для процесса реестр уникальности, открывая его при первом обращении.
+
+    Returns:
+        Реестр или None, если LEDGER_CONFIG['path'] не задан
+    """
+    global _ledger
+    if _ledger is None and LEDGER_CONFIG['path']:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = UniquenessLedger(LEDGER_CONFIG['path'], LEDGER_CONFIG['digest_size'])
+                logger.info(f"Реестр уникальности: {LEDGER_CONFIG['path']}")
+    return _ledger
+
+
+def configure_ledger(path: Optional[str]):
+    """
+    Задает файл реестра уникальности (None - отключить реестр). Открытый реестр закрывается.
+
+    Args:
+        path: Путь к файлу SQLite
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is not None:
+            _ledger.close()
+            _ledger = None
+        LEDGER_CONFIG['path'] = path
+
+
+def claim_unique(kind: str, value: str) -> bool:
+    """
+    Отмечает значение в реестре уникальности.
+
+    Returns:
+        True, если значение еще не выдавалось или реестр не используется
+    """
+    ledger = get_ledger()
+    return ledger is None or ledger.claim(kind, value)